@@ -0,0 +1,65 @@
+"""Measures how long short-lived xui processes take to start.
+
+Each stage runs in a fresh interpreter, several times, and the fastest run is
+reported, since that's the least disturbed by whatever else the machine is doing:
+
+    python benchmarks/bench_startup.py [--runs N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+
+STAGES = [
+    ('python', ''),
+    ('import pygame', 'import pygame'),
+    ('import xui.widgets', 'import xui.widgets'),
+    ('App()', '''
+from xui.app import App
+class Dialog(App):
+    headless = True
+    resolution = (400, 200)
+app = Dialog()
+'''),
+    ('App() + first frame', '''
+from xui.app import App
+from xui.widgets import VBox, HBox, Label, PushButton
+class Dialog(App):
+    headless = True
+    resolution = (400, 200)
+app = Dialog()
+app.screen.render(VBox([Label('Delete 3 files?'), HBox([PushButton('OK'), PushButton('Cancel')])]))
+'''),
+]
+
+TIMER = '''
+import time
+t0 = time.perf_counter()
+%s
+print(time.perf_counter() - t0)
+'''
+
+
+def run_stage(code, runs):
+    env = dict(os.environ, PYTHONPATH=SRC, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    env.setdefault('SDL_VIDEODRIVER', 'dummy')
+    times = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', TIMER % code], env=env,
+                                capture_output=True, text=True, check=True)
+        times.append(float(result.stdout.split()[-1]))
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+    for name, code in STAGES:
+        print('%-22s %8.1f ms' % (name, 1000 * run_stage(code, args.runs)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Animating widgets' properties off the frame clock, e.g.
+
+    app.animate(label, .3, bgcolor=(255, 0, 0), easing='out')
+
+Each frame the App steps every running animation in one pass, then redraws
+just the widgets whose properties changed. While nothing is animating the App
+drops to App.idle_framerate."""
+import math
+from numbers import Number
+
+import pygame
+
+
+def linear(t):
+    return t
+
+def ease_in(t):
+    return t * t * t
+
+def ease_out(t):
+    return 1 - (1 - t) ** 3
+
+def ease_in_out(t):
+    return 4 * t * t * t if t < .5 else 1 - (-2 * t + 2) ** 3 / 2
+
+def ease_out_back(t):
+    # Overshoots a little before settling
+    c = 1.70158
+    return 1 + (c + 1) * (t - 1) ** 3 + c * (t - 1) ** 2
+
+def ease_in_out_sine(t):
+    return -(math.cos(math.pi * t) - 1) / 2
+
+
+easings = {
+    'linear': linear,
+    'in': ease_in,
+    'out': ease_out,
+    'in_out': ease_in_out,
+    'out_back': ease_out_back,
+    'sine': ease_in_out_sine,
+}
+
+
+# Attributes that change our layout rather than just how we look
+geometry_attrs = {'x', 'y', 'width', 'height', 'margin', 'spacing', 'border_thickness'}
+
+
+def as_value(value):
+    """Returns value as a number or a tuple of numbers, converting colours given
+    by name or as pygame.Colors to tuples."""
+    if value is None:
+        raise ValueError('Cannot animate from or to None')
+    if isinstance(value, Number):
+        return value
+    if isinstance(value, (str, pygame.Color)):
+        return tuple(pygame.Color(value))
+    return tuple(value)
+
+
+def interpolate(start, end, f):
+    """Returns the value f of the way from start to end, which are numbers or
+    equal-length tuples of numbers. Integers give integers."""
+    if isinstance(start, tuple):
+        return tuple(interpolate(a, b, f) for a, b in zip(start, end))
+    value = start + (end - start) * f
+    if isinstance(start, int) and isinstance(end, int):
+        return round(value)
+    return value
+
+
+class Tween:
+    """Takes widget's attr from start to end over duration seconds. If widget
+    has a set_<attr>() method it's used to set the value; otherwise the attribute
+    is set directly and the widget redrawn, or relaid out if attr is one of
+    geometry_attrs."""
+
+    def __init__(self, widget, attr, start, end, start_time, duration, easing):
+        self.widget = widget
+        self.attr = attr
+        self.start = as_value(start)
+        self.end = as_value(end)
+        if isinstance(self.start, tuple) and len(self.start) != len(self.end):
+            # e.g. an RGB colour to an RGBA one
+            self.start = tuple(pygame.Color(*self.start))
+            self.end = tuple(pygame.Color(*self.end))
+        self.start_time = start_time
+        self.duration = duration
+        self.easing = easings[easing] if isinstance(easing, str) else easing
+        self.setter = getattr(widget, 'set_' + attr, None)
+
+    def value_at(self, now):
+        """Returns our value at time now, and whether we've finished."""
+        if self.duration <= 0:
+            return self.end, True
+        f = min(1, max(0, (now - self.start_time) / self.duration))
+        return interpolate(self.start, self.end, self.easing(f)), f >= 1
+
+    def apply(self, value):
+        """Sets the value. Returns True if the widget still needs redrawing."""
+        if self.setter:
+            self.setter(value)
+            return False
+        setattr(self.widget, self.attr, value)
+        if self.attr in geometry_attrs:
+            self.widget.relayout()
+            return False
+        return True
+
+
+class Animation:
+    """The tweens started by one Animator.animate() call. done_cb() is called once
+    they have all finished, but not if the animation is cancelled, nor if any of
+    its attributes is cancelled or taken over by another animation."""
+
+    def __init__(self, tweens, done_cb=None):
+        self.tweens = tweens
+        self.done_cb = done_cb
+        self.finished = False
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        self.tweens = []
+
+    def drop(self, tween):
+        """Stops tween, leaving the rest of us running but cancelled."""
+        self.cancelled = True
+        if tween in self.tweens:
+            self.tweens.remove(tween)
+
+
+class Animator:
+    """Runs the animations of an App; see App.animate()."""
+
+    def __init__(self, app):
+        self.app = app
+        self.tweens = {} # (widget, attr) -> (tween, animation)
+        self.animations = []
+
+    def __bool__(self):
+        return bool(self.animations)
+
+    def animate(self, widget, duration, easing='in_out', delay=0, done_cb=None, **attrs):
+        """Animates widget's attributes from their current values to those given
+        in attrs, e.g. animate(w, .5, bgcolor='red'). An attribute that's already
+        being animated is taken over from wherever it has got to."""
+        start_time = self.app.time() + delay
+        tweens = []
+        for attr, end in attrs.items():
+            start = getattr(widget, attr)
+            if start is None and attr == 'bgcolor':
+                # No background of our own: fade from whatever shows through
+                start = widget.inherited_bgcolor()
+            tween = Tween(widget, attr, start, end, start_time, duration, easing)
+            tweens.append(tween)
+        animation = Animation(tweens, done_cb)
+        for tween in tweens:
+            old = self.tweens.get((widget, tween.attr))
+            if old:
+                old[1].drop(old[0])
+            self.tweens[widget, tween.attr] = (tween, animation)
+        self.animations.append(animation)
+        return animation
+
+    def cancel(self, widget, attr=None):
+        """Stops animating widget's attr, or all its attributes, leaving them as they are."""
+        for key in [key for key in self.tweens if key[0] is widget and attr in (None, key[1])]:
+            tween, animation = self.tweens.pop(key)
+            animation.drop(tween)
+
+    def step(self, now):
+        """Sets every animated attribute to its value at time now, then redraws the
+        widgets affected, once each."""
+        to_redraw = set()
+        finished = []
+        for key, (tween, animation) in list(self.tweens.items()):
+            if tween not in animation.tweens:
+                # Stopped by Animation.cancel()
+                del self.tweens[key]
+                continue
+            if now < tween.start_time:
+                continue
+            value, done = tween.value_at(now)
+            if tween.apply(value):
+                to_redraw.add(tween.widget)
+            if done:
+                del self.tweens[key]
+        for widget in to_redraw:
+            widget.redraw()
+        running = {id(animation) for _, animation in self.tweens.values()}
+        for animation in self.animations:
+            if id(animation) not in running:
+                animation.finished = not animation.cancelled
+                if animation.finished:
+                    finished.append(animation)
+        self.animations = [a for a in self.animations if id(a) in running]
+        for animation in finished:
+            if animation.done_cb:
+                animation.done_cb()
@@ -1,3 +1,6 @@
+from contextlib import contextmanager
+import os
+import queue
 import time
 
 import pygame
@@ -6,22 +9,14 @@ import pygame._sdl2
 
 from . import keys
 from . import mouse
-from .widget import Widget, UNLIMITED
+from . import surfaces
+from .animation import Animator
+from .canvas import Canvas, DisplayList
+from .idle import IdleScheduler, IdleTask
+from .widget import Widget, UNLIMITED, update_init_settings, apply_init_settings
 
 TIMER_EVENT = pygame.USEREVENT + 1
-
-
-def update_init_settings(cls, settings):
-    """Arranges for new instances of this class and its subclasses
-    to be created with the specified settings by default."""
-    relevant = {k: v for k, v in settings.items() if k.islower()}
-    if cls.__name__ in settings:
-        relevant |= settings[cls.__name__]
-    for k, v in relevant.items():
-        if hasattr(cls, k):
-            setattr(cls, k, v)
-    for subcls in cls.__subclasses__():
-        update_init_settings(subcls, settings)
+WAKE_EVENT = pygame.USEREVENT + 2
 
 
 class Screen(Widget):
@@ -32,70 +27,150 @@ class Screen(Widget):
 
     bgcolor = 'black'
 
+    # The App's, shared by every widget on the screen; see Widget.canvas
+    canvas = None
+
     def __init__(self, app):
         super().__init__()
         self.app = app
+        self.canvas = app.canvas
         self.init_screen()
-        pygame.display.set_caption(app.title)
+        self.set_caption(app.title)
         self.rect = self.surface.get_rect()
         self.size = self.rect.size
         self.focus_widget = None
+        self.popups = []
+        self.popup_backing = {}
+        self.popup_damage = []
+        self.batch_depth = 0
+        self.chord = None # (widget, keymap) while part way through a chord
+        self.deferred_sizes = {} # widgets to resolve_size() when the batch ends, in order
+        self.pending_flushes = {} # widgets to flush() before the next layout, in order
 
     def init_screen(self):
         self.surface = pygame.display.set_mode(flags=pygame.FULLSCREEN)
 
+    def set_caption(self, title):
+        pygame.display.set_caption(title)
+
+    def present(self, dirty):
+        """Shows the regions of self.surface listed in dirty."""
+        pygame.display.update(dirty)
+
     def apply_settings(self, settings):
         super().apply_settings(settings)
-        update_init_settings(Widget, settings)
+        apply_init_settings(settings)
+        keys.keybindings_updated()
         self.redraw()
         self.relayout()
 
-    def handle_keydown(self, event, keystroke):
-        """Tries to find a widget to handle this keystroke, returning True if so or
-        False if no widgets wanted it.
+    def handle_keydown(self, event, code):
+        """Tries to find a widget to handle this keystroke, given as a keys.event_code(),
+        returning True if so or False if no widgets wanted it.
 
         Starts with the focus widget. If a widget rejects the keystroke, tries the
         widget's parent next. Alternatively a widget can delegate a different widget
-        to handle the keystroke."""
-        widget = self.focus_widget
-        while widget and widget is not self:
-            result = widget.handle_keydown(event, keystroke)
+        to handle the keystroke. Each widget's keybindings are looked up first, and
+        its handle_keydown() is only called if it has no binding for the keystroke.
+        Keystrokes bound on the screen itself (see App.bind_key) are tried last."""
+        if self.chord:
+            # The previous keystroke started a chord; this one finishes or continues it
+            widget, keymap = self.chord
+            self.chord = None
+            action = keymap.get(code)
+            if isinstance(action, dict):
+                self.chord = (widget, action)
+            elif action is not None:
+                widget.run_keybinding(action, event)
+            return True
+        keystroke = None
+        widget = self.focus_widget or self
+        while widget:
+            action = widget.key_action(code)
+            if isinstance(action, dict):
+                self.chord = (widget, action)
+                return True
+            result = False
+            if action is not None:
+                result = widget.run_keybinding(action, event)
+                result = True if result is None else result
+            if widget is self:
+                return bool(result)
+            if result is False:
+                if keystroke is None:
+                    keystroke = keys.code_keystroke(code)
+                result = widget.handle_keydown(event, keystroke)
             if isinstance(result, Widget):
                 widget = result
             elif result:
                 return True
             else:
-                widget = widget.parent
+                widget = widget.parent or self
         return False
 
+    @contextmanager
+    def batch(self):
+        """Groups a set of updates, e.g.
+
+            with app.batch():
+                for label, value in zip(labels, values):
+                    label.set_text(value)
+
+        Until the outermost batch ends, the screen is not laid out or drawn, and
+        widgets' resolve_size() calls are deferred. Each widget then resolves its
+        size once, and the next update() does a single layout and paint."""
+        self.begin_batch()
+        try:
+            yield
+        finally:
+            self.end_batch()
+
+    def begin_batch(self):
+        self.batch_depth += 1
+
+    def end_batch(self):
+        assert self.batch_depth > 0
+        self.batch_depth -= 1
+        if not self.batch_depth:
+            widgets, self.deferred_sizes = self.deferred_sizes, {}
+            for widget in widgets:
+                widget.resolve_size()
+
+    def defer_resolve_size(self, widget):
+        if self.batch_depth:
+            self.deferred_sizes[widget] = True
+        return self.batch_depth > 0
+
+    def flush_before_update(self, widget):
+        """Arranges for widget.flush() to be called once before the next layout, so a
+        widget can gather up many changes and apply them together, once per frame."""
+        self.pending_flushes[widget] = True
+
     def update(self):
-        updated = False
+        if self.batch_depth:
+            # Don't show a half-finished batch, e.g. if a timer fires part way through
+            return
+        widgets, self.pending_flushes = self.pending_flushes, {}
+        for widget in widgets:
+            widget.flush()
         while self.needs_layout():
-            updated = True
             self.layout()
+        for popup in self.popups:
+            if popup.needs_layout():
+                self.layout_popup(popup)
 
         widgets = self.to_redraw()
+        dirty = self.popup_damage
+        self.popup_damage = []
         if widgets:
-            updated = True
             if widgets == [self] and len(self.children) > 1:
                 for child in self.children:
                     if child.bgcolor is None:
                         # bgcolor=None means the child should inherit our bgcolor.
                         # Our top level children each have their own surface so we
                         # must fill it explicitly
-                        child.surface.fill(self.bgcolor)
-            for widget in widgets:
-                if widget.bgcolor is None:
-                    # bgcolor=None means the child should inherit the parent's background
-                    # color. Normally this just works as we'll draw the parent before the
-                    # child, but if we're not drawing the parent we must expicitly draw
-                    # the background.
-                    parent = widget.parent
-                    while parent.bgcolor is None:
-                        parent = parent.parent
-                    widget.surface.fill(parent.bgcolor)
-                if not widget.hide:
-                    widget.draw()
+                        self.canvas.fill(child.surface, self.bgcolor)
+            self.draw_widgets(widgets)
 
             if len(self.children) > 1:
                 region = widgets[0].rect.unionall([w.rect for w in widgets[1:]])
@@ -105,9 +180,123 @@ class Screen(Widget):
                     if child_region:
                         rel_region = child_region.move(-child.rect.left, -child.rect.top)
                         self.surface.blit(child.surface, child_region, rel_region)
-
-            if updated:
-                pygame.display.update([widget.rect for widget in widgets])
+            dirty += [widget.rect for widget in widgets]
+
+        dirty = self.composite_popups(dirty)
+        if dirty:
+            self.present(dirty)
+
+    def draw_widgets(self, widgets):
+        for widget in widgets:
+            if widget.bgcolor is None:
+                # bgcolor=None means the child should inherit the parent's background
+                # color. Normally this just works as we'll draw the parent before the
+                # child, but if we're not drawing the parent we must expicitly draw
+                # the background.
+                self.canvas.fill(widget.surface, widget.inherited_bgcolor())
+            if not widget.hide:
+                widget.paint()
+        self.canvas.flush()
+
+    def composite_popups(self, dirty):
+        """Draws any popups that need it and composites them over the windows.
+
+        Each popup keeps a copy of the screen contents beneath it. Where the windows
+        (or a lower popup) have been repainted we refresh that copy; where the popup
+        itself has been repainted we restore from it before blitting the popup, so
+        translucent popups are never blended over themselves. dirty lists the screen
+        regions repainted so far; returns it extended with the popups' regions."""
+        for popup in self.popups:
+            rect = popup.rect.clip(self.rect)
+            if not rect:
+                continue
+            exposed = []
+            backing = self.popup_backing.get(popup)
+            if backing is None:
+                backing = self.surface.subsurface(rect).copy()
+                self.popup_backing[popup] = backing
+                exposed.append(rect)
+            below = [region.clip(rect) for region in dirty if region.colliderect(rect)]
+            for region in below:
+                backing.blit(self.surface, region.move(-rect.left, -rect.top), region)
+
+            widgets = popup.to_redraw()
+            self.draw_widgets(widgets)
+            exposed += [widget.rect.clip(rect) for widget in widgets]
+
+            for region in below + exposed:
+                self.surface.blit(backing, region, region.move(-rect.left, -rect.top))
+                self.surface.blit(popup.surface, region,
+                                  region.move(-popup.rect.left, -popup.rect.top))
+            dirty += exposed
+        return dirty
+
+    def open_popup(self, popup):
+        """Shows popup above all windows. Popups are laid out, drawn and composited
+        independently of the windows, so opening one does not relayout the screen.
+
+        Popups are modal: while one is open the topmost popup receives every mouse
+        click. Whenever the windows are relaid out each popup's windows_updated()
+        is called, giving it a chance to close itself."""
+        self.popups.append(popup)
+        popup.relayout()
+
+    def close_popup(self, popup):
+        self.restore_popup_background(popup)
+        self.popups.remove(popup)
+
+    def restore_popup_background(self, popup):
+        backing = self.popup_backing.pop(popup, None)
+        if backing:
+            rect = popup.rect.clip(self.rect)
+            self.surface.blit(backing, rect)
+            self.popup_damage.append(rect)
+
+    def layout_popup(self, popup):
+        popup.resolve_tree(self)
+        popup.set_width(popup.max_width())
+        popup.set_height(popup.max_height())
+        popup.hlayout()
+        popup.vlayout()
+        rect = pygame.Rect(popup.x, popup.y, popup.width, popup.height)
+        if rect != popup.rect:
+            self.restore_popup_background(popup)
+            # finalise_layout() would redraw the whole screen on seeing the rect change.
+            # We've dealt with the old location ourselves, so only the popup needs drawing.
+            popup.rect = rect
+        popup.finalise_layout()
+        if not surfaces.surface_fits(popup.surface, popup.size, popup.bgcolor):
+            popup.surface = surfaces.new_surface(popup.size, popup.bgcolor)
+        popup.setup_surface()
+        popup.redraw()
+
+    def apply_child_settings(self, settings):
+        super().apply_child_settings(settings)
+        for popup in self.popups:
+            popup.apply_settings(settings)
+
+    def handle_mouse_down(self, button, pos):
+        if self.popups:
+            # The topmost popup sees every click, including those outside it
+            popup = self.popups[-1]
+            popup.handle_mouse_down(button, popup.mouse_rel_pos(pos))
+            self.mouse_down_child[button] = popup
+            return True
+        return super().handle_mouse_down(button, pos)
+
+    def handle_mouse_move(self, pos):
+        old = self.mouse_in_children
+        new = set()
+        for child in self.children + self.popups:
+            rel_pos = child.mouse_rel_pos(pos)
+            if rel_pos:
+                new.add(child)
+                if child not in old:
+                    child.handle_mouse_enter()
+                child.handle_mouse_move(rel_pos)
+            elif child in old:
+                child.handle_mouse_exit()
+        self.mouse_in_children = new
 
     def setup_surface(self):
         if len(self.children) < 2:
@@ -116,10 +305,10 @@ class Screen(Widget):
             super().setup_surface()
             return
         for child in self.children:
-            if not (child.surface and
-                    child.surface.get_size() == child.size and
-                    child.surface.get_parent() is None):
-                child.surface = pygame.Surface(child.size, pygame.SRCALPHA)
+            # We fill a child that has no bgcolor with ours, so this is always opaque
+            bgcolor = child.inherited_bgcolor()
+            if not surfaces.surface_fits(child.surface, child.size, bgcolor):
+                child.surface = surfaces.new_surface(child.size, bgcolor)
             child.setup_surface()
 
     def layout(self):
@@ -129,6 +318,10 @@ class Screen(Widget):
         self.finalise_layout()
         self.setup_surface()
         self.redraw()
+        # We're about to repaint everything, so the popups must recapture what's beneath them
+        self.popup_backing.clear()
+        for popup in self.popups[::-1]:
+            popup.windows_updated()
 
 
 class FixedSizeWindow(Screen):
@@ -140,6 +333,55 @@ class FixedSizeWindow(Screen):
         self.surface = pygame.display.set_mode(self.resolution)
 
 
+class OffscreenScreen(FixedSizeWindow):
+    """Lays out and draws into an in-memory surface instead of a window, e.g. for
+    screenshots, golden-image tests or rendering thumbnails on a server. Nothing is
+    shown, and pygame.display.set_mode() is never called. See App.headless."""
+
+    def init_screen(self):
+        self.surface = pygame.Surface(self.resolution, 0, 32)
+
+    def set_caption(self, title):
+        pass
+
+    def present(self, dirty):
+        pass
+
+    def set_resolution(self, resolution):
+        self.resolution = resolution
+        self.init_screen()
+        self.rect = self.surface.get_rect()
+        self.size = self.rect.size
+        self.relayout()
+        self.redraw()
+
+    def render(self, *windows):
+        """Replaces our windows with windows, then lays out and draws them, returning
+        our surface. The surface is reused by the next render, so copy it to keep it.
+        Rendering many trees one after another this way reuses the screen and any
+        text rendered before."""
+        for popup in self.popups[:]:
+            self.close_popup(popup)
+        self.popup_damage = []
+        self.focus_widget = None
+        self.mouse_in_children = set()
+        self.mouse_down_child = dict.fromkeys(self.mouse_down_child)
+        self.children = list(windows)
+        self.relayout()
+        self.redraw()
+        self.update()
+        return self.surface
+
+    def save(self, path):
+        """Saves what we've drawn as an image; the format follows path's extension,
+        e.g. .png."""
+        pygame.image.save(self.surface, path)
+
+    def tobytes(self, format='RGB'):
+        """Returns what we've drawn as raw pixels, in a pygame.image.tobytes() format."""
+        return pygame.image.tobytes(self.surface, format)
+
+
 class AutoSizeWindow(FixedSizeWindow):
     def __init__(self, app):
         super().__init__(app, (0, 0))
@@ -182,13 +424,46 @@ class AutoSizeWindow(FixedSizeWindow):
 
 class App:
     framerate = 30
+
+    # Frame rate while nothing is animating and there are no idle tasks. Nothing
+    # changes on screen until an event arrives then, and events (timers included)
+    # are still handled as soon as they do.
+    idle_framerate = 10
     fullscreen = True
     resolution = None
     title = 'XUI'
 
+    # Record widgets' drawing and carry it out in one go at the end of each frame,
+    # batching blits and skipping drawing that would be covered up. Widgets that
+    # draw onto self.surface directly rather than through self.canvas must call
+    # self.canvas.flush() first.
+    display_list = False
+
+    # Draw into an OffscreenScreen of size resolution (or default_resolution)
+    # rather than opening a window
+    headless = False
+    default_resolution = (1024, 768)
+
+    # While set, handle_event() passes every event to recorder.record(); see replay.py
+    recorder = None
+
+    # Set by a replay.Replayer to run timers off its clock rather than the real one
+    virtual_time = None
+
+    # Seconds of each idle frame left unused by idle tasks, for the update that follows
+    idle_reserve = .005
+
     def __init__(self):
-        pygame.init()
-        if self.fullscreen:
+        self.canvas = DisplayList() if self.display_list else Canvas()
+        if self.headless:
+            # Don't let SDL connect to a real display
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        # Only what we use: display (which brings events and timers) and fonts
+        pygame.display.init()
+        pygame.font.init()
+        if self.headless:
+            self.screen = OffscreenScreen(self, self.resolution or self.default_resolution)
+        elif self.fullscreen:
             self.screen = Screen(self)
         elif self.resolution:
             self.screen = FixedSizeWindow(self, self.resolution)
@@ -196,6 +471,10 @@ class App:
             self.screen = AutoSizeWindow(self)
         self.size = self.screen.size
         self.timers = []
+        self.idle_tasks = IdleScheduler()
+        self.animator = Animator(self)
+        self.pending_calls = queue.SimpleQueue()
+        self.wake_posted = False
         self.exiting = False
         self.clock = pygame.time.Clock()
         self.t0 = time.time()
@@ -209,35 +488,95 @@ class App:
     def apply_settings(self, settings):
         self.screen.apply_settings(settings)
 
+    def batch(self):
+        return self.screen.batch()
+
     def log(self, msg):
         print("%.3fs: %s" % (time.time() - self.t0, msg))
 
+    def time(self):
+        """Returns the time by which timers run, normally time.time()."""
+        return time.time() if self.virtual_time is None else self.virtual_time
+
     def start_event_timer(self, delay_s):
+        if self.virtual_time is not None:
+            # The replayer checks the timers itself as it advances its clock
+            return
         millis = max(1, int(delay_s * 1000))
         pygame.time.set_timer(TIMER_EVENT, millis=millis, loops=1)
 
     def call_later(self, delay_s, fn, *args, **kwargs):
-        expiry = time.time() + delay_s
+        expiry = self.time() + delay_s
         if not self.timers or expiry < self.timers[0][0]:
             self.start_event_timer(delay_s)
-        token = (expiry, fn, args, kwargs)
+        # A list, so shift_timers() can move it without invalidating the token
+        token = [expiry, fn, args, kwargs]
         self.timers.append(token)
         self.timers.sort()
         return token
 
+    def shift_timers(self, delta_s):
+        """Moves every pending timer delta_s seconds later, e.g. when the clock they
+        were set by is swapped for another one."""
+        for token in self.timers:
+            token[0] += delta_s
+        if self.timers:
+            self.start_event_timer(self.timers[0][0] - self.time())
+
     def cancel_call(self, token):
         if token in self.timers:
             self.timers.remove(token)
 
+    def call_soon_threadsafe(self, fn, *args):
+        """Arranges for fn(*args) to be called on the main thread. Unlike the rest
+        of the App and its widgets, this may be called from any thread."""
+        self.pending_calls.put((fn, args))
+        if not self.wake_posted:
+            self.wake_posted = True
+            pygame.event.post(pygame.event.Event(WAKE_EVENT))
+
+    def run_pending_calls(self):
+        """Makes the calls requested with call_soon_threadsafe(). Done by the event
+        loop, but a headless app without one can call this itself."""
+        # Cleared first, so a call requested while we're running these wakes us again
+        self.wake_posted = False
+        while True:
+            try:
+                fn, args = self.pending_calls.get_nowait()
+            except queue.Empty:
+                return
+            fn(*args)
+
+    def add_idle_task(self, job, priority=0, name=None, done_cb=None):
+        """Runs job in the time left over in frames with no events to handle.
+        job is either a generator, which does a piece of work each time it is
+        advanced, or a function that does a piece of work each time it is called
+        and returns True while there is more to do. Pieces should take well under
+        a frame. Higher priority jobs run first. Returns an IdleTask, which can be
+        cancelled and records the time spent on the job so far."""
+        return self.idle_tasks.add(IdleTask(job, priority, name, done_cb))
+
+    def animate(self, widget, duration, easing='in_out', delay=0, done_cb=None, **attrs):
+        """Animates widget's attributes to the values given in attrs over duration
+        seconds, e.g. app.animate(label, .25, bgcolor='red', easing='out'). Returns
+        an animation.Animation, which can be cancelled."""
+        return self.animator.animate(widget, duration, easing, delay, done_cb, **attrs)
+
+    def bind_key(self, keystrokes, action):
+        """Binds keystrokes (e.g. 'CTRL-q' or 'CTRL-x CTRL-c') to action, a function
+        called without arguments, whichever widget has the focus. Widgets' own
+        keybindings take precedence."""
+        self.screen.bind_key(keystrokes, action)
+
     def handle_keydown_event(self, event):
-        keystroke = keys.event_keystroke(event)
-        if keystroke is None:
+        code = keys.event_code(event)
+        if code is None:
             return
-        if not self.screen.handle_keydown(event, keystroke):
-            self.unhandled_keydown_hook(event, keystroke)
+        if not self.screen.handle_keydown(event, code):
+            self.unhandled_keydown_hook(event, keys.code_keystroke(code))
 
     def check_timers(self):
-        now = time.time()
+        now = self.time()
         while self.timers and (self.timers[0][0] - .002) < now:
             # if a timer is up to 2ms in the future, fire it now: if we go to sleep again
             # now, then it would be very late by the time we wake up again and fire it.
@@ -247,12 +586,16 @@ class App:
             self.start_event_timer(self.timers[0][0] - now)
 
     def handle_event(self, event):
+        if self.recorder:
+            self.recorder.record(event)
         if event.type == pygame.locals.QUIT:
             self.exiting = True
         elif event.type == pygame.locals.KEYDOWN:
             self.handle_keydown_event(event)
         elif event.type == TIMER_EVENT:
             self.check_timers()
+        elif event.type == WAKE_EVENT:
+            self.run_pending_calls()
         elif event.type in [pygame.locals.WINDOWFOCUSGAINED, pygame.locals.WINDOWSHOWN]:
             self.screen.redraw()
         elif event.type == pygame.locals.MOUSEBUTTONDOWN:
@@ -273,15 +616,28 @@ class App:
 
     def idle(self, deadline):
         self.idle_hook(deadline)
-        self.clock.tick(self.framerate)
+        if self.idle_tasks:
+            self.idle_tasks.run(deadline - self.idle_reserve)
+        if self.animator or self.idle_tasks:
+            self.clock.tick(self.framerate)
+        else:
+            # Sleep until an event arrives, or the next idle frame
+            self.handle_event(pygame.event.wait(int(1000 / self.idle_framerate)))
+            self.clock.tick()
 
-    def run(self):
+    def update(self):
+        """Steps any animations, then lays out and draws the screen as needed."""
+        if self.animator:
+            self.animator.step(self.time())
         self.screen.update()
+
+    def run(self):
+        self.update()
         while not self.exiting:
             now = time.time()
             if not self.handle_events():
                 self.idle(now + 1 / self.framerate)
-            self.screen.update()
+            self.update()
         self.pre_exit_hook()
         pygame.quit()
 
@@ -0,0 +1,167 @@
+import pygame
+
+FILL, RECT, LINE, POLYGON, BLIT = range(5)
+
+
+class Canvas:
+    """Draws onto surfaces. Widgets draw through self.canvas, whose methods take
+    the same arguments as the pygame functions they wrap, so that a DisplayList can
+    be used instead (see App.display_list). This one draws immediately."""
+
+    def fill(self, surface, color, rect=None, special_flags=0):
+        surface.fill(color, rect, special_flags)
+
+    def rect(self, surface, color, rect, width=0):
+        pygame.draw.rect(surface, color, rect, width)
+
+    def line(self, surface, color, start, end, width=1):
+        pygame.draw.line(surface, color, start, end, width)
+
+    def polygon(self, surface, color, points, width=0):
+        pygame.draw.polygon(surface, color, points, width)
+
+    def blit(self, surface, source, dest, area=None, special_flags=0):
+        surface.blit(source, dest, area, special_flags)
+
+    def flush(self):
+        """Makes sure everything drawn so far is on its surface. Call before drawing
+        onto a surface directly or reading its pixels."""
+        pass
+
+
+def _bounds(points, width):
+    xs = [x for x, y in points]
+    ys = [y for x, y in points]
+    rect = pygame.Rect(min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)
+    return rect.inflate(width, width)
+
+
+def _covered(bounds, rects):
+    for rect in rects:
+        if rect.contains(bounds):
+            return True
+    return False
+
+
+class DisplayList(Canvas):
+    """Records drawing commands and carries them out when flushed.
+
+    Commands on subsurfaces are translated to their top level surface and clipped
+    to the subsurface's clip area as they are recorded; commands that would draw
+    nothing are dropped there and then. On flush, commands hidden by a later fill
+    of the same area are dropped, and runs of plain blits onto the same surface
+    are carried out together with Surface.fblits()."""
+
+    # Number of later fills per surface checked for hiding each earlier command
+    max_covers = 4
+
+    def __init__(self):
+        self.commands = [] # (op, target, clip, bounds, args)
+
+    def target(self, surface):
+        x, y = surface.get_abs_offset()
+        return surface.get_abs_parent(), x, y, surface.get_clip().move(x, y)
+
+    def record(self, op, target, clip, bounds, args):
+        bounds = bounds.clip(clip)
+        if bounds:
+            self.commands.append((op, target, clip, bounds, args))
+
+    def fill(self, surface, color, rect=None, special_flags=0):
+        target, x, y, clip = self.target(surface)
+        rect = clip if rect is None else pygame.Rect(rect).move(x, y)
+        self.record(FILL, target, clip, rect, (color, special_flags))
+
+    def rect(self, surface, color, rect, width=0):
+        target, x, y, clip = self.target(surface)
+        rect = pygame.Rect(rect).move(x, y)
+        self.record(RECT, target, clip, rect, (color, rect, width))
+
+    def line(self, surface, color, start, end, width=1):
+        target, x, y, clip = self.target(surface)
+        start = (start[0] + x, start[1] + y)
+        end = (end[0] + x, end[1] + y)
+        self.record(LINE, target, clip, _bounds([start, end], width), (color, start, end, width))
+
+    def polygon(self, surface, color, points, width=0):
+        target, x, y, clip = self.target(surface)
+        points = [(px + x, py + y) for px, py in points]
+        self.record(POLYGON, target, clip, _bounds(points, width), (color, points, width))
+
+    def blit(self, surface, source, dest, area=None, special_flags=0):
+        target, x, y, clip = self.target(surface)
+        src_rect = source.get_rect()
+        area = src_rect if area is None else pygame.Rect(area).clip(src_rect)
+        rect = pygame.Rect(dest[0] + x, dest[1] + y, area.width, area.height)
+        visible = rect.clip(clip)
+        if not visible:
+            return
+        if visible != rect:
+            area = pygame.Rect(area.left + visible.left - rect.left,
+                               area.top + visible.top - rect.top, visible.width, visible.height)
+        if area != src_rect:
+            source = source.subsurface(area)
+        self.commands.append((BLIT, target, clip, visible, (source, special_flags)))
+
+    def drop_hidden(self, commands):
+        # Walk backwards, remembering the areas each surface will be filled over
+        covers = {}
+        kept = []
+        for command in reversed(commands):
+            op, target, clip, bounds, args = command
+            if target in covers and _covered(bounds, covers[target]):
+                continue
+            kept.append(command)
+            if op == BLIT:
+                # What's on the source so far is needed for this blit
+                covers.pop(args[0].get_abs_parent(), None)
+            elif op == FILL and not args[1]:
+                rects = covers.setdefault(target, [])
+                rects.append(bounds)
+                del rects[:-self.max_covers]
+        kept.reverse()
+        return kept
+
+    def flush(self):
+        commands = self.drop_hidden(self.commands)
+        self.commands = []
+        # Plain blits are held back and done together. Other commands can go ahead
+        # of them as long as they don't touch the held blits' areas or sources.
+        blits = []
+        blit_rects = []
+        blit_sources = set()
+        blit_target = None
+        for op, target, clip, bounds, args in commands:
+            if op == BLIT and not args[1]:
+                if target is not blit_target:
+                    if blits:
+                        blit_target.fblits(blits)
+                        blits, blit_rects, blit_sources = [], [], set()
+                    blit_target = target
+                blits.append((args[0], bounds.topleft))
+                blit_rects.append(bounds)
+                blit_sources.add(args[0].get_abs_parent())
+                continue
+            if blits and (op == BLIT or target in blit_sources or
+                          (target is blit_target and bounds.collidelist(blit_rects) != -1)):
+                blit_target.fblits(blits)
+                blits, blit_rects, blit_sources = [], [], set()
+            self.execute(op, target, clip, bounds, args)
+        if blits:
+            blit_target.fblits(blits)
+
+    def execute(self, op, target, clip, bounds, args):
+        if op == BLIT:
+            target.blit(args[0], bounds, None, args[1])
+        elif op == FILL:
+            target.fill(args[0], bounds, args[1])
+        else:
+            old_clip = target.get_clip()
+            target.set_clip(clip)
+            if op == RECT:
+                pygame.draw.rect(target, *args)
+            elif op == LINE:
+                pygame.draw.line(target, *args)
+            else:
+                pygame.draw.polygon(target, *args)
+            target.set_clip(old_clip)
@@ -0,0 +1,192 @@
+from bisect import bisect_left
+import heapq
+import os
+import re
+
+# Sorts after any character that can follow a prefix, so bisecting for
+# prefix + PREFIX_END finds the end of the run of words starting with prefix.
+PREFIX_END = chr(0x10ffff)
+
+
+class PrefixCompletions:
+    """A sorted list of completions supporting fast prefix lookup.
+
+    Lookups bisect the sorted list rather than scanning it, so their cost
+    depends on the number of matches returned rather than the number of
+    completions."""
+
+    def __init__(self, words=None):
+        self.words = sorted(words or [])
+        self._prefix = ''
+        self._span = (0, len(self.words))
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __getitem__(self, i):
+        return self.words[i]
+
+    def span(self, prefix):
+        """Returns (lo, hi) such that self.words[lo:hi] are the words starting with prefix."""
+        if prefix.startswith(self._prefix):
+            # Narrowing the previous query; the new span lies within the old one.
+            lo, hi = self._span
+        else:
+            lo, hi = 0, len(self.words)
+        lo = bisect_left(self.words, prefix, lo, hi)
+        hi = bisect_left(self.words, prefix + PREFIX_END, lo, hi)
+        self._prefix = prefix
+        self._span = (lo, hi)
+        return lo, hi
+
+    def count(self, prefix):
+        lo, hi = self.span(prefix)
+        return hi - lo
+
+    def matches(self, prefix, start=0, limit=None):
+        """Returns up to limit words starting with prefix, skipping the first start matches."""
+        lo, hi = self.span(prefix)
+        lo = min(lo + start, hi)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self.words[lo:hi]
+
+    def search(self, prefix, limit=None):
+        """Yields the matches for prefix. Prefix lookups are cheap enough to complete
+        in one go, so unlike FuzzyCompletions.search this only yields once."""
+        yield self.matches(prefix, limit=limit)
+
+    def common_prefix(self, prefix):
+        """Returns the longest common prefix of all words starting with prefix."""
+        lo, hi = self.span(prefix)
+        if lo == hi:
+            return prefix
+        # The list is sorted, so the first and last matches differ the most
+        first, last = self.words[lo], self.words[hi - 1]
+        i = len(prefix)
+        n = min(len(first), len(last))
+        while i < n and first[i] == last[i]:
+            i += 1
+        return first[:i]
+
+
+class FuzzyCompletions:
+    """A list of completions matched by subsequence and ranked by how closely
+    each one matches.
+
+    search() scores candidates a chunk at a time so that a caller can spread
+    the work over several frames and show the best matches found so far. When
+    a query extends the previous one, only words that matched the previous
+    query (plus any it had not yet scanned) are considered, since a word
+    cannot match the longer query without matching the shorter one."""
+
+    chunk_size = 10000
+    ignore_case = True
+
+    def __init__(self, words=None):
+        self.words = sorted(words or [])
+        self._query = None
+        self._pool = self.words
+        self._scanned = 0
+        self._matched = []
+        self._scored = []
+        self._ranked = None
+        self._complete = False
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __getitem__(self, i):
+        return self.words[i]
+
+    def pattern(self, query):
+        flags = re.IGNORECASE if self.ignore_case else 0
+        return re.compile('.*?'.join(map(re.escape, query)), flags)
+
+    def score(self, match, word):
+        # Lower is better: prefer tight matches, then early matches, then short words
+        return (match.end() - match.start(), match.start(), len(word), word)
+
+    def search(self, query, limit=None):
+        """Yields the best matches for query, best first, after scoring each chunk
+        of candidates. The final value yielded is the complete ranking."""
+        if self._query is not None and query.startswith(self._query):
+            pool = self._matched + self._pool[self._scanned:]
+        else:
+            pool = self.words
+        self._query = query
+        self._pool = pool
+        self._scanned = 0
+        self._matched = []
+        self._scored = []
+        self._ranked = None
+        self._complete = False
+
+        if not query:
+            self._matched = pool
+            self._scanned = len(pool)
+            self._ranked = pool
+            self._complete = True
+            yield pool[:limit]
+            return
+
+        search = self.pattern(query).search
+        ranked = []
+        while self._scanned < len(pool):
+            chunk = pool[self._scanned:self._scanned + self.chunk_size]
+            # filter() runs the regex over the whole chunk without a python-level loop;
+            # only the (usually few) hits need scoring individually.
+            hits = list(filter(search, chunk))
+            scored = [self.score(search(word), word) for word in hits]
+            self._matched += hits
+            self._scored += scored
+            self._scanned += len(chunk)
+            self._complete = self._scanned == len(pool)
+            if limit is None:
+                ranked = sorted(ranked + scored)
+            else:
+                ranked = heapq.nsmallest(limit, ranked + scored)
+            yield [entry[-1] for entry in ranked]
+        if not pool:
+            self._complete = True
+            yield []
+
+    def ranking(self, query):
+        """Returns every match for query, best first, or None if the most
+        recent search was for a different query or did not finish."""
+        if query != self._query or not self._complete:
+            return None
+        if self._ranked is None:
+            self._ranked = [entry[-1] for entry in sorted(self._scored)]
+        return self._ranked
+
+    def matches(self, query, start=0, limit=None):
+        """Returns up to limit matches for query, skipping the first start, from the
+        ranking built by the most recent search(). Returns [] if that search has not
+        finished, as there is no complete ranking to page through yet."""
+        ranking = self.ranking(query) or []
+        end = None if limit is None else start + limit
+        return ranking[start:end]
+
+    def common_prefix(self, query):
+        """Returns the longest common prefix of the matches for query if it extends
+        query; otherwise returns query unchanged. With ignore_case, matches that
+        differ only in case share a prefix, which is returned cased as in the best
+        match."""
+        ranking = self.ranking(query)
+        if not ranking:
+            return query
+        if self.ignore_case:
+            n = len(os.path.commonprefix([word.lower() for word in ranking]))
+            prefix = ranking[0][:n]
+            extends = prefix.lower().startswith(query.lower())
+        else:
+            prefix = os.path.commonprefix(ranking)
+            extends = prefix.startswith(query)
+        return prefix if len(prefix) > len(query) and extends else query
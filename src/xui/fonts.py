@@ -0,0 +1,182 @@
+"""Finding and loading fonts by family name.
+
+pygame.font.SysFont() scans every installed font (on Linux by running fc-list)
+the first time it's called in each process. Here the result of that scan is
+saved in a cache file, and reused for as long as the font directories' mtimes
+are unchanged, so usually nothing is scanned at all. Names are matched the same
+way as SysFont() matches them, and a family that isn't found gets pygame's
+default font, as with SysFont().
+
+Only the top level font directories' mtimes are checked, so a font added to an
+existing subdirectory isn't noticed until families(rescan=True)."""
+import json
+import os
+import sys
+
+import pygame
+import pygame.font
+
+CACHE_VERSION = 2
+
+STYLES = [(False, False), (True, False), (False, True), (True, True)]
+
+# Where the cache file goes; None for the user's cache directory
+cache_path = None
+
+_families = None # simple_name() of family -> {(bold, italic): path}, {} if not installed
+_signature = None # dir_signature() when _families was read or scanned
+_fonts = {} # (name, size, bold, italic) -> pygame.font.Font
+
+
+def font_dirs():
+    """Returns the directories fonts are installed in on this platform."""
+    home = os.path.expanduser('~')
+    if sys.platform == 'win32':
+        dirs = [os.path.join(os.environ.get('WINDIR', r'C:\Windows'), 'Fonts'),
+                os.path.join(os.environ.get('LOCALAPPDATA', home), 'Microsoft', 'Windows', 'Fonts')]
+    elif sys.platform == 'darwin':
+        dirs = ['/System/Library/Fonts', '/Library/Fonts', os.path.join(home, 'Library', 'Fonts')]
+    else:
+        data_home = os.environ.get('XDG_DATA_HOME') or os.path.join(home, '.local', 'share')
+        data_dirs = (os.environ.get('XDG_DATA_DIRS') or '/usr/local/share:/usr/share').split(':')
+        dirs = [os.path.join(d, 'fonts') for d in [data_home] + data_dirs]
+        dirs += [os.path.join(home, '.fonts')]
+    return [d for d in dirs if os.path.isdir(d)]
+
+
+def dir_signature():
+    """Returns the mtime of each font directory. Installing a font package usually
+    adds a subdirectory, which changes the mtime of the directory it's in."""
+    signature = {}
+    for top in font_dirs():
+        try:
+            signature[top] = os.stat(top).st_mtime_ns
+        except OSError:
+            pass
+    return signature
+
+
+def simple_name(name):
+    """Returns name as pygame.font.get_fonts() gives it: lowercase letters and digits."""
+    return ''.join(c.lower() for c in name if c.isalnum())
+
+
+def default_cache_path():
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'xui', 'fonts.json')
+
+
+def _cache_header():
+    return {'version': CACHE_VERSION, 'pygame': pygame.version.ver, 'platform': sys.platform}
+
+
+def scan_family(name):
+    """Returns {(bold, italic): path} for family name, or {} if it isn't installed.
+    pygame gives the plain font for a style the family doesn't have."""
+    styles = {style: pygame.font.match_font(name, *style) for style in STYLES}
+    return {style: path for style, path in styles.items() if path}
+
+
+def scan():
+    """Has pygame scan the installed fonts, returning their families."""
+    return {name: scan_family(name) for name in pygame.font.get_fonts()}
+
+
+def read_cache(path, signature):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cache.get('header') != _cache_header() or cache.get('dirs') != signature:
+        return None
+    # JSON keys are strings, so styles were saved as e.g. '10' for (bold, not italic)
+    return {name: {(style[0] == '1', style[1] == '1'): path for style, path in styles.items()}
+            for name, styles in cache['families'].items()}
+
+
+def write_cache(path, signature, families):
+    cache = {
+        'header': _cache_header(),
+        'dirs': signature,
+        'families': {name: {'%d%d' % style: path for style, path in styles.items()}
+                     for name, styles in families.items()},
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '%s.%d' % (path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # e.g. a read-only home directory; we'll just scan again next time
+        pass
+
+
+def families(rescan=False):
+    """Returns the installed font families, from the cache file if it's up to date."""
+    global _families, _signature
+    if _families is None or rescan:
+        path = cache_path or default_cache_path()
+        _signature = dir_signature()
+        _families = None if rescan else read_cache(path, _signature)
+        if _families is None:
+            _families = scan()
+            write_cache(path, _signature, _families)
+    return _families
+
+
+def family_styles(name):
+    """Returns {(bold, italic): path} for family name, or {} if it isn't installed."""
+    installed = families()
+    key = simple_name(name)
+    styles = installed.get(key)
+    if styles is None:
+        # Not a family get_fonts() lists, e.g. an alias such as 'monospace', or not
+        # installed. Ask pygame once, and remember the answer in the cache too.
+        styles = scan_family(key) if key else {}
+        installed[key] = styles
+        write_cache(cache_path or default_cache_path(), _signature, installed)
+    return styles
+
+
+def match_font(name, bold=False, italic=False):
+    """Returns (path, fake_bold, fake_italic) for the first family found in name, a
+    comma-separated list of families, or (None, bold, italic) if none is installed.
+    fake_bold and fake_italic say if pygame must embolden or slant the font itself."""
+    for single_name in (name or '').split(','):
+        styles = family_styles(single_name)
+        if not styles:
+            continue
+        plain = styles.get((False, False))
+        path = styles.get((bold, italic)) or plain
+        if path:
+            return path, bold and path == plain, italic and path == plain
+        # Neither the style asked for nor plain; make do with whatever there is
+        (got_bold, got_italic), path = next(iter(styles.items()))
+        return path, bold and not got_bold, italic and not got_italic
+    return None, bold, italic
+
+
+def get_font(name, size, bold=False, italic=False):
+    """Returns a pygame.font.Font for family name at size, like pygame.font.SysFont()
+    but without scanning the system's fonts. Fonts are kept, so asking again for
+    the same one is a dict lookup."""
+    key = (name, size, bold, italic)
+    font = _fonts.get(key)
+    if font is None:
+        path, fake_bold, fake_italic = match_font(name, bold, italic)
+        if path and not os.path.exists(path):
+            # The cache is out of date in a way the directory mtimes didn't show
+            families(rescan=True)
+            path, fake_bold, fake_italic = match_font(name, bold, italic)
+        font = pygame.font.Font(path, size)
+        if fake_bold:
+            font.set_bold(True)
+        if fake_italic:
+            font.set_italic(True)
+        _fonts[key] = font
+    return font
@@ -0,0 +1,93 @@
+"""Background work done a step at a time in the time left over between frames."""
+import heapq
+import itertools
+import time
+
+
+class IdleTask:
+    """A job added with App.add_idle_task(). step() does the next piece of work,
+    returning False once there is nothing left to do."""
+
+    # Weight of the latest step in the estimate of how long the next will take
+    smoothing = .25
+
+    def __init__(self, job, priority=0, name=None, done_cb=None):
+        if hasattr(job, 'send'):
+            self.generator, self.fn = job, None
+        else:
+            self.generator, self.fn = None, job
+        self.priority = priority
+        self.name = name or getattr(job, '__name__', type(job).__name__)
+        self.done_cb = done_cb
+        self.steps = 0
+        self.time_s = 0.0 # total time spent in steps
+        self.estimate_s = 0.0 # expected time for the next step
+        self.done = False
+        self.cancelled = False
+
+    def __repr__(self):
+        return '<IdleTask %s: %d steps, %.1fms>' % (self.name, self.steps, self.time_s * 1000)
+
+    def step(self):
+        if self.generator:
+            try:
+                next(self.generator)
+                return True
+            except StopIteration:
+                return False
+        return bool(self.fn())
+
+    def cancel(self):
+        self.cancelled = True
+        if self.generator:
+            self.generator.close()
+
+
+class IdleScheduler:
+    """Runs IdleTasks until a deadline. Higher priority tasks go first; tasks of
+    equal priority take turns a step at a time. A step isn't started if it's
+    expected to run past the deadline, unless nothing else has run this time, so
+    every task makes progress even if its steps are longer than a frame."""
+
+    def __init__(self):
+        self.queue = [] # (-priority, order, task)
+        self.order = itertools.count()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def add(self, task):
+        heapq.heappush(self.queue, (-task.priority, next(self.order), task))
+        return task
+
+    def tasks(self):
+        return [task for _, _, task in sorted(self.queue)]
+
+    def run(self, deadline):
+        """Runs steps until deadline, a time.time(). Returns the number run."""
+        n_steps = 0
+        while self.queue:
+            _, _, task = self.queue[0]
+            if task.cancelled:
+                heapq.heappop(self.queue)
+                continue
+            start = time.time()
+            if n_steps and start + task.estimate_s > deadline:
+                break
+            heapq.heappop(self.queue)
+            more = task.step()
+            elapsed = time.time() - start
+            task.steps += 1
+            task.time_s += elapsed
+            if task.steps == 1:
+                task.estimate_s = elapsed
+            else:
+                task.estimate_s += task.smoothing * (elapsed - task.estimate_s)
+            n_steps += 1
+            if more and not task.cancelled:
+                self.add(task)
+            elif not task.cancelled:
+                task.done = True
+                if task.done_cb:
+                    task.done_cb()
+        return n_steps
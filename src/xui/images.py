@@ -0,0 +1,246 @@
+"""Decoding and scaling image files on worker threads, and caching the results."""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+
+import pygame
+
+from . import surfaces
+
+
+def image_key(path, size=None):
+    """Returns the cache key for path scaled to size, or as decoded if size is None.
+    Raises OSError if path doesn't exist."""
+    return (path, os.stat(path).st_mtime_ns, size)
+
+
+def fit_size(size, box):
+    """Returns size scaled to fit inside box, keeping its aspect ratio."""
+    width, height = size
+    if not width or not height:
+        return box
+    scale = min(box[0] / width, box[1] / height)
+    return (max(1, round(width * scale)), max(1, round(height * scale)))
+
+
+class ImageCache:
+    """Keeps decoded and scaled images, keyed by (path, mtime, size), and discards
+    the least recently used once their total size exceeds budget bytes."""
+
+    budget = 64 * 1024 * 1024
+
+    def __init__(self):
+        self.entries = OrderedDict() # key -> surface
+        self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def surface_bytes(self, surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def get(self, key):
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+        return surface
+
+    def put(self, key, surface):
+        self.discard(key)
+        n_bytes = self.surface_bytes(surface)
+        if n_bytes > self.budget:
+            return
+        self.entries[key] = surface
+        self.size += n_bytes
+        while self.size > self.budget:
+            _, old = self.entries.popitem(last=False)
+            self.size -= self.surface_bytes(old)
+
+    def discard(self, key):
+        surface = self.entries.pop(key, None)
+        if surface is not None:
+            self.size -= self.surface_bytes(surface)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+class ImageLoader:
+    """Decodes and scales images on a pool of worker threads. Requests for an image
+    that's already being loaded share the one job. Results go into cache, and the
+    requesters are called back on the main thread via App.call_soon_threadsafe()."""
+
+    max_workers = 2
+
+    # Failures remembered; the oldest are forgotten, and so tried again, after that
+    max_failed = 1024
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.executor = None
+        self.pending = {} # key -> callbacks
+        self.futures = {} # key -> future, for images being loaded
+        # (path, mtime) -> exception, for files that couldn't be loaded. Keyed on the
+        # mtime, so a file is tried again once it has been written again.
+        self.failed = OrderedDict()
+
+    def pool(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='xui-image')
+        return self.executor
+
+    def request(self, app, key, cb):
+        """Returns key's image if it's in the cache. Otherwise starts loading it, if
+        it hasn't been already, and returns None; cb(key, surface) is called once it
+        has loaded, with surface None if it couldn't be."""
+        surface = self.cache.get(key)
+        if surface is not None or self.failure(key):
+            return surface
+        if key in self.pending:
+            self.pending[key].append(cb)
+            return None
+        self.pending[key] = [cb]
+        future = self.pool().submit(self.load, key, self.source(key))
+        self.futures[key] = future
+        future.add_done_callback(lambda future: app.call_soon_threadsafe(self.loaded, key, future))
+        return None
+
+    def failure(self, key):
+        """Returns why key's file couldn't be loaded, or None if it hasn't failed."""
+        return self.failed.get(key[:2])
+
+    def cancel(self, key, cb):
+        """Withdraws a request. If nobody else wants the image and it hasn't started
+        loading, it won't be loaded."""
+        callbacks = self.pending.get(key)
+        if callbacks and cb in callbacks:
+            callbacks.remove(cb)
+            if not callbacks and self.futures[key].cancel():
+                del self.pending[key]
+                del self.futures[key]
+
+    def source(self, key):
+        """Returns a cached surface to scale key's image from, or None to load the file."""
+        path, mtime, size = key
+        # Scale from the decoded image if we still have it, rather than decoding again
+        return self.cache.get((path, mtime, None)) if size else None
+
+    def load(self, key, original):
+        # Runs on a worker thread
+        path, mtime, size = key
+        if original is None:
+            original = pygame.image.load(path)
+        if size is None:
+            return original, None
+        if size == original.get_size():
+            return original, original.copy()
+        return original, pygame.transform.smoothscale(original, size)
+
+    def loaded(self, key, future):
+        if self.futures.get(key) is not future:
+            # Cancelled, and perhaps requested again since
+            return
+        del self.futures[key]
+        callbacks = self.pending.pop(key, [])
+        try:
+            original, scaled = future.result()
+        except (OSError, pygame.error) as e:
+            self.failed[key[:2]] = e
+            if len(self.failed) > self.max_failed:
+                self.failed.popitem(last=False)
+            surface = None
+        else:
+            path, mtime, size = key
+            # Decoded images are only scaled from, so needn't be in the display format
+            if original is not None and (path, mtime, None) not in self.cache:
+                self.cache.put((path, mtime, None), original)
+            surface = original
+            if scaled is not None:
+                surface = surfaces.convert(scaled)
+                self.cache.put(key, surface)
+        for cb in callbacks:
+            cb(key, surface)
+
+
+class ThumbnailLoader(ImageLoader):
+    """Makes thumbnails at a fixed set of sizes (mipmap levels), keyed by (path,
+    mtime, level), where level is the length of the thumbnail's longer side.
+
+    A level is scaled down from the nearest larger level already cached if there
+    is one, so zooming out needs no decoding. Decoded images aren't kept. If
+    disk_cache_dir is set, thumbnails made by decoding a file are also saved
+    there, and read back instead of decoding the file again."""
+
+    levels = (32, 64, 128, 256, 512)
+    disk_cache_dir = None
+
+    def level_for(self, size):
+        """Returns the smallest level at least size, to scale a size thumbnail from."""
+        for level in self.levels:
+            if level >= size:
+                return level
+        return self.levels[-1]
+
+    def nearest_cached(self, path, mtime, level):
+        """Returns the cached level nearest to level, preferring larger ones, or None."""
+        larger = [l for l in self.levels if l >= level]
+        smaller = [l for l in self.levels if l < level][::-1]
+        for l in larger + smaller:
+            surface = self.cache.get((path, mtime, l))
+            if surface is not None:
+                return surface
+        return None
+
+    def source(self, key):
+        path, mtime, level = key
+        for l in self.levels:
+            if l > level:
+                surface = self.cache.get((path, mtime, l))
+                if surface is not None:
+                    return surface
+        return None
+
+    def disk_cache_path(self, key):
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_cache_dir, name[:2], name + '.png')
+
+    def load(self, key, source):
+        # Runs on a worker thread
+        path, mtime, level = key
+        disk_path = self.disk_cache_dir and self.disk_cache_path(key)
+        if source is None and disk_path and os.path.exists(disk_path):
+            try:
+                return None, pygame.image.load(disk_path)
+            except pygame.error:
+                pass
+        decoded = source is None
+        if decoded:
+            source = pygame.image.load(path)
+        width, height = source.get_size()
+        if max(width, height) <= level:
+            # Never scale up
+            thumb = source.copy()
+        else:
+            thumb = pygame.transform.smoothscale(source, fit_size((width, height), (level, level)))
+        if decoded and disk_path:
+            self.save_to_disk(disk_path, thumb)
+        return None, thumb
+
+    def save_to_disk(self, disk_path, thumb):
+        try:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            tmp_path = '%s.%d.tmp.png' % (disk_path, os.getpid())
+            pygame.image.save(thumb, tmp_path)
+            os.replace(tmp_path, disk_path)
+        except (OSError, pygame.error):
+            pass
+
+
+image_cache = ImageCache()
+image_loader = ImageLoader(image_cache)
+thumbnail_loader = ThumbnailLoader(image_cache)
@@ -24,3 +24,119 @@ def event_keystroke(event):
         name = KP_MAP[name]
         mods.append('KP')
     return '-'.join(mods + [name.replace(' ', '')])
+
+
+# Keystrokes are compiled to integer codes: the pygame key code shifted left,
+# with a bit for each modifier
+CTRL, ALT, SHIFT = 1, 2, 4
+MOD_BITS = 3
+MOD_PREFIXES = {'CTRL-': CTRL, 'ALT-': ALT, 'SHIFT-': SHIFT}
+
+_code_keystrokes = {} # code -> keystroke string, or None for modifier keys
+_keystroke_keys = None # keystroke name, as in event_keystroke(), -> pygame key
+_class_keymaps = {} # widget class -> compiled keybindings
+
+
+def event_code(event):
+    """Returns event's keystroke code, or None for a modifier keydown. Does the
+    same job as event_keystroke(), but without building a string each time."""
+    mod = event.mod
+    code = (event.key << MOD_BITS) | (
+        (CTRL if mod & pygame.KMOD_CTRL else 0) |
+        (ALT if mod & pygame.KMOD_ALT else 0) |
+        (SHIFT if mod & pygame.KMOD_SHIFT else 0))
+    if code not in _code_keystrokes:
+        code_keystroke(code)
+    return code if _code_keystrokes[code] is not None else None
+
+
+def code_keystroke(code):
+    """Returns the keystroke string that event_keystroke() gives for code."""
+    if code in _code_keystrokes:
+        return _code_keystrokes[code]
+    name = pygame.key.name(code >> MOD_BITS)
+    if name in MOD_KEYS:
+        keystroke = None
+    else:
+        mods = [label for (bit, label) in [(CTRL, 'CTRL'), (ALT, 'ALT'), (SHIFT, 'SHIFT')]
+                if code & bit]
+        if name in KP_MAP:
+            name = KP_MAP[name]
+            mods.append('KP')
+        keystroke = '-'.join(mods + [name.replace(' ', '')])
+    _code_keystrokes[code] = keystroke
+    return keystroke
+
+
+def parse_keystroke(keystroke):
+    """Returns the code for a keystroke string such as 'CTRL-SHIFT-left' or 'KP-enter',
+    as given by event_keystroke()."""
+    global _keystroke_keys
+    if _keystroke_keys is None:
+        _keystroke_keys = {}
+        for attr in dir(pygame):
+            if attr.startswith('K_'):
+                key = getattr(pygame, attr)
+                name = pygame.key.name(key)
+                if name in KP_MAP:
+                    name = 'KP-' + KP_MAP[name]
+                _keystroke_keys.setdefault(name.replace(' ', ''), key)
+    mods = 0
+    rest = keystroke
+    while True:
+        for prefix, bit in MOD_PREFIXES.items():
+            if rest.startswith(prefix) and len(rest) > len(prefix):
+                mods |= bit
+                rest = rest[len(prefix):]
+                break
+        else:
+            break
+    if rest not in _keystroke_keys:
+        raise ValueError('Unknown keystroke %r' % keystroke)
+    return (_keystroke_keys[rest] << MOD_BITS) | mods
+
+
+def add_binding(keymap, keystrokes, action):
+    """Binds keystrokes in keymap, a dict from code to action. keystrokes is a
+    keystroke string, or several separated by spaces for a chord, e.g.
+    'CTRL-x CTRL-s'. Chords are stored as nested keymaps, one level per keystroke."""
+    codes = [parse_keystroke(keystroke) for keystroke in keystrokes.split()]
+    for code in codes[:-1]:
+        if not isinstance(keymap.get(code), dict):
+            keymap[code] = {}
+        keymap = keymap[code]
+    keymap[codes[-1]] = action
+
+
+def compile_keymap(bindings):
+    keymap = {}
+    for keystrokes, action in bindings.items():
+        add_binding(keymap, keystrokes, action)
+    return keymap
+
+
+def merge_keymaps(keymap, overrides):
+    for code, action in overrides.items():
+        if isinstance(action, dict) and isinstance(keymap.get(code), dict):
+            keymap[code] = merge_keymaps(dict(keymap[code]), action)
+        else:
+            keymap[code] = action
+    return keymap
+
+
+def class_keymap(cls):
+    """Returns the compiled keybindings of cls: its own keybindings attribute
+    merged over those of its base classes."""
+    keymap = _class_keymaps.get(cls)
+    if keymap is None:
+        keymap = {}
+        for base in reversed(cls.__mro__):
+            if 'keybindings' in base.__dict__:
+                merge_keymaps(keymap, compile_keymap(base.keybindings))
+        _class_keymaps[cls] = keymap
+    return keymap
+
+
+def keybindings_updated():
+    """Call after changing a class's keybindings attribute."""
+    _class_keymaps.clear()
@@ -0,0 +1,85 @@
+class ListModel:
+    """A list of items that tells its listeners exactly what changed, so views
+    can update just the affected rows instead of reprocessing the whole list.
+
+    Listeners may implement any of the following, each of which is called
+    after the change has been made:
+
+        items_inserted(model, i, n)    -- model[i:i + n] are new
+        items_removed(model, i, items) -- items used to be at model[i:i + len(items)]
+        item_moved(model, src, dst)    -- the item at src is now at dst
+        item_updated(model, i, old)    -- model[i] replaced old
+        model_reset(model)             -- anything may have changed
+    """
+
+    def __init__(self, items=None):
+        self.items = list(items or [])
+        self.listeners = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def notify(self, event, *args):
+        for listener in self.listeners:
+            fn = getattr(listener, event, None)
+            if fn:
+                fn(self, *args)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, item):
+        return item in self.items
+
+    def index(self, item):
+        return self.items.index(item)
+
+    def insert(self, i, item):
+        if i < 0:
+            i = max(0, i + len(self.items))
+        i = min(i, len(self.items))
+        self.items.insert(i, item)
+        self.notify('items_inserted', i, 1)
+
+    def append(self, item):
+        self.insert(len(self.items), item)
+
+    def extend(self, items):
+        i = len(self.items)
+        self.items.extend(items)
+        if len(self.items) > i:
+            self.notify('items_inserted', i, len(self.items) - i)
+
+    def pop(self, i=-1):
+        if i < 0:
+            i += len(self.items)
+        item = self.items.pop(i)
+        self.notify('items_removed', i, [item])
+        return item
+
+    def remove(self, item):
+        self.pop(self.items.index(item))
+
+    def move(self, src, dst):
+        if src == dst:
+            return
+        self.items.insert(dst, self.items.pop(src))
+        self.notify('item_moved', src, dst)
+
+    def update(self, i, item):
+        old = self.items[i]
+        self.items[i] = item
+        self.notify('item_updated', i, old)
+
+    def reset(self, items):
+        self.items = list(items)
+        self.notify('model_reset')
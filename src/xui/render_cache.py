@@ -0,0 +1,70 @@
+from collections import OrderedDict
+import weakref
+
+import pygame
+
+
+class RenderCache:
+    """Keeps the last rendering of widgets with cache_render set, so that when a
+    parent redraws, an unchanged widget can be blitted back instead of drawn again.
+
+    Holds at most one rendering per widget, and discards the least recently used
+    renderings once their total size exceeds budget bytes. Widgets are only weakly
+    referenced, so a rendering is dropped as soon as its widget is."""
+
+    budget = 32 * 1024 * 1024
+
+    def __init__(self):
+        # weakref to widget -> (key, surface). A live weakref hashes and compares
+        # as its widget does, so weakref.ref(widget) finds the entry.
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def surface_bytes(self, surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def get(self, widget, key):
+        ref = weakref.ref(widget)
+        entry = self.entries.get(ref)
+        if entry is None or entry[0] != key:
+            return None
+        self.entries.move_to_end(ref)
+        return entry[1]
+
+    def put(self, widget, key, surface):
+        self.discard(widget)
+        n_bytes = self.surface_bytes(surface)
+        if n_bytes > self.budget:
+            return
+        self.entries[weakref.ref(widget, self.remove)] = (key, surface.copy())
+        self.size += n_bytes
+        while self.size > self.budget:
+            _, (_, old) = self.entries.popitem(last=False)
+            self.size -= self.surface_bytes(old)
+
+    def discard(self, widget):
+        self.remove(weakref.ref(widget))
+
+    def remove(self, ref):
+        # Also called back when a widget we hold a rendering of is collected
+        entry = self.entries.pop(ref, None)
+        if entry:
+            self.size -= self.surface_bytes(entry[1])
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def restore(self, canvas, surface, cached):
+        if surface.get_flags() & pygame.SRCALPHA:
+            # A normal blit would blend the cached pixels with what's already there
+            canvas.fill(surface, (0, 0, 0, 0))
+            canvas.blit(surface, cached, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        else:
+            canvas.blit(surface, cached, (0, 0))
+
+
+render_cache = RenderCache()
@@ -0,0 +1,167 @@
+"""Recording and replaying of input events, for benchmarking real sessions.
+
+    with Recorder(app, 'session.jsonl.gz'):
+        app.run()
+
+records the events the app handles, with their times, to a gzipped file of JSON
+lines. Later, possibly with a newer version of the library,
+
+    replayer = Replayer(app, 'session.jsonl.gz')
+    replayer.run()
+    print(replayer.format_report())
+
+feeds the same events to an app with the same windows, as fast as it can, and
+reports how long each event and each frame took to handle and draw. Timers run
+off the replayer's virtual clock, so they fire at the same point relative to the
+events however fast the replay runs. The app may be headless."""
+from collections import defaultdict
+import gzip
+import json
+import time
+
+import pygame
+import pygame.locals
+
+FORMAT_VERSION = 1
+
+
+def _jsonable(value):
+    if isinstance(value, (bool, int, float, str)) or value is None:
+        return True
+    if isinstance(value, (tuple, list)):
+        return all(_jsonable(v) for v in value)
+    return False
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Recorder:
+    # Timer events aren't recorded, as the replayed app's timers make their own
+    event_types = {
+        pygame.locals.QUIT,
+        pygame.locals.KEYDOWN,
+        pygame.locals.MOUSEBUTTONDOWN,
+        pygame.locals.MOUSEBUTTONUP,
+        pygame.locals.MOUSEMOTION,
+        pygame.locals.WINDOWFOCUSGAINED,
+        pygame.locals.WINDOWSHOWN,
+    }
+
+    def __init__(self, app, path):
+        self.app = app
+        self.file = gzip.open(path, 'wt')
+        self.t0 = time.time()
+        self.write({'version': FORMAT_VERSION, 'size': app.screen.size,
+                    'framerate': app.framerate})
+        app.recorder = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, obj):
+        self.file.write(json.dumps(obj, separators=(',', ':')) + '\n')
+
+    def record(self, event):
+        if event.type not in self.event_types:
+            return
+        # Drop attributes such as the SDL window, which can't be replayed anyway
+        attrs = {k: v for k, v in event.dict.items() if _jsonable(v)}
+        self.write([round(time.time() - self.t0, 4), event.type, attrs])
+
+    def close(self):
+        if self.app.recorder is self:
+            self.app.recorder = None
+        self.file.close()
+
+
+class Replayer:
+    def __init__(self, app, path):
+        self.app = app
+        with gzip.open(path, 'rt') as f:
+            self.header = json.loads(f.readline())
+            self.events = [json.loads(line) for line in f]
+        self.event_times = defaultdict(list) # event type -> seconds taken by each
+        self.frame_times = []
+
+    def make_event(self, event_type, attrs):
+        attrs = {k: tuple(v) if isinstance(v, list) else v for k, v in attrs.items()}
+        return pygame.event.Event(event_type, **attrs)
+
+    def run(self):
+        """Replays the events, then runs the app's timers off the real clock again."""
+        app = self.app
+        frame_s = 1 / app.framerate
+        base = time.time()
+        now = base
+        events = self.events
+        i = 0
+        app.virtual_time = now
+        try:
+            app.update()
+            while i < len(events) and not app.exiting:
+                # Skip ahead to whichever comes first: the next event or the next timer
+                next_t = base + events[i][0]
+                if app.timers:
+                    next_t = min(next_t, app.timers[0][0])
+                now = max(now, next_t)
+                app.virtual_time = now
+                frame_start = time.perf_counter()
+                while i < len(events) and base + events[i][0] <= now:
+                    event_type, attrs = events[i][1:]
+                    event = self.make_event(event_type, attrs)
+                    start = time.perf_counter()
+                    app.handle_event(event)
+                    self.event_times[event_type].append(time.perf_counter() - start)
+                    i += 1
+                app.check_timers()
+                app.update()
+                self.frame_times.append(time.perf_counter() - frame_start)
+                now += frame_s
+        finally:
+            # The virtual clock has run ahead of the real one; keep the timers set
+            # during the replay the same distance from now on the real clock
+            delta = time.time() - app.virtual_time
+            app.virtual_time = None
+            app.shift_timers(delta)
+        app.check_timers()
+
+    def summary(self, times):
+        times = sorted(times)
+        if not times:
+            return {'count': 0}
+        return {
+            'count': len(times),
+            'mean_ms': 1000 * sum(times) / len(times),
+            'p50_ms': 1000 * _percentile(times, .5),
+            'p95_ms': 1000 * _percentile(times, .95),
+            'max_ms': 1000 * times[-1],
+        }
+
+    def report(self):
+        """Returns timings for the events, by event type, and for the frames, which
+        include handling their events and timers, laying out and drawing."""
+        all_events = [t for times in self.event_times.values() for t in times]
+        return {
+            'events': self.summary(all_events),
+            'event_types': {pygame.event.event_name(event_type): self.summary(times)
+                            for event_type, times in self.event_times.items()},
+            'frames': self.summary(self.frame_times),
+        }
+
+    def format_report(self):
+        report = self.report()
+        rows = [('events', report['events'])]
+        rows += sorted(report['event_types'].items())
+        rows.append(('frames', report['frames']))
+        lines = ['%-20s %7s %9s %9s %9s %9s' % ('', 'count', 'mean ms', 'p50 ms', 'p95 ms', 'max ms')]
+        for name, summary in rows:
+            if summary['count']:
+                lines.append('%-20s %7d %9.3f %9.3f %9.3f %9.3f' % (
+                    name, summary['count'], summary['mean_ms'], summary['p50_ms'],
+                    summary['p95_ms'], summary['max_ms']))
+        return '\n'.join(lines)
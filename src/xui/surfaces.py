@@ -0,0 +1,101 @@
+"""Allocation and conversion of surfaces.
+
+Blitting between surfaces of different pixel formats makes SDL convert every pixel
+on every blit. Surfaces made here are converted to the display's format once, up
+front: opaque ones with convert() and translucent ones with convert_alpha(). Until
+a display mode has been set there is no display format, so surfaces are left as
+they are."""
+from collections import Counter, OrderedDict
+
+import pygame
+
+from . import fonts
+
+# Counts of surfaces made and converted, and of text cache hits and misses
+stats = Counter()
+
+# Number of rendered strings kept by render_text()
+text_cache_size = 2048
+
+_text_cache = OrderedDict()
+
+
+def is_opaque(color):
+    return color is not None and pygame.Color(color).a == 255
+
+
+def convert(surface):
+    """Returns surface in the display's format, keeping per-pixel alpha if it has it."""
+    if not pygame.display.get_surface():
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        stats['convert_alpha'] += 1
+        return surface.convert_alpha()
+    stats['convert'] += 1
+    return surface.convert()
+
+
+def new_surface(size, bgcolor=None):
+    """Returns a surface for drawing on. It is opaque if bgcolor is, since then
+    whatever is drawn will cover it completely; otherwise it has per-pixel alpha."""
+    if is_opaque(bgcolor):
+        stats['opaque'] += 1
+        return convert(pygame.Surface(size))
+    stats['alpha'] += 1
+    return convert(pygame.Surface(size, pygame.SRCALPHA))
+
+
+def surface_fits(surface, size, bgcolor=None):
+    """Returns whether surface can be reused where new_surface(size, bgcolor) is wanted."""
+    if not surface or surface.get_size() != size or surface.get_parent() is not None:
+        return False
+    return bool(surface.get_flags() & pygame.SRCALPHA) != is_opaque(bgcolor)
+
+
+def _color_key(color):
+    # Colours from settings files may be lists, and pygame.Colors aren't hashable
+    return tuple(color) if isinstance(color, (list, pygame.Color)) else color
+
+
+def render_text(font, size, text, color, bgcolor=None):
+    """Renders text with fonts.get_font(font, size), converted to the display's
+    format. Recently rendered strings are kept, so callers must not draw on the result."""
+    key = (font, size, text, _color_key(color), _color_key(bgcolor))
+    surface = _text_cache.get(key)
+    if surface is not None:
+        stats['text_hit'] += 1
+        _text_cache.move_to_end(key)
+        return surface
+    stats['text_miss'] += 1
+    font_obj = fonts.get_font(font, size)
+    surface = convert(font_obj.render(text, True, color, bgcolor=bgcolor))
+    _text_cache[key] = surface
+    if len(_text_cache) > text_cache_size:
+        _text_cache.popitem(last=False)
+    return surface
+
+
+def describe(surface):
+    """Describes surface's pixel format, for format_stats()."""
+    display = pygame.display.get_surface()
+    alpha = 'alpha' if surface.get_flags() & pygame.SRCALPHA else 'opaque'
+    if display is None:
+        native = 'no display'
+    elif (surface.get_bitsize(), surface.get_masks()) == (display.get_bitsize(), display.get_masks()):
+        native = 'display format'
+    else:
+        native = 'other format'
+    return '%d-bit %s, %s' % (surface.get_bitsize(), alpha, native)
+
+
+def format_stats(widget):
+    """Counts the pixel formats of the surfaces that widget and its descendants own
+    (subsurfaces share their parent's surface, so aren't counted)."""
+    counts = Counter()
+    def walk(widget):
+        if widget.surface and widget.surface.get_parent() is None:
+            counts[describe(widget.surface)] += 1
+        for child in widget.children:
+            walk(child)
+    walk(widget)
+    return counts
@@ -1,16 +1,53 @@
 import os
 
 import pygame
+from . import keys
+from .canvas import Canvas
 from .mouse import MOUSE_BUTTONS
+from .render_cache import render_cache
+from . import surfaces
 
 DEBUG = os.environ.get('DEBUG')
 
 UNLIMITED = (1 << 32) - 1
 
 
+# What widgets that aren't on a screen draw with; see Widget.canvas
+detached_canvas = Canvas()
+
+
 class LayoutError(Exception):
     pass
 
+
+# All the settings passed to apply_init_settings(), for widget classes defined later
+_init_settings = {}
+
+
+def update_init_settings(cls, settings):
+    """Arranges for new instances of this class and its subclasses
+    to be created with the specified settings by default."""
+    relevant = {k: v for k, v in settings.items() if k.islower()}
+    if cls.__name__ in settings:
+        relevant |= settings[cls.__name__]
+    for k, v in relevant.items():
+        if hasattr(cls, k):
+            setattr(cls, k, v)
+    for subcls in cls.__subclasses__():
+        update_init_settings(subcls, settings)
+
+
+def apply_init_settings(settings):
+    """Like update_init_settings(Widget, settings), but also applies to widget
+    classes that haven't been imported yet."""
+    for k, v in settings.items():
+        if isinstance(v, dict) and isinstance(_init_settings.get(k), dict):
+            _init_settings[k] = _init_settings[k] | v
+        else:
+            _init_settings[k] = v
+    update_init_settings(Widget, settings)
+
+
 class Widget:
     supports_viewport = False
     fixed_width = False
@@ -21,6 +58,8 @@ class Widget:
     width = 0
     height = 0
 
+    parent = None
+
     halign = None
     valign = None
     child_halign = None
@@ -32,6 +71,17 @@ class Widget:
     enabled = True
     hide = False
 
+    # Keep our last rendering and blit it back when a parent redraws and nothing in
+    # our subtree has changed. Worth setting on complex, rarely changing widgets that
+    # sit on a plain background.
+    cache_render = False
+
+
+    # Keystroke (or space-separated chord) -> action, where an action is a method
+    # name, or a tuple of a method name and its arguments. Merged with the base
+    # classes' keybindings, and compiled once per class; see keys.class_keymap().
+    keybindings = {}
+
     # Default settings (not all widgets use all of these)
     color = 'white'
     bgcolor = None
@@ -42,6 +92,11 @@ class Widget:
     font_size = 20
 
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if _init_settings:
+            update_init_settings(cls, _init_settings)
+
     def __init__(self, children=None, enabled=True, **kwargs):
         self.children = children or []
         self.parent = None
@@ -55,10 +110,13 @@ class Widget:
         self._laid_out = None
         self._redraw = True
         self.root = self
+        self.keymap = None # our own compiled keybindings, checked before our class's
         for k, v in kwargs.items():
             if not hasattr(self, k):
                 raise Exception("%s does not have attribute %r" % (type(self).__name__, k))
             setattr(self, k, v)
+        if 'keybindings' in kwargs:
+            self.keymap = keys.compile_keymap(self.keybindings)
         self.mouse_in_children = set()
         self.mouse_down_child = {button: None for button in MOUSE_BUTTONS.values()}
         self.has_mouse_focus = False
@@ -80,6 +138,8 @@ class Widget:
                 setattr(self, k, v)
 
     def apply_settings(self, settings):
+        if self.cache_render:
+            render_cache.discard(self)
         self._apply_settings(settings)
         self.apply_child_settings(settings)
         self.settings_updated()
@@ -115,6 +175,9 @@ class Widget:
     def cancel_call(self, token):
         self.root.app.cancel_call(token)
 
+    def animate(self, duration, easing='in_out', delay=0, done_cb=None, **attrs):
+        return self.root.app.animate(self, duration, easing, delay, done_cb, **attrs)
+
     def focus(self):
         self.log("Focus %r" % (self,))
         old_focus = self.root.focus_widget
@@ -144,8 +207,33 @@ class Widget:
         pass
 
     def handle_keydown(self, event, keystroke):
+        """Called for keystrokes that have no keybinding."""
         return False
 
+    def bind_key(self, keystrokes, action):
+        """Binds keystrokes (e.g. 'CTRL-s' or 'CTRL-x CTRL-s') for this widget only.
+        action may also be a function, which is called without arguments."""
+        if self.keymap is None:
+            self.keymap = {}
+        keys.add_binding(self.keymap, keystrokes, action)
+
+    def key_action(self, code):
+        if self.keymap:
+            action = self.keymap.get(code)
+            if action is not None:
+                return action
+        return keys.class_keymap(type(self)).get(code)
+
+    def run_keybinding(self, action, event):
+        """Carries out a keybinding's action. As with handle_keydown(), the action
+        may return False to pass the keystroke on, or a widget to delegate it to."""
+        if callable(action):
+            return action()
+        if isinstance(action, str):
+            return getattr(self, action)()
+        name, *args = action
+        return getattr(self, name)(*args)
+
     def mouse_rel_pos(self, pos):
         if pos is None:
             return None
@@ -250,6 +338,31 @@ class Widget:
         for child in self.children:
             child.resolve_tree(self)
 
+    def resolve_size(self):
+        pass
+
+    def invalidate_size(self):
+        """Arranges for resolve_size() to be called and for us to be laid out again.
+        During a batch (see Screen.batch) resolve_size() is deferred until the batch
+        ends, and called only once however many times we were invalidated."""
+        if not self.root.defer_resolve_size(self):
+            self.resolve_size()
+        self.relayout()
+
+    @property
+    def canvas(self):
+        """What we draw with: our screen's Canvas or DisplayList; see App.display_list."""
+        root = self.root
+        return detached_canvas if root is self else root.canvas
+
+    def defer_resolve_size(self, widget):
+        # Only a Screen batches updates
+        return False
+
+    def flush_before_update(self, widget):
+        # Only a Screen has updates; until widget is on one, it must flush itself
+        pass
+
     def width_updated(self):
         pass
 
@@ -315,12 +428,15 @@ class Widget:
             '  ' * self.depth, type(self).__name__, self.rect.topleft, self.rect.size))
         if self.parent:
             self.rel_rect = self.rect.move(-self.parent.rect.left, -self.parent.rect.top)
-        for child in self.children:
-            child.finalise_layout()
+        self.finalise_children()
         if self.rect != old_rect:
             (self.parent or self).redraw()
         self._laid_out = self.children.copy()
 
+    def finalise_children(self):
+        for child in self.children:
+            child.finalise_layout()
+
     def setup_surface(self):
         for child in self.children:
             if child.viewport:
@@ -329,18 +445,32 @@ class Widget:
                     rect.size = child.viewport.size
                     child.surface = self.surface.subsurface(rect)
                 else:
-                    child.surface = pygame.Surface(child.rect.size, pygame.SRCALPHA)
+                    child.surface = surfaces.new_surface(child.rect.size, child.bgcolor)
             else:
                 child.surface = self.surface.subsurface(child.rel_rect)
             child.setup_surface()
 
     def redraw(self):
         self._redraw = True
+        if len(render_cache):
+            # Our ancestors' cached renderings include us
+            widget = self
+            while widget:
+                if widget.cache_render:
+                    render_cache.discard(widget)
+                widget = widget.parent
         if self.viewport:
             self.parent.redraw()
 
     def relayout(self):
         self._laid_out = None
+        if self.parent:
+            self.parent.child_relayout(self)
+
+    def child_relayout(self, child):
+        """Called when child, or one of its descendants, is relaid out."""
+        if self.parent:
+            self.parent.child_relayout(self)
 
     def needs_layout(self):
         if self._laid_out != self.children:
@@ -352,25 +482,52 @@ class Widget:
             return [self]
         return [widget for child in self.children for widget in child.to_redraw()]
 
+    def inherited_bgcolor(self):
+        widget = self
+        while widget.bgcolor is None and widget.parent:
+            widget = widget.parent
+        return widget.bgcolor
+
+    def render_key(self):
+        # Our cached rendering is only valid if it would still look the same
+        viewport = self.viewport and self.viewport.topleft
+        return (self.surface.get_size(), viewport, self.inherited_bgcolor(), self.enabled)
+
+    def paint(self):
+        """Draws us, or blits back our cached rendering if we have one and nothing
+        has changed since."""
+        if not self.cache_render:
+            self.draw()
+            return
+        key = self.render_key()
+        cached = None if self._redraw else render_cache.get(self, key)
+        if cached:
+            render_cache.restore(self.canvas, self.surface, cached)
+        else:
+            self.draw()
+            self.canvas.flush()
+            render_cache.put(self, key, self.surface)
+
     def render_text(self, text, font=None, size=None, color=None, bgcolor=None):
-        font_obj = pygame.font.SysFont(font or self.font, size or self.font_size)
+        """Returns text rendered in our font and colour. The surface may be shared
+        with other callers, so copy it before drawing on it."""
         if color is None:
             color = self.color if self.enabled else self.disabled_color
-        return font_obj.render(text, True, color, bgcolor=bgcolor)
+        return surfaces.render_text(font or self.font, size or self.font_size, text, color, bgcolor)
 
     def draw(self):
         if self.bgcolor:
-            self.surface.fill(self.bgcolor)
+            self.canvas.fill(self.surface, self.bgcolor)
         elif self.viewport and not self.supports_viewport:
             # In this mode we have our own surface so must clear previous contents before drawing
-            self.surface.fill((0, 0, 0, 0))
+            self.canvas.fill(self.surface, (0, 0, 0, 0))
         for child in self.children:
             if not child.hide:
-                child.draw()
+                child.paint()
                 if child.viewport and not child.supports_viewport:
-                    self.surface.blit(child.surface, child.rel_rect, child.viewport)
+                    self.canvas.blit(self.surface, child.surface, child.rel_rect, child.viewport)
         if self.border_thickness:
             rect = self.surface.get_rect()
             color = self.border_color or self.color
-            pygame.draw.rect(self.surface, color, rect, self.border_thickness)
+            self.canvas.rect(self.surface, color, rect, self.border_thickness)
         self._redraw = False
@@ -1,12 +1,41 @@
+import importlib
+
 from ..widget import Widget
 
-from .layout import HBox, VBox, GridBox, HSpacer, VSpacer
-from .scroll import ScrollArea
-from .label import Label
-from .line_edit import LineEdit
-from .dropdown import Dropdown
-from .button import Button, IconButton, PushButton, CheckBox, RadioButtonGroup
-from .button import DropdownButton, XButton, UpButton, DownButton, PlusButton, MinusButton
-from .combobox import ComboBox
-from .shapes import HBar, VBar, Square
-from .text_area import TextArea
+# Widget classes are imported from their modules when first used, so that
+# importing xui.widgets doesn't import every widget
+_modules = {
+    'HBox': 'layout', 'VBox': 'layout', 'GridBox': 'layout', 'HSpacer': 'layout', 'VSpacer': 'layout',
+    'ScrollArea': 'scroll',
+    'Label': 'label',
+    'LineEdit': 'line_edit',
+    'Dropdown': 'dropdown',
+    'Button': 'button', 'IconButton': 'button', 'PushButton': 'button', 'CheckBox': 'button',
+    'RadioButtonGroup': 'button', 'DropdownButton': 'button', 'XButton': 'button',
+    'UpButton': 'button', 'DownButton': 'button', 'PlusButton': 'button', 'MinusButton': 'button',
+    'ComboBox': 'combobox',
+    'HBar': 'shapes', 'VBar': 'shapes', 'Square': 'shapes',
+    'TextArea': 'text_area',
+    'ListView': 'list_view',
+    'DataGrid': 'data_grid',
+    'Image': 'image',
+    'ThumbnailGrid': 'thumbnail_grid',
+    'Plot': 'plot',
+    'LogView': 'log_view',
+    'TreeView': 'tree_view',
+}
+
+__all__ = ['Widget'] + list(_modules)
+
+
+def __getattr__(name):
+    module = _modules.get(name)
+    if module is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,10 +1,17 @@
+from collections import OrderedDict
 from functools import partial
+
 import pygame
 
+from .. import surfaces
 from ..widget import Widget
 from .label import Label
 
 class Button(Widget):
+    # Redraw whenever the mouse enters or leaves, rather than only while clicked.
+    # Only needed by buttons that draw a hover effect.
+    hover_redraw = True
+
     def __init__(self, click_cb=None, **kwargs):
         self.click_cb = click_cb
         self.clicked = False
@@ -25,30 +32,73 @@ class Button(Widget):
 
     def handle_mouse_enter(self):
         super().handle_mouse_enter()
-        self.redraw()
+        if self.clicked or self.hover_redraw:
+            self.redraw()
 
     def handle_mouse_exit(self):
         super().handle_mouse_exit()
-        self.redraw()
+        if self.clicked or self.hover_redraw:
+            self.redraw()
 
 
 class IconButton(Button):
     fixed_width = True
     fixed_height = True
+    hover_redraw = False
+
+    # Draw the border and icon once per sprite_key() and blit them thereafter.
+    # Turn off for icons that depend on state that sprite_key() doesn't include.
+    cache_icon = True
+
+    # sprite_key() -> surface, shared by all icon buttons; the least recently
+    # used are dropped once there are more than sprite_cache_size
+    sprites = OrderedDict()
+    sprite_cache_size = 256
 
     def draw_icon(self, color):
         pass
 
+    def sprite_key(self, border_color, icon_color):
+        """Identifies what draw_border_and_icon() would draw. Subclasses whose icons
+        depend on more than these should extend the key."""
+        return (type(self), self.size, border_color, icon_color)
+
+    def draw_border_and_icon(self, border_color, icon_color):
+        self.canvas.rect(self.surface, border_color, self.surface.get_rect(), 1)
+        self.draw_icon(icon_color)
+
+    def render_sprite(self, border_color, icon_color):
+        sprite = surfaces.new_surface(self.size)
+        # Point draw_icon() at the sprite, so overrides work without changes
+        surface, self.surface = self.surface, sprite
+        try:
+            self.draw_border_and_icon(border_color, icon_color)
+        finally:
+            self.surface = surface
+        return sprite
+
     def draw(self):
         super().draw()
         border_color = self.disabled_color if not self.enabled else self.color
         icon_color = self.highlight_color if self.clicked else border_color
-        pygame.draw.rect(self.surface, border_color, self.surface.get_rect(), 1)
-        self.draw_icon(icon_color)
+        if not self.cache_icon:
+            self.draw_border_and_icon(border_color, icon_color)
+            return
+        key = self.sprite_key(border_color, icon_color)
+        sprites = self.sprites
+        sprite = sprites.get(key)
+        if sprite is None:
+            sprite = sprites[key] = self.render_sprite(border_color, icon_color)
+            if len(sprites) > self.sprite_cache_size:
+                sprites.popitem(last=False)
+        else:
+            sprites.move_to_end(key)
+        self.canvas.blit(self.surface, sprite, (0, 0))
 
 
 class PushButton(Button):
     margin = 5
+    hover_redraw = False
 
     def __init__(self, text, **kwargs):
         self.label = Label(text)
@@ -67,7 +117,7 @@ class PushButton(Button):
         color = (self.disabled_color if not self.enabled
                  else self.highlight_color if self.clicked
                  else self.color)
-        pygame.draw.rect(self.surface, color, self.surface.get_rect(), 2)
+        self.canvas.rect(self.surface, color, self.surface.get_rect(), 2)
 
 
 class CheckBox(Button):
@@ -92,7 +142,7 @@ class CheckBox(Button):
     def draw_checkmark(self, color):
         m = self.margin
         rect = pygame.Rect(m, m, self.width - 2 * m, self.height - 2 * m)
-        pygame.draw.rect(self.surface, color, rect)
+        self.canvas.rect(self.surface, color, rect)
 
 
 class RadioButtonGroup:
@@ -129,7 +179,7 @@ class DropdownButton(IconButton):
         x2 = x0 * 3
         y0 = self.height / 4
         y1 = y0 * 3
-        pygame.draw.polygon(self.surface, color, [(x0, y0), (x2, y0), (x1, y1)])
+        self.canvas.polygon(self.surface, color, [(x0, y0), (x2, y0), (x1, y1)])
 
 
 class XButton(IconButton):
@@ -138,8 +188,8 @@ class XButton(IconButton):
         x1 = x0 * 3
         y0 = self.height // 4
         y1 = y0 * 3
-        pygame.draw.line(self.surface, color,  (x0, y0), (x1, y1), 3)
-        pygame.draw.line(self.surface, color,  (x0, y1), (x1, y0), 3)
+        self.canvas.line(self.surface, color,  (x0, y0), (x1, y1), 3)
+        self.canvas.line(self.surface, color,  (x0, y1), (x1, y0), 3)
 
 
 class UpButton(IconButton):
@@ -150,9 +200,9 @@ class UpButton(IconButton):
         y0 = self.height // 4
         y1 = y0 * 2
         y2 = y0 * 3
-        pygame.draw.line(self.surface, color,  (x1, y0), (x1, y2), 3)
-        pygame.draw.line(self.surface, color,  (x0, y1), (x1, y0), 3)
-        pygame.draw.line(self.surface, color,  (x2, y1), (x1, y0), 3)
+        self.canvas.line(self.surface, color,  (x1, y0), (x1, y2), 3)
+        self.canvas.line(self.surface, color,  (x0, y1), (x1, y0), 3)
+        self.canvas.line(self.surface, color,  (x2, y1), (x1, y0), 3)
 
 
 class DownButton(IconButton):
@@ -163,9 +213,9 @@ class DownButton(IconButton):
         y0 = self.height // 4
         y1 = y0 * 2
         y2 = y0 * 3
-        pygame.draw.line(self.surface, color,  (x1, y0), (x1, y2), 3)
-        pygame.draw.line(self.surface, color,  (x0, y1), (x1, y2), 3)
-        pygame.draw.line(self.surface, color,  (x2, y1), (x1, y2), 3)
+        self.canvas.line(self.surface, color,  (x1, y0), (x1, y2), 3)
+        self.canvas.line(self.surface, color,  (x0, y1), (x1, y2), 3)
+        self.canvas.line(self.surface, color,  (x2, y1), (x1, y2), 3)
 
 
 class PlusButton(IconButton):
@@ -176,8 +226,8 @@ class PlusButton(IconButton):
         y0 = self.height // 4
         y1 = y0 * 2
         y2 = y0 * 3
-        pygame.draw.line(self.surface, color, (x0, y1), (x2, y1))
-        pygame.draw.line(self.surface, color, (x1, y0), (x1, y2))
+        self.canvas.line(self.surface, color, (x0, y1), (x2, y1))
+        self.canvas.line(self.surface, color, (x1, y0), (x1, y2))
 
 
 class MinusButton(IconButton):
@@ -185,4 +235,4 @@ class MinusButton(IconButton):
         x0 = self.width // 4
         x1 = x0 * 3
         y = self.height // 2
-        pygame.draw.line(self.surface, color, (x0, y), (x1, y))
+        self.canvas.line(self.surface, color, (x0, y), (x1, y))
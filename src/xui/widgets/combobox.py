@@ -15,9 +15,12 @@ class ComboBox(HBox):
         self.button = DropdownButton(self.open_cb)
         super().__init__([self.label, self.button], **kwargs)
         self.dropdown = Dropdown(self, commit_cb=self.choice_updated, text_padding=self.text_padding)
-        self.set_choices(choices, choice_i)
+        self.dropdown.model.add_listener(self)
+        self.set_choices([] if choices is None else choices, choice_i)
 
     def refresh_label(self):
+        self.n_chars = self.dropdown.max_choice_len
+        self.label_choice_i = self.dropdown.choice_i
         text = self.dropdown.choice or ''
         pad = ' ' * self.text_padding
         self.label.set_text(pad + text.ljust(self.n_chars) + pad)
@@ -30,8 +33,11 @@ class ComboBox(HBox):
         self.set_choice_i(self.dropdown.choices.index(choice))
 
     def set_choices(self, choices, choice_i=None):
-        self.n_chars = max(map(len, choices)) if choices else 0
+        """Sets the available choices. choices may be a list or a ListModel; changes
+        made through a ListModel are applied incrementally."""
+        self.dropdown.model.remove_listener(self)
         self.dropdown.set_choices(choices)
+        self.dropdown.model.add_listener(self)
         if choices and choice_i is None:
             choice_i = 0
         self.set_choice_i(choice_i)
@@ -42,19 +48,36 @@ class ComboBox(HBox):
             self.commit_cb(choice_i)
 
     def add_choice(self, choice):
-        self.set_choices(self.choices + [choice], self.choice_i)
+        self.dropdown.model.append(choice)
 
     def remove_choice(self, choice):
-        choices = [c for c in self.dropdown.choices if c != choice]
-        old_choice = self.dropdown.choice
-        was_selected = choice == old_choice
-        if was_selected:
-            choice_i = None if not choices else min(self.dropdown.choice_i, len(choices) - 1)
-        else:
-            choice_i = choices.index(old_choice)
-        self.set_choices(choices, choice_i)
-        if was_selected:
-            self.choice_updated(choice_i)
+        model = self.dropdown.model
+        while choice in model:
+            model.remove(choice)
+
+    # ListModel listener interface. The dropdown body has already updated the
+    # selection and longest choice length by the time these are called.
+    def items_inserted(self, model, i, n):
+        self.refresh_label()
+
+    def items_removed(self, model, i, items):
+        old_choice_i = self.label_choice_i
+        self.refresh_label()
+        if old_choice_i is not None and i <= old_choice_i < i + len(items):
+            self.choice_updated(self.choice_i)
+
+    def item_moved(self, model, src, dst):
+        self.refresh_label()
+
+    def item_updated(self, model, i, old):
+        self.refresh_label()
+
+    def model_reset(self, model):
+        self.refresh_label()
+
+    @property
+    def model(self):
+        return self.dropdown.model
 
     @property
     def choice(self):
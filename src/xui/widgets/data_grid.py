@@ -0,0 +1,297 @@
+from bisect import bisect_right
+from itertools import accumulate, islice
+from numbers import Number
+
+import pygame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from ..widget import Widget
+from .scroll import ScrollArea
+
+
+class DataGridBody(Widget):
+    supports_viewport = True
+
+    bgcolor = (0, 0, 0)
+    header_color = 'white'
+    header_bgcolor = (64, 64, 64)
+    selected_color = (0, 0, 192)
+    grid_color = (48, 48, 48)
+
+    # Pixels between columns
+    spacing = 12
+
+    # Rows examined when working out column widths that weren't given
+    width_sample = 1000
+
+    def __init__(self, columns, headers=None, col_widths=None, select_cb=None):
+        self.select_cb = select_cb
+        self.sort_col = None
+        self.sort_reverse = False
+        self.mask = None
+        self.selected = None
+        self.cell_cache = {}
+        super().__init__()
+        self.resolve_size()
+        self.set_columns(columns, headers, col_widths)
+
+    def settings_updated(self):
+        self.cell_cache = {}
+        self.resolve_size()
+        self.update_size()
+
+    def resolve_size(self):
+        self.char_width, self.char_height = self.render_text(' ').get_size()
+
+    def set_columns(self, columns, headers=None, col_widths=None):
+        """Shows columns, a list of equal-length sequences (lists, array.arrays or
+        numpy arrays), with the given header for each. col_widths gives each column's
+        width in characters; any that are None are worked out from the header and
+        the first width_sample values."""
+        self.columns = list(columns)
+        self.n_data_rows = len(self.columns[0]) if self.columns else 0
+        self.headers = list(headers) if headers else [''] * len(self.columns)
+        self._arrays = {}
+        self.cell_cache = {}
+        self.right_align = [self.is_numeric(col) for col in self.columns]
+        col_widths = col_widths or [None] * len(self.columns)
+        self.col_chars = [n if n is not None else self.measure_column(i)
+                          for i, n in enumerate(col_widths)]
+        self.sort_col = None
+        self.mask = None
+        self.selected = None
+        self.update_order()
+        self.update_size()
+
+    def data_updated(self):
+        """Call after the columns have been changed or resized in place."""
+        self.n_data_rows = len(self.columns[0]) if self.columns else 0
+        self._arrays = {}
+        self.cell_cache = {}
+        self.set_order()
+
+    def is_numeric(self, col):
+        if numpy and isinstance(col, numpy.ndarray):
+            return col.dtype.kind in 'biuf'
+        return len(col) > 0 and isinstance(col[0], Number)
+
+    def measure_column(self, col_i):
+        values = islice(self.columns[col_i], self.width_sample)
+        return max([len(self.headers[col_i])] + [len(self.format_value(col_i, v)) for v in values])
+
+    def format_value(self, col_i, value):
+        return str(value)
+
+    def update_size(self):
+        widths = [n * self.char_width for n in self.col_chars]
+        # col_x[i] is where column i starts; col_x[-1] is where the last one ends
+        self.col_x = [0] + list(accumulate(w + self.spacing for w in widths))
+        self.width = max(0, self.col_x[-1] - self.spacing)
+        self.height = self.header_height() + self.n_rows * self.row_height()
+        self.relayout()
+
+    def min_contents_width(self):
+        return self.width
+    max_contents_width = min_contents_width
+
+    def min_contents_height(self):
+        return self.height
+    max_contents_height = min_contents_height
+
+    def vlayout(self):
+        # Filtering may have left the viewport below our last row
+        self.viewport.clamp_ip(self.parent.body_rect())
+
+    def row_height(self):
+        return self.char_height
+
+    def header_height(self):
+        return self.char_height
+
+    def array(self, col_i):
+        # Columns converted for vectorised operations; array.arrays convert without copying
+        if col_i not in self._arrays:
+            self._arrays[col_i] = numpy.asarray(self.columns[col_i])
+        return self._arrays[col_i]
+
+    def update_order(self):
+        """Works out self.order, the data index shown in each row, from the current
+        filter and sort. The data itself is never reordered. self.order is None when
+        every row is shown in data order."""
+        if numpy:
+            rows = None if self.mask is None else numpy.flatnonzero(self.mask)
+            if self.sort_col is not None:
+                keys = self.array(self.sort_col)
+                if rows is not None:
+                    keys = keys[rows]
+                order = numpy.argsort(keys, kind='stable')
+                rows = order if rows is None else rows[order]
+        else:
+            rows = None if self.mask is None else [i for i, m in enumerate(self.mask) if m]
+            if self.sort_col is not None:
+                col = self.columns[self.sort_col]
+                rows = sorted(range(self.n_data_rows) if rows is None else rows,
+                              key=col.__getitem__)
+        if rows is not None and self.sort_reverse:
+            rows = rows[::-1]
+        self.order = rows
+        self.n_rows = self.n_data_rows if rows is None else len(rows)
+
+    def data_index(self, row_i):
+        return row_i if self.order is None else int(self.order[row_i])
+
+    def set_order(self):
+        self.selected = None
+        self.update_order()
+        self.update_size()
+        self.redraw()
+
+    def sort(self, col_i, reverse=False):
+        """Sorts the rows by column col_i, or restores data order if col_i is None."""
+        self.sort_col = col_i
+        self.sort_reverse = reverse
+        self.set_order()
+
+    def set_filter(self, mask):
+        """Shows only the rows whose entry in mask is true, e.g. grid.set_filter(prices > 100)
+        for a numpy array of prices. A mask of None shows every row."""
+        self.mask = mask
+        self.set_order()
+
+    def col_at(self, x):
+        col_i = bisect_right(self.col_x, x) - 1
+        return col_i if 0 <= col_i < len(self.columns) else None
+
+    def row_at(self, y):
+        row_i = (y - self.header_height()) // self.row_height()
+        return row_i if 0 <= row_i < self.n_rows else None
+
+    def handle_mouse_down(self, button, pos):
+        if button != 'left':
+            return False
+        x, y = pos
+        if y - self.viewport.top < self.header_height():
+            col_i = self.col_at(x)
+            if col_i is not None:
+                reverse = col_i == self.sort_col and not self.sort_reverse
+                self.sort(col_i, reverse)
+            return True
+        row_i = self.row_at(y)
+        if row_i is not None:
+            self.selected = row_i
+            self.redraw()
+            if self.select_cb:
+                self.select_cb(self.data_index(row_i))
+        return True
+
+    def visible_cols(self):
+        left, right = self.viewport.left, self.viewport.right
+        first = max(0, bisect_right(self.col_x, left) - 1)
+        last = min(len(self.columns), bisect_right(self.col_x, right))
+        return range(first, last)
+
+    def visible_rows(self):
+        row_height = self.row_height()
+        top = self.viewport.top
+        bottom = top + self.viewport.height - self.header_height()
+        return range(top // row_height, min(self.n_rows, -(-bottom // row_height)))
+
+    def draw_cell(self, text_surface, col_i, y):
+        left = self.viewport.left
+        width = self.col_chars[col_i] * self.char_width
+        clip = pygame.Rect(self.col_x[col_i] - left, y, width, self.char_height)
+        if self.right_align[col_i]:
+            pos = (clip.right - text_surface.get_width(), y)
+        else:
+            pos = clip.topleft
+        self.surface.set_clip(clip.clip(self.surface.get_rect()))
+        self.canvas.blit(self.surface, text_surface, pos)
+        self.surface.set_clip(None)
+
+    def draw(self):
+        super().draw()
+        left, top = self.viewport.topleft
+        header_height = self.header_height()
+        row_height = self.row_height()
+        cols = self.visible_cols()
+
+        # Only the cells in the viewport are looked up, formatted and rendered. Cells
+        # that were already in view keep their rendered text, so scrolling a few rows
+        # only renders the rows that come into view.
+        old_cache, self.cell_cache = self.cell_cache, {}
+        for row_i in self.visible_rows():
+            y = header_height + row_i * row_height - top
+            if row_i == self.selected:
+                rect = pygame.Rect(0, y, self.viewport.width, row_height)
+                self.canvas.rect(self.surface, self.selected_color, rect)
+            data_i = self.data_index(row_i)
+            for col_i in cols:
+                text_surface = old_cache.get((data_i, col_i))
+                if text_surface is None:
+                    text = self.format_value(col_i, self.columns[col_i][data_i])
+                    text_surface = self.render_text(text)
+                self.cell_cache[data_i, col_i] = text_surface
+                self.draw_cell(text_surface, col_i, y)
+
+        # The header stays put as the rows scroll beneath it
+        rect = pygame.Rect(0, 0, self.viewport.width, header_height)
+        self.canvas.rect(self.surface, self.header_bgcolor, rect)
+        for col_i in cols:
+            header = self.headers[col_i]
+            if col_i == self.sort_col:
+                header += ' v' if self.sort_reverse else ' ^'
+            text_surface = old_cache.get(header)
+            if text_surface is None:
+                text_surface = self.render_text(header, color=self.header_color)
+            self.cell_cache[header] = text_surface
+            self.draw_cell(text_surface, col_i, 0)
+        for col_i in cols[1:]:
+            x = self.col_x[col_i] - left - self.spacing // 2
+            self.canvas.line(self.surface, self.grid_color, (x, 0), (x, self.viewport.height))
+
+
+class DataGrid(ScrollArea):
+    """Shows a table of columnar data, e.g. a list of numpy arrays, without creating
+    a widget per cell. Only the cells in view are drawn, whatever the number of rows
+    and columns. Clicking a header sorts by that column; sorting and filtering
+    compute an order for the rows (vectorised when numpy is available) rather than
+    rearranging the data."""
+    halign = 'fill'
+    valign = 'fill'
+
+    right_bar = True
+    bottom_bar = True
+
+    num_rows = 20
+
+    def __init__(self, columns, headers=None, col_widths=None, select_cb=None, **kwargs):
+        body = DataGridBody(columns, headers, col_widths, select_cb)
+        super().__init__(body, **kwargs)
+
+    def max_contents_height(self):
+        body = self.body
+        height = body.header_height() + self.num_rows * body.row_height()
+        return self.hbar_height() + min(height, body.max_height())
+
+    def scroll_to_row(self, row_i):
+        body = self.body
+        # Leave room for the header, which covers the top of the viewport
+        rect = pygame.Rect(body.viewport.left, row_i * body.row_height(),
+                           1, body.row_height() + body.header_height())
+        self.ensure_visible(rect)
+
+    def set_columns(self, columns, headers=None, col_widths=None):
+        self.body.set_columns(columns, headers, col_widths)
+
+    def sort(self, col_i, reverse=False):
+        self.body.sort(col_i, reverse)
+
+    def set_filter(self, mask):
+        self.body.set_filter(mask)
+
+    def data_updated(self):
+        self.body.data_updated()
@@ -1,7 +1,9 @@
+from collections import Counter
 from functools import partial
 
 import pygame
 
+from ..model import ListModel
 from ..widget import Widget
 from .layout import VBox
 from .label import Label
@@ -9,29 +11,23 @@ from .scroll import ScrollArea
 
 
 class Overlay(Widget):
-    greedy_width = True
-    greedy_height = True
     bgcolor = (0, 0, 0, 0)
 
     def __init__(self, dropdown):
         self.dropdown = dropdown
         super().__init__([dropdown])
 
-    def hlayout(self):
-        self.dropdown.set_width(self.dropdown.max_width())
-        self.dropdown.hlayout()
-
-    def vlayout(self):
-        self.dropdown.set_height(self.dropdown.max_height())
-        self.dropdown.vlayout()
-
-    def resolve_tree(self, parent):
-        super().resolve_tree(parent)
-        def descendants(widget):
-            yield widget
-            for child in widget.children:
-                yield from descendants(child)
-        if self.dropdown.owner not in descendants(self.root):
+    def owner_attached(self):
+        # Walk up from the owner rather than searching the whole tree: O(depth)
+        widget = self.dropdown.owner
+        while widget.parent:
+            if widget not in widget.parent.children:
+                return False
+            widget = widget.parent
+        return widget is self.dropdown.owner.root
+
+    def windows_updated(self):
+        if not self.owner_attached():
             self.dropdown.close()
 
     def handle_mouse_down(self, button, pos):
@@ -53,9 +49,19 @@ class DropdownBody(Widget):
     spacing = 0
     text_padding = 0
 
+    keybindings = {
+        'up': ('handle_arrow', -1),
+        'down': ('handle_arrow', 1),
+        'return': 'handle_enter',
+        'KP-enter': 'handle_enter',
+    }
+
     def __init__(self, dropdown, update_cb, commit_cb):
         self.dropdown = dropdown
-        self.choices = []
+        self.model = ListModel()
+        self.model.add_listener(self)
+        self.choice_lens = Counter()
+        self.max_choice_len = 0
         self.choice_i = None
         self.mouseover_i = None
         self.update_cb = update_cb
@@ -68,31 +74,126 @@ class DropdownBody(Widget):
 
     def resolve_size(self):
         self.char_width, self.char_height = self.render_text(' ').get_size()
+        self.update_size()
+
+    def update_size(self):
+        # Uses the cached font metrics and longest choice length, so this is O(1)
         self.width = 2 * self.margin
         self.height = 2 * self.margin
         if self.choices:
-            self.width += self.char_width * (max(map(len, self.choices)) + 2 * self.text_padding)
-            self.height += (self.char_height + self.spacing) * len(self.choices) - self.spacing
+            self.width += self.char_width * (self.max_choice_len + 2 * self.text_padding)
+            self.height += self.row_height() * len(self.choices) - self.spacing
         self.relayout()
 
+    def row_height(self):
+        return self.char_height + self.spacing
+
+    @property
+    def choices(self):
+        return self.model.items
+
     def set_choice_i(self, i):
         self.choice_i = i
-        if self.parent and self.choices:
-            y = self.margin + (i or 0) * (self.char_height + self.spacing)
+        self.scroll_to_choice()
+        self.redraw()
+
+    def scroll_to_choice(self):
+        # Our viewport is only meaningful while the dropdown is open; we're
+        # called again from finalise_layout when it opens.
+        if self.dropdown.active and self.parent and self.choices:
+            y = self.margin + (self.choice_i or 0) * self.row_height()
             choice_rect = pygame.Rect(0, y - self.spacing,
                                       self.width, self.char_height + 2 * self.spacing)
             self.parent.ensure_visible(choice_rect)
-        self.redraw()
+
+    def finalise_layout(self):
+        super().finalise_layout()
+        self.scroll_to_choice()
 
     def set_choices(self, choices, choice_i=None):
-        self.choices = choices
+        # Scroll while our size still matches the viewport we were laid out with;
+        # the model resizes us, and finalise_layout() scrolls again after relayout
         self.set_choice_i(choice_i)
-        self.resolve_size()
+        if isinstance(choices, ListModel):
+            self.set_model(choices)
+        else:
+            self.model.reset(choices)
+
+    def set_model(self, model):
+        self.model.remove_listener(self)
+        self.model = model
+        self.model.add_listener(self)
+        self.model_reset(model)
+
+    def extend_choices(self, choices):
+        self.model.extend(choices)
+
+    def add_choice_lens(self, choices):
+        lens = Counter(map(len, choices))
+        self.choice_lens.update(lens)
+        if lens:
+            self.max_choice_len = max(self.max_choice_len, max(lens))
+
+    def remove_choice_lens(self, choices):
+        lens = Counter(map(len, choices))
+        self.choice_lens.subtract(lens)
+        for n in lens:
+            if not self.choice_lens[n]:
+                del self.choice_lens[n]
+        if self.max_choice_len not in self.choice_lens:
+            # Only the distinct lengths are scanned, not the choices themselves
+            self.max_choice_len = max(self.choice_lens, default=0)
+
+    def items_inserted(self, model, i, n):
+        self.add_choice_lens(model.items[i:i + n])
+        if self.choice_i is not None and self.choice_i >= i:
+            self.choice_i += n
+        self.mouseover_i = None
+        self.update_size()
+        self.redraw()
+
+    def items_removed(self, model, i, items):
+        self.remove_choice_lens(items)
+        n = len(items)
+        if self.choice_i is not None:
+            if self.choice_i >= i + n:
+                self.choice_i -= n
+            elif self.choice_i >= i:
+                # The selected choice went; select whatever took its place
+                self.choice_i = min(i, len(self.choices) - 1) if self.choices else None
+        self.mouseover_i = None
+        self.update_size()
+        self.redraw()
+
+    def item_moved(self, model, src, dst):
+        if self.choice_i == src:
+            self.choice_i = dst
+        elif self.choice_i is not None:
+            if src < self.choice_i <= dst:
+                self.choice_i -= 1
+            elif dst <= self.choice_i < src:
+                self.choice_i += 1
+        self.redraw()
+
+    def item_updated(self, model, i, old):
+        self.remove_choice_lens([old])
+        self.add_choice_lens([model.items[i]])
+        self.update_size()
+        self.redraw()
+
+    def model_reset(self, model):
+        self.choice_lens = Counter()
+        self.max_choice_len = 0
+        self.add_choice_lens(model.items)
+        if self.choice_i is not None and self.choice_i >= len(self.choices):
+            self.choice_i = None
+        self.mouseover_i = None
+        self.update_size()
+        self.redraw()
 
     def pos_to_row(self, pos):
         x, y = pos
-        row_height = self.char_height + self.spacing
-        row_i, offset = divmod(y - self.margin, row_height)
+        row_i, offset = divmod(y - self.margin, self.row_height())
         if offset < self.char_height and 0 <= row_i < len(self.choices):
             return row_i
         return None
@@ -118,40 +219,52 @@ class DropdownBody(Widget):
         if row_i is not None:
             self.set_mouseover_i(row_i)
 
+    def handle_arrow(self, step):
+        if self.choices:
+            choice_i = self.mouseover_i if self.mouseover_i else self.choice_i
+            self.set_mouseover_i(None)
+            if choice_i is None:
+                choice_i = (len(self.choices) - 1) if step < 0 else 0
+            else:
+                choice_i += step
+                if choice_i >= len(self.choices) and not self.dropdown.load_more():
+                    choice_i = 0
+                elif choice_i < 0:
+                    # Only wrap round to the last choice once we have them all
+                    choice_i = len(self.choices) - 1 if self.dropdown.all_loaded() else 0
+            self.set_choice_i(choice_i)
+            if self.update_cb:
+                self.update_cb(choice_i)
+
+    def handle_enter(self):
+        if self.choice_i is None:
+            return False
+        self.commit_cb(self.choice_i)
+
     def handle_keydown(self, event, keystroke):
-        if keystroke in ['up', 'down']:
-            if self.choices:
-                choice_i = self.mouseover_i if self.mouseover_i else self.choice_i
-                self.set_mouseover_i(None)
-                if choice_i is None:
-                    choice_i = (len(self.choices) - 1) if keystroke == 'up' else 0
-                else:
-                    choice_i = (choice_i + (-1 if keystroke == 'up' else 1)) % len(self.choices)
-                self.set_choice_i(choice_i)
-                if self.update_cb:
-                    self.update_cb(choice_i)
-            return True
-        elif keystroke in ['return', 'KP-enter'] and self.choice_i is not None:
-            self.commit_cb(self.choice_i)
-            return True
         return self.dropdown.owner
 
     def draw(self):
         super().draw()
         top = self.viewport.top
         bottom = self.viewport.bottom
-        x = y = self.margin
+        row_height = self.row_height()
+        # Start from the first row the viewport reaches rather than walking every
+        # row above it, so drawing costs the same wherever we are scrolled to.
+        first_i = max(0, (top - self.margin) // row_height)
+        x = self.margin
+        y = self.margin + first_i * row_height
         highlight_i = self.choice_i if self.mouseover_i is None else self.mouseover_i
-        for i, choice in enumerate(self.choices):
+        pad = ' ' * self.text_padding
+        for i in range(first_i, len(self.choices)):
             if y >= bottom:
                 break
             if (y + self.char_height) > top:
                 if i == highlight_i:
                     rect = pygame.Rect(0, y - top, self.width, self.char_height)
-                    pygame.draw.rect(self.surface, self.selected_color, rect)
-                pad = ' ' * self.text_padding
-                self.surface.blit(self.render_text(pad + choice + pad), (x, y - top))
-            y += self.char_height + self.spacing
+                    self.canvas.rect(self.surface, self.selected_color, rect)
+                self.canvas.blit(self.surface, self.render_text(pad + self.choices[i] + pad), (x, y - top))
+            y += row_height
 
 
 class Dropdown(ScrollArea):
@@ -162,13 +275,16 @@ class Dropdown(ScrollArea):
 
     max_choices = 10
 
-    def __init__(self, owner, choices=None, choice_i=None, update_cb=None, commit_cb=None, **kwargs):
+    def __init__(self, owner, choices=None, choice_i=None, update_cb=None, commit_cb=None,
+                 more_cb=None, **kwargs):
         self.owner = owner
         self.overlay = Overlay(self)
         self.commit_cb = commit_cb
+        self.more_cb = more_cb
+        self.more_exhausted = False # more_cb had no more choices to give
         self.body = DropdownBody(self, update_cb, self._commit_cb)
         self.active = False
-        if choices:
+        if choices is not None:
             self.body.set_choices(choices)
         if choice_i is not None:
             self.body.set_choice_i(choice_i)
@@ -177,11 +293,39 @@ class Dropdown(ScrollArea):
         self.body.resolve_size()
 
     def max_contents_height(self):
-        limit = (self.body.char_height + self.body.spacing) * self.max_choices
+        limit = self.body.row_height() * self.max_choices
         return min(limit, self.body.max_height())
 
     def set_choices(self, choices):
         self.body.set_choices(choices)
+        self.more_exhausted = False
+
+    @property
+    def model(self):
+        return self.body.model
+
+    def extend_choices(self, choices):
+        self.body.extend_choices(choices)
+
+    def ensure_visible(self, rect):
+        super().ensure_visible(rect)
+        # more_cb lets the owner supply choices a page at a time. We ask for the next
+        # page once the viewport gets within a page of the end of the current choices.
+        viewport = self.body.viewport
+        if viewport.bottom + viewport.height >= self.body.height:
+            self.load_more()
+
+    def load_more(self):
+        """Asks more_cb for the next page of choices. Returns True if it gave any."""
+        if not self.more_cb or self.more_exhausted:
+            return False
+        n = len(self.choices)
+        self.more_cb()
+        self.more_exhausted = len(self.choices) == n
+        return not self.more_exhausted
+
+    def all_loaded(self):
+        return not self.more_cb or self.more_exhausted
 
     def set_choice_i(self, i):
         self.body.set_choice_i(i)
@@ -190,6 +334,10 @@ class Dropdown(ScrollArea):
     def choices(self):
         return self.body.choices
 
+    @property
+    def max_choice_len(self):
+        return self.body.max_choice_len
+
     @property
     def choice_i(self):
         return self.body.choice_i
@@ -205,12 +353,11 @@ class Dropdown(ScrollArea):
         self.body.focus()
 
     def handle_keydown(self, event, keystroke):
-        return self.body.handle_keydown(event, keystroke)
+        return self.body
 
     def open(self):
-        self.x, self.y = self.owner.rect.bottomleft
-        self.owner.root.children.append(self.overlay)
-        self.owner.root.relayout()
+        self.overlay.x, self.overlay.y = self.owner.rect.bottomleft
+        self.owner.root.open_popup(self.overlay)
         self.body.root = self.owner.root # lets owner call self.focus() pre-layout, if desired
         self.active = True
 
@@ -219,8 +366,7 @@ class Dropdown(ScrollArea):
             self.body.unfocus()
             if self._old_focus:
                 self._old_focus.focus()
-        assert self.root.children.pop() is self.overlay
-        self.root.relayout()
+        self.owner.root.close_popup(self.overlay)
         self.active = False
 
     def _commit_cb(self, choice_i):
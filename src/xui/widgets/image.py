@@ -0,0 +1,107 @@
+import pygame
+
+from ..images import image_cache, image_key, image_loader, fit_size
+from ..widget import Widget
+
+
+class Image(Widget):
+    """Shows an image file, scaled to the size it's laid out at. Files are decoded
+    and scaled on worker threads (see images.ImageLoader), and a placeholder is drawn
+    until the image is ready. Scaled images are shared through images.image_cache,
+    so an image is only scaled again when its laid-out size changes.
+
+    Without an image_size, an Image asks for the image's own size once it has been
+    decoded, and for placeholder_size until then."""
+
+    placeholder_color = (48, 48, 48)
+    placeholder_size = (64, 64)
+
+    # Size to lay out the image at, or None for the image's own size
+    image_size = None
+
+    # Scale to fit within our size without distorting the image
+    keep_aspect = True
+
+    def __init__(self, path=None, **kwargs):
+        super().__init__(**kwargs)
+        self.set_path(path)
+
+    def set_path(self, path):
+        self.path = path
+        self.natural_size = None
+        self.image = None
+        self.shown_key = None # cache key of self.image
+        try:
+            self.key = image_key(path) if path else None
+        except OSError:
+            self.key = None
+        self.invalidate_size()
+        self.redraw()
+
+    def layout_size(self):
+        if self.natural_size is None and self.key:
+            # Already decoded, e.g. for another Image of the same file
+            decoded = image_cache.get(self.key)
+            if decoded is not None:
+                self.natural_size = decoded.get_size()
+        return self.image_size or self.natural_size or self.placeholder_size
+
+    def min_contents_width(self):
+        return self.layout_size()[0]
+    max_contents_width = min_contents_width
+
+    def min_contents_height(self):
+        return self.layout_size()[1]
+    max_contents_height = min_contents_height
+
+    def target_size(self):
+        box = (max(1, self.width - 2 * self.margin), max(1, self.height - 2 * self.margin))
+        if self.keep_aspect:
+            return fit_size(self.natural_size, box)
+        return box
+
+    def wanted_key(self):
+        """Returns the cache key of the image we want to show next, which until we
+        know the image's own size is the decoded image."""
+        if self.key is None:
+            return None
+        path, mtime, _ = self.key
+        if self.natural_size is None:
+            return self.key
+        return (path, mtime, self.target_size())
+
+    def set_natural_size(self, size):
+        self.natural_size = size
+        if not self.image_size:
+            self.invalidate_size()
+
+    def image_loaded(self, key, surface):
+        if self.key is None or key[:2] != self.key[:2]:
+            # We've been given another path since
+            return
+        if surface is None:
+            self.log('Could not load image %r: %s' % (self.path, image_loader.failure(key)))
+            self.key = None
+        elif self.natural_size is None and key[2] is None:
+            self.set_natural_size(surface.get_size())
+        self.redraw()
+
+    def draw(self):
+        super().draw()
+        key = self.wanted_key()
+        if key and key[2] is None:
+            decoded = image_loader.request(self.root.app, key, self.image_loaded)
+            if decoded is not None:
+                # Cached since we were laid out. Our size can't change while we're
+                # being drawn, so take it as if it had just been decoded.
+                self.root.app.call_soon_threadsafe(self.image_loaded, key, decoded)
+        elif key and key != self.shown_key:
+            image = image_loader.request(self.root.app, key, self.image_loaded)
+            if image is not None:
+                self.image, self.shown_key = image, key
+        rect = pygame.Rect(self.margin, self.margin,
+                           self.width - 2 * self.margin, self.height - 2 * self.margin)
+        if self.image and self.key and self.shown_key[:2] == self.key[:2]:
+            self.canvas.blit(self.surface, self.image, self.image.get_rect(center=rect.center))
+        else:
+            self.canvas.rect(self.surface, self.placeholder_color, rect)
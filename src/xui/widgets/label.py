@@ -37,8 +37,7 @@ class Label(Widget):
         len_updated = len(text) != len(self.text)
         self.text = text
         if len_updated:
-            self.resolve_size()
-            self.relayout()
+            self.invalidate_size()
         self.redraw()
 
     def draw(self):
@@ -48,6 +47,7 @@ class Label(Widget):
         if self.keybind:
             i = self.text.lower().find(self.keybind.lower())
             if i != -1:
+                text_surface = text_surface.copy()
                 pos = pygame.Rect(i * self.char_width, self.char_height - 1, self.char_width - 1, 1)
                 color = self.color if self.enabled else self.disabled_color
                 pygame.draw.rect(text_surface, color, pos)
@@ -56,4 +56,4 @@ class Label(Widget):
             pos = (self.margin - self.viewport.left, self.margin - self.viewport.top)
         else:
             pos = (self.margin, self.margin)
-        self.surface.blit(text_surface, pos)
+        self.canvas.blit(self.surface, text_surface, pos)
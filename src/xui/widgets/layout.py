@@ -27,11 +27,6 @@ def divide_space(total_space, min_sizes, max_sizes):
     return sizes
 
 
-def _max(x):
-    l = list(x)
-    return max(l) if l else 0
-
-
 class VBox(Widget):
     def min_contents_height(self):
         total_spacing = self.spacing * (len(self.children) - 1)
@@ -89,6 +84,18 @@ class HBox(Widget):
 
 
 class GridBox(Widget):
+    """Lays out cells in rows and columns. Each row is a list of cells, any of which
+    may be None.
+
+    The min/max size of each row and column is cached, along with each cell's own
+    sizes, and updated as cells change. Rows and columns that have not moved, and
+    whose cells have not changed, are not laid out again. Use insert_row(),
+    remove_row(), set_cell() etc. to change the grid; after changing self.rows
+    directly, call rows_updated().
+
+    Cells tell us they need layout through relayout() (see child_relayout()), so
+    a layout pass only looks at the cells that changed, not at every cell."""
+
     def __init__(self, rows=None, **kwargs):
         self.rows = rows or []
         children = [cell for row in self.rows for cell in row if cell]
@@ -100,76 +107,317 @@ class GridBox(Widget):
         self.n_cols = len(self.rows[0]) if self.rows else 0
         self.n_rows = len(self.rows)
         self.cols = [[row[col_i] for row in self.rows] for col_i in range(self.n_cols)]
+        self._tracks = {} # cell -> (its row, its column), the lists themselves
+        for row in self.rows:
+            for col, cell in zip(self.cols, row):
+                if cell:
+                    self._tracks[cell] = (row, col)
+        self.sizes_updated()
+        self.relayout()
+
+    def settings_updated(self):
+        self.sizes_updated()
+
+    def sizes_updated(self):
+        """Forgets all cached sizes and positions, so the next layout starts afresh."""
+        self._cell_sizes = {} # cell -> (min_width, max_width, min_height, max_height)
+        self._col_sizes = [None] * self.n_cols # (min, max) width of each column
+        self._row_sizes = [None] * self.n_rows
+        self._col_placed = [None] * self.n_cols # (x, width) each column was laid out at
+        self._row_placed = [None] * self.n_rows
+        self._dirty = {} # cells needing layout -> (row_i, col_i)
+        self._moved = set() # cells laid out since we were last finalised
+        self._pending = set() # cells that may need layout, from child_relayout()
+        self._resolved_in = None # (parent, root, depth) we last resolved every cell for
+
+    def insert_row(self, row_i, cells):
+        if self.rows:
+            assert len(cells) == self.n_cols
+        else:
+            self.n_cols = len(cells)
+            self.cols = [[] for cell in cells]
+            self._col_sizes = [None] * self.n_cols
+            self._col_placed = [None] * self.n_cols
+        cells = list(cells)
+        self.rows.insert(row_i, cells)
+        for col, cell in zip(self.cols, cells):
+            col.insert(row_i, cell)
+            self.add_cell(cell, cells, col)
+        self.n_rows += 1
+        self._row_sizes.insert(row_i, None)
+        self._row_placed.insert(row_i, None)
+        self.relayout()
+
+    def append_row(self, cells):
+        self.insert_row(self.n_rows, cells)
+
+    def remove_row(self, row_i):
+        cells = self.rows.pop(row_i)
+        for col_i, (col, cell) in enumerate(zip(self.cols, cells)):
+            col.pop(row_i)
+            if cell:
+                self.forget_cell(cell, self._col_sizes, col_i, 0)
+        self.n_rows -= 1
+        del self._row_sizes[row_i]
+        del self._row_placed[row_i]
+        self.remove_children(cells)
+        return cells
+
+    def insert_col(self, col_i, cells):
+        if self.rows:
+            assert len(cells) == self.n_rows
+        else:
+            self.n_rows = len(cells)
+            self.rows = [[] for cell in cells]
+            self._row_sizes = [None] * self.n_rows
+            self._row_placed = [None] * self.n_rows
+        cells = list(cells)
+        self.cols.insert(col_i, cells)
+        for row, cell in zip(self.rows, cells):
+            row.insert(col_i, cell)
+            self.add_cell(cell, row, cells)
+        self.n_cols += 1
+        self._col_sizes.insert(col_i, None)
+        self._col_placed.insert(col_i, None)
+        self.relayout()
+
+    def append_col(self, cells):
+        self.insert_col(self.n_cols, cells)
+
+    def remove_col(self, col_i):
+        cells = self.cols.pop(col_i)
+        for row_i, (row, cell) in enumerate(zip(self.rows, cells)):
+            row.pop(col_i)
+            if cell:
+                self.forget_cell(cell, self._row_sizes, row_i, 2)
+        self.n_cols -= 1
+        del self._col_sizes[col_i]
+        del self._col_placed[col_i]
+        self.remove_children(cells)
+        return cells
+
+    def set_cell(self, row_i, col_i, cell):
+        """Puts cell (which may be None) at row_i, col_i and returns the cell it replaced."""
+        old = self.rows[row_i][col_i]
+        if old is cell:
+            return old
+        self.rows[row_i][col_i] = cell
+        self.cols[col_i][row_i] = cell
+        if old:
+            self.forget_cell(old, self._col_sizes, col_i, 0)
+            self.forget_cell(old, self._row_sizes, row_i, 2)
+            self.remove_children([old])
+        if cell:
+            self.add_cell(cell, self.rows[row_i], self.cols[col_i])
+            self.relayout()
+        return old
+
+    def add_cell(self, cell, row, col):
+        if cell:
+            self.children.append(cell)
+            self._tracks[cell] = (row, col)
+            self._pending.add(cell)
+
+    def remove_children(self, cells):
+        gone = {cell for cell in cells if cell}
+        for cell in gone & self.mouse_in_children:
+            cell.handle_mouse_exit()
+        self.mouse_in_children -= gone
+        self._moved -= gone
+        self._pending -= gone
+        for cell in gone:
+            del self._tracks[cell]
+        self.children = [child for child in self.children if child not in gone]
+        self.relayout()
+        # Nothing may move into the space the cells leave, so make sure it's repainted
+        self.redraw()
+
+    def forget_cell(self, cell, track_sizes, track_i, dim):
+        # dim is 0 to look at the cell's widths, 2 for its heights
+        sizes = self._cell_sizes.pop(cell, None)
+        track = track_sizes[track_i]
+        if sizes and track and (sizes[dim] == track[0] or sizes[dim + 1] == track[1]):
+            # The cell may have been what made the track as big as it is
+            track_sizes[track_i] = None
+
+    def measure_cell(self, cell, row_i, col_i):
+        old = self._cell_sizes.get(cell)
+        new = (cell.min_width(), cell.max_width(), cell.min_height(), cell.max_height())
+        self._cell_sizes[cell] = new
+        if old != new:
+            self.resize_track(self._col_sizes, col_i, old and old[:2], new[:2])
+            self.resize_track(self._row_sizes, row_i, old and old[2:], new[2:])
+        return new
+
+    def resize_track(self, track_sizes, i, old, new):
+        track = track_sizes[i]
+        if track is None:
+            return
+        if old and ((old[0] == track[0] > new[0]) or (old[1] == track[1] > new[1])):
+            # A cell that set the track's size has shrunk; rescan the track when needed
+            track_sizes[i] = None
+        else:
+            track_sizes[i] = (max(track[0], new[0]), max(track[1], new[1]))
+
+    def cell_sizes(self, cell):
+        sizes = self._cell_sizes.get(cell)
+        if sizes is None:
+            sizes = self._cell_sizes[cell] = (cell.min_width(), cell.max_width(),
+                                              cell.min_height(), cell.max_height())
+        return sizes
+
+    def track_sizes(self, track_sizes, tracks, dim):
+        for i, size in enumerate(track_sizes):
+            if size is None:
+                lo = hi = 0
+                for cell in tracks[i]:
+                    if cell:
+                        sizes = self.cell_sizes(cell)
+                        lo = max(lo, sizes[dim])
+                        hi = max(hi, sizes[dim + 1])
+                track_sizes[i] = (lo, hi)
+        return track_sizes
+
+    def col_sizes(self):
+        return self.track_sizes(self._col_sizes, self.cols, 0)
+
+    def row_sizes(self):
+        return self.track_sizes(self._row_sizes, self.rows, 2)
+
+    def child_relayout(self, child):
+        if child in self._tracks:
+            self._pending.add(child)
+        super().child_relayout(child)
+
+    def needs_layout(self):
+        if self._laid_out != self.children:
+            return True
+        for cell in list(self._pending):
+            if cell.needs_layout():
+                return True
+            # Relaid out, but laid out again since
+            self._pending.discard(cell)
+        return False
+
+    def resolve_tree(self, parent=None):
+        place = parent and (parent, parent.root, parent.depth)
+        if place != self._resolved_in:
+            # New to this part of the tree (or our sizes were forgotten): every
+            # cell must learn its new root and depth
+            super().resolve_tree(parent)
+            self._resolved_in = place
+            candidates = self.children
+        else:
+            candidates = [cell for cell in self._pending if cell in self._tracks]
+            for cell in candidates:
+                cell.resolve_tree(self)
+        self._pending = set()
+        # Cells that need layout may have changed size
+        self._dirty = {}
+        changed = [cell for cell in candidates if cell.needs_layout()]
+        if changed:
+            row_index = {id(row): i for i, row in enumerate(self.rows)}
+            col_index = {id(col): i for i, col in enumerate(self.cols)}
+            for cell in changed:
+                row, col = self._tracks[cell]
+                row_i, col_i = row_index[id(row)], col_index[id(col)]
+                self._dirty[cell] = (row_i, col_i)
+                self.measure_cell(cell, row_i, col_i)
 
     def min_contents_width(self):
         total_spacing = self.spacing * (self.n_cols - 1)
-        min_widths = [_max(cell.min_width() for cell in col if cell) for col in self.cols]
-        return total_spacing + sum(min_widths)
+        return total_spacing + sum(lo for lo, hi in self.col_sizes())
 
     def max_contents_width(self):
         total_spacing = self.spacing * (self.n_cols - 1)
-        max_widths = [_max(cell.max_width() for cell in col if cell) for col in self.cols]
-        return total_spacing + sum(max_widths)
+        return total_spacing + sum(hi for lo, hi in self.col_sizes())
 
     def min_contents_height(self):
         total_spacing = self.spacing * (self.n_rows - 1)
-        min_heights = [_max(cell.min_height() for cell in row if cell) for row in self.rows]
-        return total_spacing + sum(min_heights)
+        return total_spacing + sum(lo for lo, hi in self.row_sizes())
 
     def max_contents_height(self):
         total_spacing = self.spacing * (self.n_rows - 1)
-        max_heights = [_max(cell.max_height() for cell in row if cell) for row in self.rows]
-        return total_spacing + sum(max_heights)
+        return total_spacing + sum(hi for lo, hi in self.row_sizes())
+
+    def hlayout_cell(self, child, x, col_width):
+        child.x = x
+        child_width = min(col_width, child.max_width())
+        if child.halign == 'fill':
+            child_width = col_width
+        child.set_width(child_width)
+        if child_width < col_width:
+            gap = col_width - child_width
+            align = child.halign or self.halign
+            offset = gap * (1 if align == 'right' else 0.5 if align == 'center' else 0)
+            child.x += offset
+        child.hlayout()
+        self._moved.add(child)
+
+    def vlayout_cell(self, child, y, row_height):
+        child.y = y
+        child_height = min(row_height, child.max_height())
+        if child.valign == 'fill':
+            child_height = row_height
+        child.set_height(child_height)
+        if child_height < row_height:
+            gap = row_height - child_height
+            align = child.valign or self.valign
+            offset = gap * (1 if align == 'bottom' else 0.5 if align == 'center' else 0)
+            child.y += offset
+        child.vlayout()
+        self._moved.add(child)
 
     def hlayout(self):
         x = self.x + self.margin
         width = self.width - 2 * self.margin - self.spacing * (self.n_cols - 1)
-        min_widths = [_max(cell.min_width() for cell in col if cell) for col in self.cols]
-        max_widths = [_max(cell.max_width() for cell in col if cell) for col in self.cols]
+        sizes = self.col_sizes()
+        min_widths = [lo for lo, hi in sizes]
+        max_widths = [hi for lo, hi in sizes]
         if sum(min_widths) > width:
             self.error("width=%d, avail=%d, children require %r", self.width, width, min_widths)
         widths = divide_space(width, min_widths, max_widths)
-        for col, col_width in zip(self.cols, widths):
-            for child in col:
-                if not child:
-                    continue
-                child.x = x
-                child_width = min(col_width, child.max_width())
-                if child.halign == 'fill':
-                    child_width = col_width
-                child.set_width(child_width)
-                if child_width < col_width:
-                    gap = col_width - child_width
-                    align = child.halign or self.halign
-                    offset = gap * (1 if align == 'right' else 0.5 if align == 'center' else 0)
-                    child.x += offset
-                child.hlayout()
+        laid_out = set()
+        for col_i, (col, col_width) in enumerate(zip(self.cols, widths)):
+            # Columns that haven't moved only need their changed cells laid out
+            if self._col_placed[col_i] != (x, col_width):
+                self._col_placed[col_i] = (x, col_width)
+                for child in col:
+                    if child:
+                        self.hlayout_cell(child, x, col_width)
+                        laid_out.add(child)
             x += col_width + self.spacing
+        for child, (row_i, col_i) in self._dirty.items():
+            if child not in laid_out:
+                self.hlayout_cell(child, *self._col_placed[col_i])
 
     def vlayout(self):
         y = self.y + self.margin
         height = self.height - 2 * self.margin - self.spacing * (self.n_rows - 1)
-        min_heights = [_max(cell.min_height() for cell in row if cell) for row in self.rows]
-        max_heights = [_max(cell.max_height() for cell in row if cell) for row in self.rows]
+        sizes = self.row_sizes()
+        min_heights = [lo for lo, hi in sizes]
+        max_heights = [hi for lo, hi in sizes]
         if sum(min_heights) > height:
             self.error("height=%d, avail=%d, children require %r", self.height, height, min_heights)
         heights = divide_space(height, min_heights, max_heights)
-        for row, row_height in zip(self.rows, heights):
-            for child in row:
-                if not child:
-                    continue
-                child.y = y
-                child_height = min(row_height, child.max_height())
-                if child.valign == 'fill':
-                    child_height = row_height
-                child.set_height(child_height)
-                if child_height < row_height:
-                    gap = row_height - child_height
-                    align = child.valign or self.valign
-                    offset = gap * (1 if align == 'bottom' else 0.5 if align == 'center' else 0)
-                    child.y += offset
-                child.vlayout()
+        laid_out = set()
+        for row_i, (row, row_height) in enumerate(zip(self.rows, heights)):
+            if self._row_placed[row_i] != (y, row_height):
+                self._row_placed[row_i] = (y, row_height)
+                for child in row:
+                    if child:
+                        self.vlayout_cell(child, y, row_height)
+                        laid_out.add(child)
             y += row_height + self.spacing
+        for child, (row_i, col_i) in self._dirty.items():
+            if child not in laid_out:
+                self.vlayout_cell(child, *self._row_placed[row_i])
+
+    def finalise_children(self):
+        # Cells that weren't laid out again keep their rects from last time
+        for child in self._moved:
+            child.finalise_layout()
+        self._moved = set()
 
 
 class HSpacer(Widget):
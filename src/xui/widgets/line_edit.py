@@ -1,7 +1,6 @@
-import os
-
 import pygame
 
+from ..completion import PrefixCompletions, FuzzyCompletions
 from .label import Label
 from .scroll import ScrollArea
 from .dropdown import Dropdown
@@ -37,13 +36,40 @@ class LineEdit(ScrollArea):
 
     num_chars = 30
 
+    # Completions are handed to the dropdown this many at a time
+    completion_page = 100
+
+    # If set, complete on subsequence matches ranked by score rather than on prefix
+    fuzzy = False
+
+    keybindings = {
+        'up': 'handle_dropdown_key',
+        'down': 'handle_dropdown_key',
+        'backspace': ('handle_backspace', False),
+        'CTRL-backspace': ('handle_backspace', True),
+        'delete': ('handle_delete', False),
+        'CTRL-delete': ('handle_delete', True),
+        'return': 'handle_enter',
+        'KP-enter': 'handle_enter',
+        'left': ('handle_left', False),
+        'CTRL-left': ('handle_left', True),
+        'right': ('handle_right', False),
+        'CTRL-right': ('handle_right', True),
+        'home': 'handle_home',
+        'end': 'handle_end',
+        'tab': 'handle_tab',
+    }
+
     def __init__(self, text='', update_cb=None, commit_cb=None, completions=None, **kwargs):
         super().__init__(Label(text), **kwargs)
         self.update_cb = update_cb
         self.commit_cb = commit_cb
-        self.completions = sorted(completions or [])
+        self.completions = self.completion_index(completions)
         self.dropdown = Dropdown(self, update_cb=self.comp_update, commit_cb=self.comp_commit,
-                                 autohide_bars=False)
+                                 more_cb=self.comp_more, autohide_bars=False)
+        self.completion_query = None
+        self.completion_search = None
+        self.completion_timer = None
         self.cursor = 0 # index of character after cursor
 
     def set_enabled(self, enabled):
@@ -60,7 +86,24 @@ class LineEdit(ScrollArea):
     def comp_update(self, _):
         self.set_value(self.dropdown.choice)
 
+    def comp_more(self):
+        if not self.dropdown.active:
+            return
+        start = len(self.dropdown.choices)
+        more = self.completions.matches(self.completion_query, start, self.completion_page)
+        if more:
+            self.dropdown.extend_choices(more)
+
+    def completion_index(self, completions):
+        return (FuzzyCompletions if self.fuzzy else PrefixCompletions)(completions)
+
+    def set_completions(self, completions):
+        self.completions = self.completion_index(completions)
+        self.refresh_dropdown()
+
     def focus_lost(self):
+        self.cancel_call(self.completion_timer)
+        self.completion_timer = None
         if self.dropdown.active:
             self.dropdown.close()
 
@@ -93,7 +136,19 @@ class LineEdit(ScrollArea):
     def refresh_dropdown(self):
         if not self.has_focus:
             return
-        completions = [word for word in self.completions if word.startswith(self.body.text)]
+        self.cancel_call(self.completion_timer)
+        self.completion_query = self.body.text
+        self.completion_search = self.completions.search(self.completion_query, self.completion_page)
+        self.step_completions()
+
+    def step_completions(self):
+        # Large fuzzy searches yield their results a chunk at a time; we show each
+        # partial ranking as it arrives and pick up the search again next frame.
+        self.completion_timer = None
+        completions = next(self.completion_search, None)
+        if completions is None:
+            return
+        self.completion_timer = self.call_later(0, self.step_completions)
         if completions and not self.dropdown.active:
             self.dropdown.open()
         elif self.dropdown.active and not completions:
@@ -101,48 +156,58 @@ class LineEdit(ScrollArea):
         if completions != self.dropdown.choices:
             self.dropdown.set_choices(completions)
 
-    def handle_keydown(self, event, keystroke):
-        if self.dropdown.active and keystroke in ['up', 'down']:
-            return self.dropdown
+    def handle_dropdown_key(self):
+        return self.dropdown if self.dropdown.active else False
 
+    def handle_backspace(self, word=False):
         text = self.body.text
         cursor = self.cursor
-        if keystroke in ['backspace', 'CTRL-backspace']:
-            n = prev_word_offset(text, cursor) if 'CTRL' in keystroke else 1
-            text = text[:cursor - n] + text[cursor:]
-            self.update_text(text, cursor=cursor - n)
-        elif keystroke in ['delete', 'CTRL-delete']:
-            n = next_word_offset(text, cursor) if 'CTRL' in keystroke else 1
-            text = text[:cursor] + text[cursor + n:]
-            self.update_text(text)
-            self.update_viewport()
-        elif keystroke in ['return', 'KP-enter']:
-            if self.commit_cb:
-                self.commit_cb()
-        elif keystroke == 'left':
-            self.update_cursor(cursor - 1)
-        elif keystroke == 'right':
-            self.update_cursor(cursor + 1)
-        elif keystroke == 'CTRL-left':
-            self.update_cursor(prev_word(text, cursor))
-        elif keystroke == 'CTRL-right':
-            self.update_cursor(next_word(text, cursor))
-        elif keystroke == 'home':
-            self.update_cursor(0)
-        elif keystroke == 'end':
-            self.update_cursor(len(text))
-        elif 'ALT-' not in keystroke and event.unicode and 32 <= ord(event.unicode) <= 126:
-            text = text[:cursor] + event.unicode + text[cursor:]
-            self.update_text(text, cursor + 1)
-        elif keystroke == 'tab':
-            if self.dropdown.active:
-                text = os.path.commonprefix(self.dropdown.choices)
-                if text != self.body.text:
-                    self.update_text(text, cursor=len(text))
-        else:
-            return False
-        self.refresh_dropdown()
-        return True
+        n = prev_word_offset(text, cursor) if word else 1
+        self.update_text(text[:cursor - n] + text[cursor:], cursor=cursor - n)
+
+    def handle_delete(self, word=False):
+        text = self.body.text
+        cursor = self.cursor
+        n = next_word_offset(text, cursor) if word else 1
+        self.update_text(text[:cursor] + text[cursor + n:])
+        self.update_viewport()
+
+    def handle_enter(self):
+        if self.commit_cb:
+            self.commit_cb()
+
+    def handle_left(self, word=False):
+        self.update_cursor(prev_word(self.body.text, self.cursor) if word else self.cursor - 1)
+
+    def handle_right(self, word=False):
+        self.update_cursor(next_word(self.body.text, self.cursor) if word else self.cursor + 1)
+
+    def handle_home(self):
+        self.update_cursor(0)
+
+    def handle_end(self):
+        self.update_cursor(len(self.body.text))
+
+    def handle_tab(self):
+        if self.dropdown.active:
+            text = self.completions.common_prefix(self.completion_query)
+            if text != self.body.text:
+                self.update_text(text, cursor=len(text))
+
+    def run_keybinding(self, action, event):
+        result = super().run_keybinding(action, event)
+        if result is None:
+            self.refresh_dropdown()
+        return result
+
+    def handle_keydown(self, event, keystroke):
+        if 'ALT-' not in keystroke and event.unicode and 32 <= ord(event.unicode) <= 126:
+            text = self.body.text
+            cursor = self.cursor
+            self.update_text(text[:cursor] + event.unicode + text[cursor:], cursor + 1)
+            self.refresh_dropdown()
+            return True
+        return False
 
     def update_viewport(self):
         if not self.body.viewport:
@@ -173,8 +238,8 @@ class LineEdit(ScrollArea):
         super().draw()
         if self.enabled:
             color = self.focus_border_color if self.has_focus else self.border_color
-            pygame.draw.rect(self.surface, color, self.surface.get_rect(), 1)
+            self.canvas.rect(self.surface, color, self.surface.get_rect(), 1)
         if self.has_focus:
             cursor_x = self.cursor * self.body.char_width + self.margin - self.body.viewport.left
             cursor_rect = pygame.Rect(cursor_x - 1, self.margin, 2, self.body.height)
-            pygame.draw.rect(self.surface, self.color, cursor_rect, 1)
+            self.canvas.rect(self.surface, self.color, cursor_rect, 1)
@@ -0,0 +1,186 @@
+import pygame
+
+from .. import surfaces
+from ..widget import Widget, UNLIMITED
+from .scroll import ScrollArea
+
+
+class ListViewBody(Widget):
+    supports_viewport = True
+    fixed_height = True
+
+    # Rows bound above and below the viewport, so short scrolls need no rebinding
+    overscan = 2
+
+    def __init__(self, n_rows, row_factory, bind_cb, row_height=None):
+        self.n_rows = n_rows
+        self.row_factory = row_factory
+        self.bind_cb = bind_cb
+        self.bound = {} # row index -> widget currently showing that row
+        self.spare = [] # widgets not currently bound to a row
+        super().__init__()
+        # An unbound row lets us measure row sizes before any rows are showing
+        sample = self.row_factory()
+        self.spare.append(sample)
+        if row_height is None:
+            row_height = sample.max_height()
+            if row_height >= UNLIMITED:
+                row_height = sample.min_height()
+        self.row_height = row_height
+        self.height = self.n_rows * self.row_height
+
+    def min_contents_width(self):
+        return max(row.min_width() for row in self.children + self.spare)
+
+    def max_contents_width(self):
+        return max(row.max_width() for row in self.children + self.spare)
+
+    def row_range(self):
+        if not self.viewport or not self.viewport.height:
+            return range(0)
+        first = max(0, self.viewport.top // self.row_height - self.overscan)
+        last = min(self.n_rows, -(-self.viewport.bottom // self.row_height) + self.overscan)
+        return range(first, last)
+
+    def bind_rows(self):
+        """Binds widgets to the rows in or near the viewport, reusing widgets from rows
+        that have scrolled away. Returns the newly bound widgets, which have been
+        given their width but not yet their height."""
+        wanted = self.row_range()
+        for i in [i for i in self.bound if i not in wanted]:
+            row = self.bound.pop(i)
+            if row in self.mouse_in_children:
+                row.handle_mouse_exit()
+                self.mouse_in_children.discard(row)
+            self.spare.append(row)
+        new = []
+        for i in wanted:
+            if i not in self.bound:
+                row = self.spare.pop() if self.spare else self.row_factory()
+                self.bind_cb(row, i)
+                self.bound[i] = row
+                row.resolve_tree(self)
+                self.hlayout_row(row)
+                new.append(row)
+        self.children = list(self.bound.values())
+        return new
+
+    def hlayout_row(self, row):
+        width = self.width - 2 * self.margin
+        hi = width if row.halign == 'fill' else row.max_width()
+        row.x = self.x + self.margin
+        # Rows bound after we were laid out may be wider than us; they get clipped
+        row.set_width(max(row.min_width(), min(hi, width)))
+        row.hlayout()
+
+    def vlayout_row(self, row, i):
+        row.y = self.y + i * self.row_height
+        if not row.fixed_height:
+            row.set_height(self.row_height)
+        row.vlayout()
+
+    def hlayout(self):
+        for row in self.children:
+            self.hlayout_row(row)
+
+    def vlayout(self):
+        # Our row count may have shrunk since the viewport was last positioned
+        self.viewport.clamp_ip(self.parent.body_rect())
+        self.bind_rows()
+        for i, row in self.bound.items():
+            self.vlayout_row(row, i)
+
+    def setup_row_surface(self, row):
+        # Rows draw onto their own surfaces, which we blit into the viewport. Giving
+        # them a viewport makes their redraws propagate up to us.
+        row.viewport = pygame.Rect((0, 0), row.size)
+        if not surfaces.surface_fits(row.surface, row.size, row.bgcolor):
+            row.surface = surfaces.new_surface(row.size, row.bgcolor)
+        row.setup_surface()
+
+    def setup_surface(self):
+        for row in self.children:
+            self.setup_row_surface(row)
+
+    def place_rows(self, rows):
+        # Lays out rows outside of a full screen layout, e.g. after scrolling
+        for i, row in rows:
+            self.vlayout_row(row, i)
+            row.finalise_layout()
+            self.setup_row_surface(row)
+            row.redraw()
+        if self._laid_out is not None:
+            # We've laid out our new children ourselves; don't trigger a screen relayout
+            self._laid_out = self.children.copy()
+
+    def scrolled(self):
+        new = set(self.bind_rows())
+        self.place_rows([(i, row) for i, row in self.bound.items() if row in new])
+        self.redraw()
+
+    def rebind(self, indexes=None):
+        """Rebinds the rows in indexes (default: all bound rows), e.g. after the
+        underlying data has changed."""
+        rows = []
+        for i in (self.bound if indexes is None else indexes):
+            row = self.bound.get(i)
+            if row:
+                self.bind_cb(row, i)
+                row.resolve_tree(self)
+                self.hlayout_row(row)
+                rows.append((i, row))
+        self.place_rows(rows)
+
+    def set_row_count(self, n_rows):
+        self.n_rows = n_rows
+        self.height = self.n_rows * self.row_height
+        for i in [i for i in self.bound if i >= n_rows]:
+            self.spare.append(self.bound.pop(i))
+        self.children = list(self.bound.values())
+        self.relayout()
+
+    def draw(self):
+        if self.bgcolor:
+            self.canvas.fill(self.surface, self.bgcolor)
+        left, top = self.viewport.topleft
+        for row in self.children:
+            if not row.hide:
+                row.paint()
+                self.canvas.blit(self.surface, row.surface, row.rel_rect.move(-left, -top))
+        self._redraw = False
+
+
+class ListView(ScrollArea):
+    """Shows n_rows rows, creating only enough row widgets to fill the viewport.
+
+    row_factory() creates a row widget; bind_cb(widget, i) updates a widget to show
+    row i. As the view scrolls, widgets for rows that leave the viewport are rebound
+    to rows that enter it. All rows share a height, given by row_height or else
+    taken from a widget made by row_factory()."""
+    halign = 'fill'
+    valign = 'fill'
+
+    right_bar = True
+
+    num_rows = 10
+
+    def __init__(self, n_rows, row_factory, bind_cb, row_height=None, **kwargs):
+        body = ListViewBody(n_rows, row_factory, bind_cb, row_height)
+        super().__init__(body, **kwargs)
+
+    def max_contents_height(self):
+        return self.hbar_height() + self.num_rows * self.body.row_height
+
+    def ensure_visible(self, rect):
+        super().ensure_visible(rect)
+        self.body.scrolled()
+
+    def scroll_to_row(self, i):
+        rect = pygame.Rect(0, i * self.body.row_height, 1, self.body.row_height)
+        self.ensure_visible(rect)
+
+    def set_row_count(self, n_rows):
+        self.body.set_row_count(n_rows)
+
+    def refresh_rows(self, indexes=None):
+        self.body.rebind(indexes)
@@ -0,0 +1,189 @@
+from collections import deque
+
+import pygame
+
+from .. import surfaces
+from ..widget import Widget
+from .scroll import ScrollArea
+
+
+class LogViewBody(Widget):
+    supports_viewport = True
+
+    bgcolor = (0, 0, 0)
+
+    # Lines kept; older lines are dropped as new ones arrive
+    capacity = 10000
+
+    # Width in characters we ask to be laid out at
+    width_chars = 80
+
+    def __init__(self, capacity=None):
+        if capacity is not None:
+            self.capacity = capacity
+        self.lines = deque(maxlen=self.capacity)
+        self.n_appended = 0 # lines ever appended; the last len(self.lines) are kept
+        self.n_shown = 0 # n_appended as of the last flush()
+        self.shown_first = 0 # first_line() as of the last flush()
+        self.backing = None
+        self.drawn_top = 0 # abs_top() as of the last update_backing()
+        self.drawn_end = 0 # n_appended as of the last update_backing()
+        super().__init__()
+        self.resolve_size()
+
+    def settings_updated(self):
+        self.resolve_size()
+        self.backing = None
+        self.invalidate_size()
+
+    def resolve_size(self):
+        self.char_width, self.line_height = self.render_text(' ').get_size()
+
+    def min_contents_width(self):
+        return self.width_chars * self.char_width
+    max_contents_width = min_contents_width
+
+    def min_contents_height(self):
+        # Lines appended since the last flush() aren't laid out until then
+        return (self.n_shown - self.shown_first) * self.line_height
+    max_contents_height = min_contents_height
+
+    def first_line(self):
+        """Returns the number of the first line kept, counting from the first ever appended."""
+        return self.n_appended - len(self.lines)
+
+    def append(self, lines):
+        """Adds lines, a string or a sequence of strings, to the end of the log.
+        Cheap: the layout and drawing they need is done once per frame, by flush()."""
+        lines = lines.splitlines() if isinstance(lines, str) else list(lines)
+        self.lines.extend(lines)
+        self.n_appended += len(lines)
+        self.root.flush_before_update(self)
+
+    def clear(self):
+        self.lines.clear()
+        self.n_appended = self.n_shown = self.shown_first = 0
+        self.backing = None
+        self.height = self.max_height()
+        self.viewport.top = 0
+        self.relayout()
+
+    def at_end(self):
+        return self.viewport.bottom >= self.parent.body_rect().bottom
+
+    def scroll_to_end(self):
+        self.viewport.bottom = self.parent.body_rect().bottom
+        self.viewport.clamp_ip(self.parent.body_rect())
+        self.redraw()
+
+    def flush(self):
+        """Brings our size and viewport up to date with the lines appended since the
+        last frame. We follow the end of the log if the viewport was showing it;
+        otherwise the viewport stays on the same lines while older ones are dropped."""
+        if self.n_appended == self.n_shown or not self.parent:
+            return
+        following = self.at_end()
+        n_dropped = self.first_line() - self.shown_first
+        self.n_shown, self.shown_first = self.n_appended, self.first_line()
+        self.height = self.max_height()
+        if following:
+            self.scroll_to_end()
+        else:
+            self.viewport.top = max(0, self.viewport.top - n_dropped * self.line_height)
+        if self.parent.autohide_bars and self.parent.show_vbars != self.parent.need_vbars():
+            self.relayout()
+        self.redraw()
+
+    def vlayout(self):
+        self.viewport.clamp_ip(self.parent.body_rect())
+
+    def finalise_layout(self):
+        super().finalise_layout()
+        # Show any lines appended before we were laid out
+        self.flush()
+
+    def abs_top(self):
+        # The viewport's top in pixels from the first line ever appended, which
+        # unlike our own coordinates doesn't change as old lines are dropped
+        return self.viewport.top - self.margin + self.first_line() * self.line_height
+
+    def draw_line(self, i, top):
+        y = i * self.line_height - top
+        rect = pygame.Rect(0, y, self.backing.get_width(), self.line_height)
+        self.backing.fill(self.bgcolor, rect)
+        text = self.lines[i - self.first_line()].expandtabs()
+        self.backing.blit(self.render_text(text), (self.margin, y))
+
+    def update_backing(self):
+        """Brings self.backing, our rendering of the viewport, up to date. What's
+        still in view is scrolled rather than drawn again, so only lines that have
+        come into view, and new lines, are rendered."""
+        size = self.viewport.size
+        top = self.abs_top()
+        first = max(self.first_line(), top // self.line_height)
+        last = min(self.n_appended, -(-(top + size[1]) // self.line_height))
+        if self.backing is None or self.backing.get_size() != size \
+                or abs(top - self.drawn_top) >= size[1]:
+            if self.backing is None or self.backing.get_size() != size:
+                self.backing = surfaces.new_surface(size, self.bgcolor)
+            self.backing.fill(self.bgcolor)
+            wanted = range(first, last)
+        else:
+            delta = top - self.drawn_top
+            self.backing.scroll(0, -delta)
+            if delta > 0:
+                exposed = pygame.Rect(0, size[1] - delta, size[0], delta)
+            else:
+                exposed = pygame.Rect(0, 0, size[0], -delta)
+            self.backing.fill(self.bgcolor, exposed)
+            exposed_first = (top + exposed.top) // self.line_height
+            exposed_last = -(-(top + exposed.bottom) // self.line_height)
+            wanted = [i for i in range(first, last)
+                      if exposed_first <= i < exposed_last or i >= self.drawn_end]
+        for i in wanted:
+            self.draw_line(i, top)
+        self.drawn_top = top
+        self.drawn_end = self.n_appended
+
+    def draw(self):
+        super().draw()
+        if self.viewport.width > 0 and self.viewport.height > 0:
+            self.update_backing()
+            # Leave the border drawn
+            inside = self.surface.get_rect().inflate(-2 * self.border_thickness,
+                                                     -2 * self.border_thickness)
+            self.canvas.blit(self.surface, self.backing, inside, inside)
+
+
+class LogView(ScrollArea):
+    """Shows a log, such as a process's output, that lines are appended to as they
+    arrive. Only the last capacity lines are kept. The view follows the end of the
+    log unless it has been scrolled away from it.
+
+    append() only stores the lines; once per frame the view is brought up to date,
+    scrolling what's already drawn and rendering only the lines that have come into
+    view, so appending thousands of lines a second costs little more than
+    appending a few."""
+    halign = 'fill'
+    valign = 'fill'
+
+    right_bar = True
+
+    num_rows = 20
+
+    def __init__(self, capacity=None, **kwargs):
+        body = LogViewBody(capacity)
+        super().__init__(body, **kwargs)
+
+    def max_contents_height(self):
+        body = self.body
+        return self.hbar_height() + self.num_rows * body.line_height
+
+    def append(self, lines):
+        self.body.append(lines)
+
+    def clear(self):
+        self.body.clear()
+
+    def scroll_to_end(self):
+        self.body.scroll_to_end()
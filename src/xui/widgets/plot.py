@@ -0,0 +1,223 @@
+import pygame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .. import surfaces
+from ..widget import Widget
+
+
+class Plot(Widget):
+    """Plots a stream of samples, newest on the right, as a line or as columns.
+
+    Samples are kept in a numpy ring buffer of capacity samples. Each pixel column
+    shows the minimum and maximum of the samples that fall in it, so the cost of
+    drawing depends on our size, not on the number of samples: window samples are
+    shown across our width. Appending samples scrolls what's already drawn and
+    only draws the new columns; everything is redrawn only when our size or the
+    y range changes. Needs numpy."""
+
+    bgcolor = (0, 0, 0)
+    color = (0, 255, 0)
+
+    # 'line' or 'columns'
+    style = 'line'
+
+    plot_size = (200, 60)
+
+    # Samples kept, and samples shown across our width (None: one per pixel)
+    capacity = 65536
+    window = None
+
+    # Fixed y range, or None to grow the range to fit the samples as they come
+    y_range = None
+
+    # Fraction of the range added above and below when it grows
+    headroom = 0.1
+
+    def __init__(self, **kwargs):
+        if numpy is None:
+            raise ImportError('Plot needs numpy')
+        super().__init__(**kwargs)
+        self.samples = numpy.zeros(self.capacity)
+        self.n_samples = 0 # total appended, of which the last capacity are kept
+        self.plot_surface = None
+        self.auto_range = None
+        self.reset_columns(1, 1)
+
+    def min_contents_width(self):
+        return self.plot_size[0]
+    max_contents_width = min_contents_width
+
+    def min_contents_height(self):
+        return self.plot_size[1]
+    max_contents_height = min_contents_height
+
+    def reset_columns(self, n_cols, samples_per_col):
+        """Works out the min and max of each column again from the kept samples."""
+        self.samples_per_col = samples_per_col
+        self.col_min = numpy.full(n_cols, numpy.nan)
+        self.col_max = numpy.full(n_cols, numpy.nan)
+        n_kept = min(self.n_samples, self.capacity)
+        # Columns are aligned to multiples of samples_per_col since the first sample
+        self.partial = self.n_samples % samples_per_col
+        n_full = min(n_cols, (n_kept - self.partial) // samples_per_col)
+        if n_full:
+            end = self.n_samples - self.partial
+            values = self.recent(end - n_full * samples_per_col, end).reshape(n_full, samples_per_col)
+            self.col_min[-n_full:] = numpy.fmin.reduce(values, axis=1)
+            self.col_max[-n_full:] = numpy.fmax.reduce(values, axis=1)
+        partial = self.recent(self.n_samples - min(self.partial, n_kept), self.n_samples)
+        self.partial_min = numpy.fmin.reduce(partial) if len(partial) else numpy.nan
+        self.partial_max = numpy.fmax.reduce(partial) if len(partial) else numpy.nan
+        self.fit_range()
+        self.new_cols = None # None: all columns need drawing
+
+    def recent(self, start, end):
+        """Returns samples start to end (counted from the first ever appended),
+        which must still be kept."""
+        i, j = start % self.capacity, end % self.capacity
+        if end - start == 0:
+            return self.samples[:0]
+        if i < j:
+            return self.samples[i:j]
+        return numpy.concatenate([self.samples[i:], self.samples[:j]])
+
+    def append(self, values):
+        """Adds a sample, or a sequence of them."""
+        values = numpy.asarray(values, dtype=float).ravel()
+        n = len(values)
+        if not n:
+            return
+        self.store(values)
+        per_col = self.samples_per_col
+        # Finish the part-filled column, then any whole columns
+        need = per_col - self.partial
+        if n < need:
+            self.partial_min = numpy.fmin(self.partial_min, numpy.fmin.reduce(values))
+            self.partial_max = numpy.fmax(self.partial_max, numpy.fmax.reduce(values))
+            self.partial += n
+            return
+        first_min = numpy.fmin(self.partial_min, numpy.fmin.reduce(values[:need]))
+        first_max = numpy.fmax(self.partial_max, numpy.fmax.reduce(values[:need]))
+        n_whole = (n - need) // per_col
+        whole = values[need:need + n_whole * per_col].reshape(n_whole, per_col)
+        new_min = numpy.concatenate([[first_min], numpy.fmin.reduce(whole, axis=1)])
+        new_max = numpy.concatenate([[first_max], numpy.fmax.reduce(whole, axis=1)])
+        rest = values[need + n_whole * per_col:]
+        self.partial = len(rest)
+        self.partial_min = numpy.fmin.reduce(rest) if len(rest) else numpy.nan
+        self.partial_max = numpy.fmax.reduce(rest) if len(rest) else numpy.nan
+        self.add_columns(new_min, new_max)
+
+    def store(self, values):
+        if len(values) > self.capacity:
+            self.n_samples += len(values) - self.capacity
+            values = values[-self.capacity:]
+        i = self.n_samples % self.capacity
+        first = min(len(values), self.capacity - i)
+        self.samples[i:i + first] = values[:first]
+        self.samples[:len(values) - first] = values[first:]
+        self.n_samples += len(values)
+
+    def add_columns(self, new_min, new_max):
+        n_cols = len(self.col_min)
+        k = min(len(new_min), n_cols)
+        self.col_min[:n_cols - k] = self.col_min[k:]
+        self.col_max[:n_cols - k] = self.col_max[k:]
+        self.col_min[n_cols - k:] = new_min[-k:]
+        self.col_max[n_cols - k:] = new_max[-k:]
+        if self.new_cols is not None:
+            self.new_cols = min(n_cols, self.new_cols + k)
+        if self.y_range is None and self.grow_range(new_min[-k:], new_max[-k:]):
+            self.new_cols = None
+        self.redraw()
+
+    def fit_range(self):
+        """Fits auto_range to the columns shown, shrinking it if need be."""
+        self.auto_range = None
+        if self.y_range is None:
+            self.grow_range(self.col_min, self.col_max)
+
+    def grow_range(self, new_min, new_max):
+        lo = numpy.fmin.reduce(new_min)
+        hi = numpy.fmax.reduce(new_max)
+        if numpy.isnan(lo):
+            return False
+        if self.auto_range and self.auto_range[0] <= lo and hi <= self.auto_range[1]:
+            return False
+        if self.auto_range:
+            lo = min(lo, self.auto_range[0])
+            hi = max(hi, self.auto_range[1])
+        pad = (hi - lo) * self.headroom or 1
+        self.auto_range = (lo - pad, hi + pad)
+        return True
+
+    def clear(self):
+        self.n_samples = 0
+        self.reset_columns(len(self.col_min), self.samples_per_col)
+        self.redraw()
+
+    def set_window(self, window):
+        self.window = window
+        self.plot_surface = None
+        self.redraw()
+
+    def set_y_range(self, y_range):
+        self.y_range = y_range
+        self.fit_range()
+        self.new_cols = None
+        self.redraw()
+
+    def pixel_rows(self, values):
+        lo, hi = self.y_range or self.auto_range or (0, 1)
+        height = self.plot_surface.get_height()
+        scale = (height - 1) / ((hi - lo) or 1)
+        with numpy.errstate(invalid='ignore'):
+            return numpy.clip((height - 1) - numpy.round((values - lo) * scale), 0, height - 1)
+
+    def rasterize(self, first):
+        """Draws columns first onwards onto plot_surface."""
+        width, height = self.plot_surface.get_size()
+        top = self.pixel_rows(self.col_max[first:])
+        bottom = self.pixel_rows(self.col_min[first:])
+        if self.style == 'columns':
+            bottom = numpy.where(numpy.isnan(top), numpy.nan, height - 1)
+        else:
+            # Stretch each column to meet the one before, so the line is unbroken
+            before = slice(max(first - 1, 0), -1)
+            pad = [numpy.nan] * (not first)
+            prev_top = self.pixel_rows(numpy.concatenate([pad, self.col_max[before]]))
+            prev_bottom = self.pixel_rows(numpy.concatenate([pad, self.col_min[before]]))
+            top = numpy.fmin(top, prev_bottom)
+            bottom = numpy.fmax(bottom, prev_top)
+        y = numpy.arange(height)
+        with numpy.errstate(invalid='ignore'):
+            mask = (y >= top[:, None]) & (y <= bottom[:, None])
+        pixels = pygame.surfarray.pixels2d(self.plot_surface)
+        pixels[first:] = self.plot_surface.map_rgb(self.bgcolor)
+        pixels[first:][mask] = self.plot_surface.map_rgb(self.color)
+        del pixels # unlocks the surface
+
+    def update_plot_surface(self, size):
+        width = size[0]
+        if self.plot_surface is None or self.plot_surface.get_size() != size:
+            self.plot_surface = surfaces.new_surface(size, self.bgcolor)
+            per_col = -(-self.window // width) if self.window else 1
+            self.reset_columns(width, per_col)
+        if self.new_cols is None:
+            self.rasterize(0)
+        elif self.new_cols:
+            self.plot_surface.scroll(-self.new_cols, 0)
+            self.rasterize(width - self.new_cols)
+        self.new_cols = 0
+
+    def draw(self):
+        super().draw()
+        size = (self.width - 2 * self.margin, self.height - 2 * self.margin)
+        if size[0] <= 0 or size[1] <= 0:
+            return
+        self.update_plot_surface(size)
+        self.canvas.blit(self.surface, self.plot_surface, (self.margin, self.margin))
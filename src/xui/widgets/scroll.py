@@ -40,7 +40,7 @@ class ScrollBar(Widget):
             button = pygame.Rect(0, button_start, self.width, button_length)
         else:
             button = pygame.Rect(button_start, 0, button_length, self.height)
-        pygame.draw.rect(self.surface, self.color, button)
+        self.canvas.rect(self.surface, self.color, button)
 
     def jump_to_pos(self, pos):
         offset = pos[self.vertical]
@@ -19,7 +19,7 @@ class HBar(Widget):
         super().draw()
         rect = pygame.Rect(self.margin, 0, self.width - 2 * self.margin, self.bar_height)
         rect.centery = self.height // 2
-        pygame.draw.rect(self.surface, self.color, rect)
+        self.canvas.rect(self.surface, self.color, rect)
 
 
 class VBar(Widget):
@@ -38,7 +38,7 @@ class VBar(Widget):
         super().draw()
         rect = pygame.Rect(0, self.margin, self.bar_width, self.height - 2 * self.margin)
         rect.centerx = self.width // 2
-        pygame.draw.rect(self.surface, self.color, rect)
+        self.canvas.rect(self.surface, self.color, rect)
 
 
 class Square(Widget):
@@ -32,6 +32,27 @@ class TextAreaBody(Widget):
 
     cursor_flash_period = 0.5
 
+    keybindings = {
+        'backspace': ('handle_backspace', False),
+        'CTRL-backspace': ('handle_backspace', True),
+        'delete': ('handle_delete', False),
+        'CTRL-delete': ('handle_delete', True),
+        'return': ('handle_enter', False),
+        'KP-enter': ('handle_enter', False),
+        'CTRL-return': ('handle_enter', True),
+        'CTRL-KP-enter': ('handle_enter', True),
+        'left': ('handle_left', False),
+        'CTRL-left': ('handle_left', True),
+        'right': ('handle_right', False),
+        'CTRL-right': ('handle_right', True),
+        'up': 'handle_up',
+        'down': 'handle_down',
+        'home': ('handle_home', False),
+        'CTRL-home': ('handle_home', True),
+        'end': ('handle_end', False),
+        'CTRL-end': ('handle_end', True),
+    }
+
     def __init__(self, text, update_cb, commit_cb, highlight_cb):
         super().__init__()
         self.rows = text.split('\n')
@@ -57,8 +78,7 @@ class TextAreaBody(Widget):
         if (n_rows, n_cols) != (self.n_rows, self.n_cols):
             self.n_rows = n_rows
             self.n_cols = n_cols
-            self.resolve_size()
-            self.relayout()
+            self.invalidate_size()
 
     def focus_gained(self):
         self.flash_cursor()
@@ -179,36 +199,19 @@ class TextAreaBody(Widget):
         self.text_updated()
         self.update_cursor(self.cursor_row, self.cursor_col + 1)
 
+    def run_keybinding(self, action, event):
+        result = super().run_keybinding(action, event)
+        self.show_cursor()
+        return result
+
     def handle_keydown(self, event, keystroke):
-        ctrl_mod = 'CTRL-' in keystroke
-        if ctrl_mod:
-            keystroke = keystroke.replace('CTRL-', '')
-        if keystroke == 'backspace':
-            self.handle_backspace(ctrl_mod)
-        elif keystroke == 'delete':
-            self.handle_delete(ctrl_mod)
-        elif keystroke in ['return', 'KP-enter']:
-            self.handle_enter(ctrl_mod)
-        elif keystroke == 'left':
-            self.handle_left(ctrl_mod)
-        elif keystroke == 'right':
-            self.handle_right(ctrl_mod)
-        elif keystroke == 'up' and not ctrl_mod:
-            self.handle_up()
-        elif keystroke == 'down' and not ctrl_mod:
-            self.handle_down()
-        elif keystroke == 'home':
-            self.handle_home(ctrl_mod)
-        elif keystroke == 'end':
-            self.handle_end(ctrl_mod)
-        elif ('ALT-' not in keystroke
-              and not ctrl_mod
+        if ('ALT-' not in keystroke
+              and 'CTRL-' not in keystroke
               and event.unicode and 32 <= ord(event.unicode) <= 126):
             self.handle_char(event.unicode)
-        else:
-            return False
-        self.show_cursor()
-        return True
+            self.show_cursor()
+            return True
+        return False
 
     def cursor_rect(self):
         x = self.cursor_col * self.char_width
@@ -248,7 +251,7 @@ class TextAreaBody(Widget):
                     blocks = [self.render_text(line)]
                 x = -left
                 for block in blocks:
-                    self.surface.blit(block, (x, y - top))
+                    self.canvas.blit(self.surface, block, (x, y - top))
                     x += block.get_width()
         if self.draw_cursor:
             rect = self.cursor_rect().move(-left, -top)
@@ -256,9 +259,9 @@ class TextAreaBody(Widget):
                 char = self.rows[self.cursor_row][self.cursor_col]
                 text_color = 'black' # XXX choose me
                 text = self.render_text(char, color=text_color, bgcolor=self.color)
-                self.surface.blit(text, rect)
+                self.canvas.blit(self.surface, text, rect)
             else:
-                pygame.draw.rect(self.surface, self.color, rect)
+                self.canvas.rect(self.surface, self.color, rect)
 
 
 class TextArea(ScrollArea):
@@ -299,4 +302,4 @@ class TextArea(ScrollArea):
         super().draw()
         if self.enabled:
             color = self.focus_border_color if self.has_focus else self.border_color
-            pygame.draw.rect(self.surface, color, self.surface.get_rect(), 1)
+            self.canvas.rect(self.surface, color, self.surface.get_rect(), 1)
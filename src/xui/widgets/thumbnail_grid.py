@@ -0,0 +1,219 @@
+import os
+
+import pygame
+
+from ..images import fit_size, thumbnail_loader
+from ..widget import Widget
+from .scroll import ScrollArea
+
+
+class ThumbnailGridBody(Widget):
+    supports_viewport = True
+
+    bgcolor = (0, 0, 0)
+    placeholder_color = (48, 48, 48)
+    selected_color = (0, 0, 192)
+
+    # Pixels between thumbnails
+    spacing = 8
+
+    # Length of each thumbnail's longer side
+    thumb_size = 128
+
+    # Rows above and below the viewport whose thumbnails are loaded in advance
+    prefetch_rows = 2
+
+    def __init__(self, paths, select_cb=None):
+        self.select_cb = select_cb
+        self.n_cols = 1
+        self.selected = None
+        super().__init__()
+        self.set_paths(paths)
+
+    def set_paths(self, paths):
+        self.paths = paths
+        self.mtimes = {} # index -> file mtime, or None if it's missing, for rows near the viewport
+        self.requested = {} # thumbnail key -> index, for thumbnails being loaded
+        self.thumbs = {} # index -> thumbnail scaled to thumb_size, for rows near the viewport
+        self.stretched = {} # index -> (cached level, it scaled to fit), shown until thumbs has it
+        self.selected = None
+        self.relayout()
+        self.redraw()
+
+    def set_thumb_size(self, thumb_size):
+        self.thumb_size = thumb_size
+        self.thumbs = {}
+        self.stretched = {}
+        self.width_updated()
+        self.relayout()
+        self.redraw()
+
+    def cell_size(self):
+        return self.thumb_size + self.spacing
+
+    def n_rows(self):
+        return -(-len(self.paths) // self.n_cols)
+
+    def min_contents_width(self):
+        return self.thumb_size
+    max_contents_width = min_contents_width
+
+    def min_contents_height(self):
+        return max(0, self.n_rows() * self.cell_size() - self.spacing)
+    max_contents_height = min_contents_height
+
+    def width_updated(self):
+        self.n_cols = max(1, (self.width - 2 * self.margin + self.spacing) // self.cell_size())
+
+    def vlayout(self):
+        # Zooming in or narrowing may have left the viewport below our last row
+        self.viewport.clamp_ip(self.parent.body_rect())
+
+    def row_range(self, extra=0):
+        cell = self.cell_size()
+        top = self.viewport.top - self.margin
+        first = max(0, top // cell - extra)
+        last = min(self.n_rows(), -(-(top + self.viewport.height) // cell) + extra)
+        return range(first, last)
+
+    def index_range(self, extra=0):
+        rows = self.row_range(extra)
+        return range(rows.start * self.n_cols, min(len(self.paths), rows.stop * self.n_cols))
+
+    def cell_rect(self, i):
+        cell = self.cell_size()
+        row, col = divmod(i, self.n_cols)
+        return pygame.Rect(self.margin + col * cell, self.margin + row * cell,
+                           self.thumb_size, self.thumb_size)
+
+    def index_at(self, pos):
+        cell = self.cell_size()
+        col = (pos[0] - self.margin) // cell
+        i = (pos[1] - self.margin) // cell * self.n_cols + col
+        if 0 <= col < self.n_cols and 0 <= i < len(self.paths) and self.cell_rect(i).collidepoint(pos):
+            return i
+        return None
+
+    def handle_mouse_down(self, button, pos):
+        if button != 'left':
+            return False
+        i = self.index_at(pos)
+        if i is not None:
+            self.selected = i
+            self.redraw()
+            if self.select_cb:
+                self.select_cb(i)
+        return True
+
+    def mtime(self, i):
+        # Files are only looked at once they come near the viewport, and again
+        # each time they come back near it
+        if i not in self.mtimes:
+            try:
+                self.mtimes[i] = os.stat(self.paths[i]).st_mtime_ns
+            except OSError:
+                self.mtimes[i] = None
+        return self.mtimes[i]
+
+    def thumb_loaded(self, key, surface):
+        self.requested.pop(key, None)
+        self.redraw()
+
+    def update_requests(self, wanted):
+        """Asks for the thumbnails of the items in wanted that we don't have yet,
+        and withdraws requests for items that are no longer wanted."""
+        for key, i in list(self.requested.items()):
+            if i not in wanted:
+                thumbnail_loader.cancel(key, self.thumb_loaded)
+                del self.requested[key]
+        for cache in (self.thumbs, self.stretched, self.mtimes):
+            for i in [i for i in cache if i not in wanted]:
+                del cache[i]
+        level = thumbnail_loader.level_for(self.thumb_size)
+        app = self.root.app
+        for i in wanted:
+            if i in self.thumbs:
+                continue
+            mtime = self.mtime(i)
+            if mtime is None:
+                continue
+            key = (self.paths[i], mtime, level)
+            if key in self.requested:
+                continue
+            surface = thumbnail_loader.request(app, key, self.thumb_loaded)
+            if surface is not None:
+                self.thumbs[i] = self.fit_thumb(surface)
+                self.stretched.pop(i, None)
+            elif not thumbnail_loader.failure(key):
+                self.requested[key] = i
+
+    def fit_thumb(self, surface):
+        size = fit_size(surface.get_size(), (self.thumb_size, self.thumb_size))
+        if size == surface.get_size():
+            return surface
+        return pygame.transform.smoothscale(surface, size)
+
+    def stretched_thumb(self, i, level):
+        """Returns whichever level of item i's thumbnail is cached, scaled to fit
+        thumb_size, or None. Kept, so it's only scaled again if the level changes."""
+        nearest = thumbnail_loader.nearest_cached(self.paths[i], self.mtime(i), level)
+        if nearest is None:
+            return None
+        stretched = self.stretched.get(i)
+        if stretched is None or stretched[0] is not nearest:
+            size = fit_size(nearest.get_size(), (self.thumb_size, self.thumb_size))
+            stretched = self.stretched[i] = (nearest, pygame.transform.scale(nearest, size))
+        return stretched[1]
+
+    def draw(self):
+        super().draw()
+        self.update_requests(self.index_range(self.prefetch_rows))
+        left, top = self.viewport.topleft
+        level = thumbnail_loader.level_for(self.thumb_size)
+        for i in self.index_range():
+            rect = self.cell_rect(i).move(-left, -top)
+            if i == self.selected:
+                self.canvas.rect(self.surface, self.selected_color,
+                                 rect.inflate(self.spacing, self.spacing))
+            thumb = self.thumbs.get(i)
+            if thumb is None and self.mtime(i) is not None:
+                # While the right level loads, stretch whichever level we have
+                thumb = self.stretched_thumb(i, level)
+            if thumb is None:
+                self.canvas.rect(self.surface, self.placeholder_color, rect)
+            else:
+                self.canvas.blit(self.surface, thumb, thumb.get_rect(center=rect.center))
+
+
+class ThumbnailGrid(ScrollArea):
+    """Shows image files as a grid of thumbnails, however many files there are.
+    Only the thumbnails near the viewport are loaded, a few rows ahead of
+    scrolling; requests for rows that scroll away before they load are withdrawn.
+    Thumbnails come from images.thumbnail_loader, which keeps several sizes of
+    each, so changing thumb_size shows the nearest size straight away. Set
+    images.thumbnail_loader.disk_cache_dir to keep thumbnails between runs."""
+    halign = 'fill'
+    valign = 'fill'
+
+    right_bar = True
+
+    num_rows = 4
+
+    def __init__(self, paths, select_cb=None, **kwargs):
+        body = ThumbnailGridBody(paths, select_cb)
+        super().__init__(body, **kwargs)
+
+    def max_contents_height(self):
+        body = self.body
+        height = 2 * body.margin + self.num_rows * body.cell_size() - body.spacing
+        return self.hbar_height() + min(height, body.max_height())
+
+    def scroll_to(self, i):
+        body = self.body
+        self.ensure_visible(body.cell_rect(i).inflate(0, body.spacing).clip(self.body_rect()))
+
+    def set_paths(self, paths):
+        self.body.set_paths(paths)
+
+    def set_thumb_size(self, thumb_size):
+        self.body.set_thumb_size(thumb_size)
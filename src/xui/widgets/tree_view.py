@@ -0,0 +1,310 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from ..widget import Widget
+from .scroll import ScrollArea
+
+
+class TreeNode:
+    __slots__ = ('item', 'parent', 'depth', 'children', 'expanded', 'loading')
+
+    def __init__(self, item, parent=None):
+        self.item = item
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.children = None # None until loaded
+        self.expanded = False
+        self.loading = False
+
+    def visible_descendants(self):
+        """Returns the nodes shown below us while we're expanded, in order."""
+        rows = []
+        stack = list(reversed(self.children or []))
+        while stack:
+            node = stack.pop()
+            rows.append(node)
+            if node.expanded and node.children:
+                stack.extend(reversed(node.children))
+        return rows
+
+
+class TreeViewBody(Widget):
+    supports_viewport = True
+
+    bgcolor = (0, 0, 0)
+    selected_color = (0, 0, 192)
+    loading_color = 'grey'
+
+    # Pixels each level is indented by
+    indent = 20
+
+    # Width in characters we ask to be laid out at
+    width_chars = 40
+
+    # Load children on a worker thread, for get_children() that may be slow
+    # (e.g. listing directories); rows show as loading until they arrive
+    background = False
+
+    keybindings = {
+        'up': ('move_selection', -1),
+        'down': ('move_selection', 1),
+        'right': 'handle_right',
+        'left': 'handle_left',
+        'return': 'handle_enter',
+    }
+
+    executor = None # shared by all trees
+
+    def __init__(self, roots, get_children, get_label=str, has_children=None,
+                 select_cb=None, activate_cb=None):
+        self.get_children = get_children
+        self.get_label = get_label
+        self.has_children = has_children
+        self.select_cb = select_cb
+        self.activate_cb = activate_cb
+        super().__init__()
+        self.resolve_size()
+        self.set_roots(roots)
+
+    def settings_updated(self):
+        self.resolve_size()
+        self.invalidate_size()
+
+    def resolve_size(self):
+        self.char_width, self.row_height = self.render_text(' ').get_size()
+
+    def set_roots(self, roots):
+        # rows is the flattened list of visible nodes; expanding and collapsing
+        # splice a node's visible descendants in and out of it
+        self.rows = [TreeNode(item) for item in roots]
+        self.selected = None
+        self.rows_updated()
+
+    def rows_updated(self):
+        self.height = self.max_height()
+        self.relayout()
+        self.redraw()
+
+    def min_contents_width(self):
+        return self.width_chars * self.char_width
+    max_contents_width = min_contents_width
+
+    def min_contents_height(self):
+        return len(self.rows) * self.row_height
+    max_contents_height = min_contents_height
+
+    def vlayout(self):
+        self.viewport.clamp_ip(self.parent.body_rect())
+
+    def is_leaf(self, node):
+        if node.children is not None:
+            return not node.children
+        return self.has_children is not None and not self.has_children(node.item)
+
+    def expand(self, row_i):
+        node = self.rows[row_i]
+        if node.expanded or self.is_leaf(node):
+            return
+        node.expanded = True
+        if node.children is None:
+            if self.background:
+                self.load_in_background(node)
+                self.redraw()
+                return
+            node.children = [TreeNode(item, node) for item in self.get_children(node.item)]
+        self.insert_children(row_i, node)
+
+    def insert_children(self, row_i, node):
+        new = node.visible_descendants()
+        self.rows[row_i + 1:row_i + 1] = new
+        if self.selected is not None and self.selected > row_i:
+            self.selected += len(new)
+        self.rows_updated()
+
+    def collapse(self, row_i):
+        node = self.rows[row_i]
+        if not node.expanded:
+            return
+        node.expanded = False
+        end = row_i + 1
+        while end < len(self.rows) and self.rows[end].depth > node.depth:
+            end += 1
+        del self.rows[row_i + 1:end]
+        if self.selected is not None and self.selected > row_i:
+            self.selected = row_i if self.selected < end else self.selected - (end - row_i - 1)
+        self.rows_updated()
+
+    def toggle(self, row_i):
+        if self.rows[row_i].expanded:
+            self.collapse(row_i)
+        else:
+            self.expand(row_i)
+
+    def load_in_background(self, node):
+        if node.loading:
+            return
+        node.loading = True
+        if TreeViewBody.executor is None:
+            TreeViewBody.executor = ThreadPoolExecutor(1, thread_name_prefix='xui-tree')
+        app = self.root.app
+        future = self.executor.submit(lambda: list(self.get_children(node.item)))
+        future.add_done_callback(lambda future: app.call_soon_threadsafe(self.loaded, node, future))
+
+    def loaded(self, node, future):
+        node.loading = False
+        try:
+            items = future.result()
+        except Exception as e:
+            self.log('Could not load children of %r: %s' % (node.item, e))
+            items = []
+        node.children = [TreeNode(item, node) for item in items]
+        if not node.expanded:
+            self.redraw()
+            return
+        try:
+            # Only look for the node if it's still showing
+            row_i = self.rows.index(node)
+        except ValueError:
+            return
+        self.insert_children(row_i, node)
+
+    def row_at(self, y):
+        row_i = (y - self.margin) // self.row_height
+        return row_i if 0 <= row_i < len(self.rows) else None
+
+    def row_rect(self, row_i):
+        return pygame.Rect(0, self.margin + row_i * self.row_height, self.width, self.row_height)
+
+    def select(self, row_i):
+        self.selected = row_i
+        self.parent.ensure_visible(self.row_rect(row_i).clip(self.parent.body_rect()))
+        if self.select_cb:
+            self.select_cb(self.rows[row_i].item)
+
+    def handle_mouse_down(self, button, pos):
+        if button != 'left':
+            return False
+        self.focus()
+        row_i = self.row_at(pos[1])
+        if row_i is None:
+            return True
+        node = self.rows[row_i]
+        # Clicking the expander toggles the node; clicking elsewhere selects it
+        expander_x = self.margin + node.depth * self.indent
+        if expander_x <= pos[0] < expander_x + self.indent:
+            self.toggle(row_i)
+        else:
+            self.select(row_i)
+        return True
+
+    def move_selection(self, step):
+        if not self.rows:
+            return
+        row_i = 0 if self.selected is None else self.selected + step
+        self.select(max(0, min(len(self.rows) - 1, row_i)))
+
+    def handle_right(self):
+        if self.selected is None:
+            return False
+        node = self.rows[self.selected]
+        if node.expanded:
+            if node.children:
+                self.move_selection(1)
+        else:
+            self.expand(self.selected)
+
+    def handle_left(self):
+        if self.selected is None:
+            return False
+        node = self.rows[self.selected]
+        if node.expanded:
+            self.collapse(self.selected)
+        elif node.parent:
+            # Parents are above their children, and usually not far above
+            row_i = self.selected - 1
+            while self.rows[row_i] is not node.parent:
+                row_i -= 1
+            self.select(row_i)
+
+    def handle_enter(self):
+        if self.selected is None:
+            return False
+        if self.activate_cb:
+            self.activate_cb(self.rows[self.selected].item)
+        else:
+            self.toggle(self.selected)
+
+    def visible_rows(self):
+        top = self.viewport.top - self.margin
+        first = max(0, top // self.row_height)
+        last = min(len(self.rows), -(-(top + self.viewport.height) // self.row_height))
+        return range(first, last)
+
+    def draw_expander(self, node, rect):
+        if node.loading:
+            color = self.loading_color
+        elif self.is_leaf(node):
+            return
+        else:
+            color = self.color
+        x0, y0 = rect.left + rect.width / 4, rect.top + rect.height / 4
+        x1, y1 = rect.left + rect.width * 3 / 4, rect.top + rect.height * 3 / 4
+        if node.expanded:
+            points = [(x0, y0), (x1, y0), (rect.centerx, y1)]
+        else:
+            points = [(x0, y0), (x1, rect.centery), (x0, y1)]
+        self.canvas.polygon(self.surface, color, points)
+
+    def draw(self):
+        super().draw()
+        top = self.viewport.top
+        for row_i in self.visible_rows():
+            node = self.rows[row_i]
+            y = self.margin + row_i * self.row_height - top
+            if row_i == self.selected:
+                rect = pygame.Rect(0, y, self.viewport.width, self.row_height)
+                self.canvas.rect(self.surface, self.selected_color, rect)
+            x = self.margin + node.depth * self.indent
+            self.draw_expander(node, pygame.Rect(x, y, self.indent, self.row_height))
+            text = self.render_text(self.get_label(node.item))
+            self.canvas.blit(self.surface, text, (x + self.indent, y))
+
+
+class TreeView(ScrollArea):
+    """Shows a hierarchy, e.g. a filesystem, however large, without a widget per
+    node. Children are only asked for, with get_children(item), when their parent
+    is first expanded, on a worker thread if background is set. The visible rows
+    are kept as a flat list that expanding and collapsing a node splice the
+    node's descendants into and out of, and only the rows in view are drawn.
+
+    get_label(item) gives each item's text. has_children(item), if given, says
+    whether an item can be expanded before its children have been loaded."""
+    halign = 'fill'
+    valign = 'fill'
+
+    right_bar = True
+
+    num_rows = 20
+
+    def __init__(self, roots, get_children, get_label=str, has_children=None,
+                 select_cb=None, activate_cb=None, background=False, **kwargs):
+        body = TreeViewBody(roots, get_children, get_label, has_children,
+                            select_cb, activate_cb)
+        body.background = background
+        super().__init__(body, **kwargs)
+
+    def max_contents_height(self):
+        body = self.body
+        height = self.num_rows * body.row_height
+        return self.hbar_height() + min(height, body.max_height())
+
+    def focus(self):
+        self.body.focus()
+
+    def set_roots(self, roots):
+        self.body.set_roots(roots)
+
+    def selected_item(self):
+        body = self.body
+        return None if body.selected is None else body.rows[body.selected].item
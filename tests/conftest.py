@@ -0,0 +1,24 @@
+import os
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+
+import pygame
+import pytest
+
+from xui.app import App
+
+
+class HeadlessApp(App):
+    headless = True
+    resolution = (800, 600)
+
+
+@pytest.fixture
+def app():
+    # pygame is left initialised: fonts are cached across apps
+    return HeadlessApp()
+
+
+def press(app, key, unicode='', mod=0):
+    app.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key, mod=mod, unicode=unicode))
+    app.screen.update()
@@ -0,0 +1,85 @@
+import pytest
+
+from xui.widgets import Label, VBox
+
+
+@pytest.fixture
+def label(app):
+    app.virtual_time = 0
+    label = Label('Hello')
+    app.add_window(VBox([label], bgcolor=(0, 0, 0)))
+    app.screen.update()
+    return label
+
+
+def step(app, now):
+    app.virtual_time = now
+    app.update()
+
+
+def test_bgcolor_none_starts_from_inherited(app, label):
+    assert label.bgcolor is None
+    label.animate(1, easing='linear', bgcolor=(200, 100, 0))
+    step(app, .5)
+    assert label.bgcolor == (100, 50, 0)
+
+
+def test_animating_from_none_raises(app, label):
+    label.spam = None
+    with pytest.raises(ValueError):
+        label.animate(1, spam=5)
+
+
+def test_done_cb(app, label):
+    done = []
+    label.animate(1, margin=10, done_cb=lambda: done.append(True))
+    step(app, 1)
+    assert done == [True] and label.margin == 10
+
+
+def test_cancel_skips_done_cb(app, label):
+    done = []
+    animation = label.animate(1, margin=10, done_cb=lambda: done.append(True))
+    step(app, .5)
+    app.animator.cancel(label, 'margin')
+    step(app, 1)
+    assert animation.cancelled and not done
+    assert not app.animator
+
+
+def test_takeover_cancels_superseded(app, label):
+    done = []
+    first = label.animate(1, margin=10, spacing=4, done_cb=lambda: done.append(1))
+    step(app, .5)
+    second = label.animate(1, margin=0, done_cb=lambda: done.append(2))
+    step(app, 2)
+    assert first.cancelled and not first.finished
+    assert second.finished
+    assert done == [2]
+    # The superseded animation's other attributes still finish
+    assert label.spacing == 4
+
+
+def test_takeover_after_cancel(app, label):
+    label.animate(1, margin=10).cancel()
+    label.animate(1, margin=4)
+    step(app, 1)
+    assert label.margin == 4
+
+
+def test_geometry_relayouts(app, label):
+    popup = Label('Popup', bgcolor=(0, 0, 0))
+    app.screen.open_popup(popup)
+    app.screen.update()
+    popup.animate(1, easing='linear', x=100)
+    step(app, .5)
+    assert popup.rect.left == 50
+    step(app, 1)
+    assert popup.rect.left == 100
+
+
+def test_margin_relayouts(app, label):
+    width = label.rect.width
+    label.animate(1, margin=10)
+    step(app, 1)
+    assert label.rect.width == width + 20
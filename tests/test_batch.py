@@ -0,0 +1,81 @@
+from xui.widgets import Label, VBox
+
+
+class CountingLabel(Label):
+    def resolve_size(self):
+        self.resolves = getattr(self, 'resolves', 0) + 1
+        super().resolve_size()
+
+
+def make_labels(app, n=3):
+    labels = [CountingLabel('label %d' % i) for i in range(n)]
+    app.add_window(VBox(labels))
+    app.screen.update()
+    for label in labels:
+        label.resolves = 0
+    return labels
+
+
+def count_layouts(app):
+    layouts = []
+    layout = app.screen.layout
+    app.screen.layout = lambda: (layouts.append(True), layout())
+    return layouts
+
+
+def test_sizes_resolved_once(app):
+    labels = make_labels(app)
+    layouts = count_layouts(app)
+    with app.batch():
+        for i in range(5):
+            for label in labels:
+                label.set_text('x' * (i + 1))
+        assert [label.resolves for label in labels] == [0, 0, 0]
+    assert [label.resolves for label in labels] == [1, 1, 1]
+    app.screen.update()
+    assert layouts == [True]
+    assert [label.width for label in labels] == [5 * labels[0].char_width] * 3
+
+
+def test_no_layout_during_batch(app):
+    labels = make_labels(app)
+    layouts = count_layouts(app)
+    with app.batch():
+        labels[0].set_text('a longer text')
+        # e.g. a timer firing part way through
+        app.screen.update()
+        assert layouts == []
+        assert labels[0].width != labels[0].min_width()
+    app.screen.update()
+    assert layouts == [True]
+    assert labels[0].width == labels[0].min_width()
+
+
+def test_nested_batches(app):
+    labels = make_labels(app)
+    with app.batch():
+        labels[0].set_text('longer')
+        with app.batch():
+            labels[0].set_text('longer still')
+            labels[1].set_text('also longer')
+        # Only the outermost batch resolves sizes
+        assert labels[0].resolves == 0
+    assert [label.resolves for label in labels] == [1, 1, 0]
+
+
+def test_resolved_after_exception(app):
+    labels = make_labels(app)
+    try:
+        with app.batch():
+            labels[0].set_text('longer')
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert labels[0].resolves == 1
+    assert app.screen.batch_depth == 0
+
+
+def test_outside_batch_resolved_immediately(app):
+    labels = make_labels(app)
+    labels[0].set_text('longer')
+    assert labels[0].resolves == 1
@@ -0,0 +1,12 @@
+from xui.widgets import HBox, IconButton, XButton
+
+
+def test_icon_sprite_cache_is_bounded(app, monkeypatch):
+    monkeypatch.setattr(IconButton, 'sprites', IconButton.sprites.__class__())
+    monkeypatch.setattr(IconButton, 'sprite_cache_size', 4)
+    buttons = [XButton(width=10 + i, height=10 + i) for i in range(10)]
+    app.add_window(HBox(buttons))
+    app.screen.update()
+    assert len(IconButton.sprites) == 4
+    # The most recently drawn sizes are the ones kept
+    assert {key[1] for key in IconButton.sprites} == {b.size for b in buttons[-4:]}
@@ -0,0 +1,25 @@
+from xui.canvas import Canvas, DisplayList
+from xui.widgets import Label, VBox
+
+from conftest import HeadlessApp
+
+
+class DisplayListApp(HeadlessApp):
+    display_list = True
+
+
+def test_each_app_has_its_own_canvas():
+    app = HeadlessApp()
+    label = Label('Hello')
+    app.add_window(VBox([label]))
+    app.screen.update()
+    other = DisplayListApp()
+    other_label = Label('Hello')
+    other.add_window(VBox([other_label]))
+    other.screen.update()
+    assert type(label.canvas) is Canvas
+    assert type(other_label.canvas) is DisplayList
+    assert label.canvas is app.canvas
+    # Still draws after the other app was made
+    label.set_text('Bye')
+    app.screen.update()
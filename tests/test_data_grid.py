@@ -0,0 +1,119 @@
+import array
+
+import pytest
+
+from xui.widgets import DataGrid
+from xui.widgets import data_grid
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def ordering(request, monkeypatch):
+    # Sorting and filtering have a numpy path and a pure Python one
+    if request.param == 'python':
+        monkeypatch.setattr(data_grid, 'numpy', None)
+    elif data_grid.numpy is None:
+        pytest.skip('numpy is not installed')
+    return request.param
+
+
+def make_grid(app, n_rows=1000):
+    ids = array.array('l', range(n_rows))
+    # Descending, so sorting by it reverses the rows
+    scores = array.array('d', [float(n_rows - i) for i in range(n_rows)])
+    names = ['name %d' % i for i in range(n_rows)]
+    grid = DataGrid([ids, scores, names], ['id', 'score', 'name'])
+    app.add_window(grid)
+    app.screen.update()
+    return grid, [ids, scores, names]
+
+
+def drawn(grid):
+    """Returns the data indexes of the rows drawn last, in order."""
+    body = grid.body
+    cached = {key[0] for key in body.cell_cache if isinstance(key, tuple)}
+    return [i for i in map(body.data_index, body.visible_rows()) if i in cached]
+
+
+def count_renders(body):
+    rendered = []
+    render_text = body.render_text
+    def counting(text, **kwargs):
+        rendered.append(text)
+        return render_text(text, **kwargs)
+    body.render_text = counting
+    return rendered
+
+
+def test_scroll(app, ordering):
+    grid, columns = make_grid(app)
+    body = grid.body
+    first = drawn(grid)
+    assert first == list(range(len(first)))
+    grid.scroll_to_row(500)
+    app.screen.update()
+    rows = drawn(grid)
+    assert 500 in rows
+    assert rows == list(range(rows[0], rows[0] + len(first)))
+
+
+def test_short_scroll_renders_new_rows_only(app, ordering):
+    grid, columns = make_grid(app)
+    body = grid.body
+    grid.scroll_to_row(100)
+    app.screen.update()
+    before = drawn(grid)
+    rendered = count_renders(body)
+    grid.scroll_to_row(before[-1] + 2)
+    app.screen.update()
+    new = [i for i in drawn(grid) if i not in before]
+    assert len(new) == 2
+    assert sorted(rendered) == sorted(str(col[i]) for i in new for col in columns)
+
+
+def test_sort_then_scroll(app, ordering):
+    grid, columns = make_grid(app)
+    grid.scroll_to_row(200)
+    app.screen.update()
+    grid.sort(1)
+    app.screen.update()
+    # Sorting by the descending column shows the last rows first
+    rows = drawn(grid)
+    assert rows == list(range(rows[0], rows[0] - len(rows), -1))
+    assert grid.body.data_index(0) == 999
+    grid.sort(1, reverse=True)
+    grid.scroll_to_row(0)
+    app.screen.update()
+    assert drawn(grid)[0] == 0
+
+
+def test_filter_shrinks_below_viewport(app, ordering):
+    grid, columns = make_grid(app)
+    body = grid.body
+    grid.scroll_to_row(900)
+    app.screen.update()
+    mask = [i % 100 == 0 for i in range(1000)]
+    grid.set_filter(mask)
+    app.screen.update()
+    assert body.viewport.top == 0
+    assert drawn(grid) == list(range(0, 1000, 100))
+    grid.set_filter(None)
+    app.screen.update()
+    assert drawn(grid)[0] == 0
+
+
+def test_data_updated(app, ordering):
+    grid, columns = make_grid(app)
+    body = grid.body
+    ids, scores, names = columns
+    for i in range(1000, 1100):
+        ids.append(i)
+        scores.append(float(-i))
+        names.append('name %d' % i)
+    names[1099] = 'last'
+    grid.data_updated()
+    rendered = count_renders(body)
+    grid.scroll_to_row(1099)
+    app.screen.update()
+    assert body.n_rows == 1100
+    assert drawn(grid)[-1] == 1099
+    assert 'last' in rendered
@@ -0,0 +1,67 @@
+import os
+
+import pygame
+import pytest
+
+from xui import fonts
+
+
+INSTALLED = {
+    ('dejavusans', False, False): '/fonts/DejaVuSans.ttf',
+    ('dejavusans', True, False): '/fonts/DejaVuSans-Bold.ttf',
+}
+ALIASES = {'sans': 'dejavusans'}
+
+
+@pytest.fixture
+def fake_fonts(monkeypatch, tmp_path):
+    calls = []
+
+    def get_fonts():
+        calls.append('get_fonts')
+        return ['dejavusans']
+
+    def match_font(name, bold=False, italic=False):
+        calls.append(name)
+        name = ALIASES.get(name, name)
+        return INSTALLED.get((name, bold, italic)) or INSTALLED.get((name, False, False))
+
+    monkeypatch.setattr(pygame.font, 'get_fonts', get_fonts)
+    monkeypatch.setattr(pygame.font, 'match_font', match_font)
+    monkeypatch.setattr(fonts, 'cache_path', str(tmp_path / 'fonts.json'))
+    (tmp_path / 'fonts').mkdir()
+    monkeypatch.setattr(fonts, 'font_dirs', lambda: [str(tmp_path / 'fonts')])
+    monkeypatch.setattr(fonts, '_families', None)
+    return calls
+
+
+def test_styles(fake_fonts):
+    assert fonts.match_font('DejaVu Sans') == ('/fonts/DejaVuSans.ttf', False, False)
+    assert fonts.match_font('DejaVu Sans', bold=True) == ('/fonts/DejaVuSans-Bold.ttf', False, False)
+    # No italic, so pygame must slant the plain font
+    assert fonts.match_font('DejaVu Sans', italic=True) == ('/fonts/DejaVuSans.ttf', False, True)
+    assert fonts.match_font('nonesuch, DejaVu Sans')[0] == '/fonts/DejaVuSans.ttf'
+    assert fonts.match_font('nonesuch') == (None, False, False)
+
+
+def test_cache_is_reused(fake_fonts, monkeypatch):
+    fonts.match_font('DejaVu Sans')
+    fonts.match_font('sans')
+    fonts.match_font('nonesuch')
+    fake_fonts.clear()
+    monkeypatch.setattr(fonts, '_families', None)
+    assert fonts.match_font('sans')[0] == '/fonts/DejaVuSans.ttf'
+    assert fonts.match_font('nonesuch')[0] is None
+    assert fake_fonts == []
+
+
+def test_new_font_dir_rescans(fake_fonts, monkeypatch, tmp_path):
+    fonts.families()
+    font_dir = tmp_path / 'fonts'
+    (font_dir / 'newfont').mkdir()
+    stat = os.stat(font_dir)
+    os.utime(font_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    fake_fonts.clear()
+    monkeypatch.setattr(fonts, '_families', None)
+    fonts.families()
+    assert 'get_fonts' in fake_fonts
@@ -0,0 +1,143 @@
+import pytest
+
+from xui.widgets import GridBox, Label, VBox
+
+
+def label(text):
+    return Label(text) if text is not None else None
+
+
+def grid_of(texts):
+    return [[label(text) for text in row] for row in texts]
+
+
+def rects(grid):
+    return [[cell and cell.rect.copy() for cell in row] for row in grid.rows]
+
+
+def show(app, grid):
+    app.screen.children = [grid]
+    app.screen.update()
+
+
+def assert_matches_fresh(app, grid, texts):
+    """Checks grid's cells have the rects of a fresh GridBox with the same contents."""
+    assert [[cell and cell.text for cell in row] for row in grid.rows] == texts
+    got = rects(grid)
+    fresh = GridBox(grid_of(texts))
+    show(app, fresh)
+    assert rects(fresh) == got
+
+
+TEXTS = [
+    ['a', 'bbbb', None],
+    ['cc', 'd', 'eeeeeeee'],
+    ['f', None, 'g'],
+]
+
+
+@pytest.mark.parametrize('row_i', [0, 1, 3])
+def test_insert_row(app, row_i):
+    grid = GridBox(grid_of(TEXTS))
+    show(app, grid)
+    new = ['wide row cell', None, 'x']
+    grid.insert_row(row_i, [label(text) for text in new])
+    show(app, grid)
+    assert_matches_fresh(app, grid, TEXTS[:row_i] + [new] + TEXTS[row_i:])
+
+
+@pytest.mark.parametrize('row_i', [0, 1, 2])
+def test_remove_row(app, row_i):
+    grid = GridBox(grid_of(TEXTS))
+    show(app, grid)
+    grid.remove_row(row_i)
+    show(app, grid)
+    assert_matches_fresh(app, grid, TEXTS[:row_i] + TEXTS[row_i + 1:])
+
+
+@pytest.mark.parametrize('col_i', [0, 2, 3])
+def test_insert_col(app, col_i):
+    grid = GridBox(grid_of(TEXTS))
+    show(app, grid)
+    new = ['h', 'a much wider cell', None]
+    grid.insert_col(col_i, [label(text) for text in new])
+    show(app, grid)
+    expected = [row[:col_i] + [text] + row[col_i:] for row, text in zip(TEXTS, new)]
+    assert_matches_fresh(app, grid, expected)
+
+
+@pytest.mark.parametrize('col_i', [0, 1, 2])
+def test_remove_col(app, col_i):
+    grid = GridBox(grid_of(TEXTS))
+    show(app, grid)
+    grid.remove_col(col_i)
+    show(app, grid)
+    assert_matches_fresh(app, grid, [row[:col_i] + row[col_i + 1:] for row in TEXTS])
+
+
+@pytest.mark.parametrize('text', [None, 'i', 'a cell wider than the rest'])
+def test_set_cell(app, text):
+    grid = GridBox(grid_of(TEXTS))
+    show(app, grid)
+    # (1, 2) holds the widest cell, so replacing it may shrink its column
+    grid.set_cell(1, 2, label(text))
+    show(app, grid)
+    expected = [list(row) for row in TEXTS]
+    expected[1][2] = text
+    assert_matches_fresh(app, grid, expected)
+
+
+def test_cell_resized(app):
+    grid = GridBox(grid_of(TEXTS))
+    show(app, grid)
+    grid.rows[1][2].set_text('e')
+    show(app, grid)
+    expected = [list(row) for row in TEXTS]
+    expected[1][2] = 'e'
+    assert_matches_fresh(app, grid, expected)
+
+
+def test_mutations_in_sequence(app):
+    grid = GridBox(grid_of(TEXTS))
+    show(app, grid)
+    grid.append_row([label('j'), label('kk'), label('l')])
+    show(app, grid)
+    grid.remove_col(1)
+    show(app, grid)
+    grid.set_cell(0, 0, None)
+    show(app, grid)
+    grid.insert_col(0, [label('m'), None, label('nnnnnn'), label('o')])
+    show(app, grid)
+    grid.remove_row(2)
+    show(app, grid)
+    assert_matches_fresh(app, grid, [['m', None, None], [None, 'cc', 'eeeeeeee'], ['o', 'j', 'l']])
+
+
+def test_append_measures_only_new_cells(app, monkeypatch):
+    texts = [['r%d' % i, 'x' * (i % 7), None] for i in range(30)]
+    grid = GridBox(grid_of(texts))
+    show(app, grid)
+    measured = []
+    original = GridBox.measure_cell
+    def measure_cell(self, cell, row_i, col_i):
+        measured.append((row_i, col_i))
+        original(self, cell, row_i, col_i)
+    monkeypatch.setattr(GridBox, 'measure_cell', measure_cell)
+    new = ['new', None, 'z']
+    grid.append_row([label(text) for text in new])
+    show(app, grid)
+    assert sorted(measured) == [(30, 0), (30, 2)]
+    monkeypatch.undo()
+    assert_matches_fresh(app, grid, texts + [new])
+
+
+def test_nested_cell_resized(app):
+    grid = GridBox(grid_of(TEXTS))
+    inner = Label('p')
+    grid.set_cell(2, 1, VBox([inner]))
+    show(app, grid)
+    narrow = rects(grid)
+    inner.set_text('a much wider nested label')
+    show(app, grid)
+    assert grid.rows[2][1].width == inner.width
+    assert rects(grid)[1][2].x > narrow[1][2].x
@@ -0,0 +1,100 @@
+import time
+
+from xui.idle import IdleScheduler, IdleTask
+
+
+def counter(log, name, n, sleep_s=0):
+    for i in range(n):
+        if sleep_s:
+            time.sleep(sleep_s)
+        log.append((name, i))
+        yield
+
+
+def run_all(app):
+    while app.idle_tasks:
+        app.idle_tasks.run(time.time() + 1)
+
+
+def test_priority_then_turns(app):
+    log = []
+    app.add_idle_task(counter(log, 'a', 2))
+    app.add_idle_task(counter(log, 'b', 2))
+    app.add_idle_task(counter(log, 'urgent', 2), priority=1)
+    run_all(app)
+    assert log == [('urgent', 0), ('urgent', 1), ('a', 0), ('b', 0), ('a', 1), ('b', 1)]
+
+
+def test_function_job(app):
+    calls = []
+    done = []
+    task = app.add_idle_task(lambda: calls.append(True) or len(calls) < 3,
+                             done_cb=lambda: done.append(True))
+    run_all(app)
+    assert len(calls) == 3
+    assert task.done and task.steps == 3
+    assert done == [True]
+
+
+def test_deadline(app):
+    log = []
+    app.add_idle_task(counter(log, 'slow', 20, sleep_s=.02))
+    # The first step of a run always goes ahead, however little time there is
+    assert app.idle_tasks.run(time.time()) == 1
+    # Later ones aren't started if they're expected to run past the deadline
+    assert app.idle_tasks.run(time.time() + .03) == 1
+    start = time.time()
+    n_steps = app.idle_tasks.run(start + .1)
+    assert 2 <= n_steps <= 5
+    assert time.time() < start + .1 + .02
+    assert len(log) == 2 + n_steps
+
+
+def test_estimate_is_smoothed():
+    scheduler = IdleScheduler()
+    durations = iter([.03, .01, .01])
+    def step():
+        time.sleep(next(durations))
+        return True
+    task = scheduler.add(IdleTask(step))
+    scheduler.run(0)
+    assert task.estimate_s >= .03
+    scheduler.run(0)
+    first = task.estimate_s
+    # One quick step only pulls the estimate part of the way down
+    assert .01 < first < .03
+    scheduler.run(0)
+    assert .01 < task.estimate_s < first
+
+
+def test_cancel(app):
+    log = []
+    closed = []
+    def job():
+        try:
+            yield from counter(log, 'job', 10)
+        finally:
+            closed.append(True)
+    done = []
+    task = app.add_idle_task(job(), done_cb=lambda: done.append(True))
+    app.idle_tasks.run(0)
+    task.cancel()
+    # The generator is closed straight away, and dropped by the next run
+    assert closed
+    assert app.idle_tasks.run(time.time() + 1) == 0
+    assert len(app.idle_tasks) == 0
+    assert log == [('job', 0)]
+    assert not task.done and not done
+
+
+def test_cancel_from_own_step(app):
+    steps = []
+    def step():
+        steps.append(True)
+        task.cancel()
+        return True
+    done = []
+    task = app.add_idle_task(step, done_cb=lambda: done.append(True))
+    run_all(app)
+    assert steps == [True]
+    assert not task.done and not done
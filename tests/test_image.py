@@ -0,0 +1,76 @@
+import os
+import time
+
+import pygame
+import pytest
+
+from xui import images
+from xui.widgets import HBox, Image, VBox
+
+
+def save_image(path, size=(40, 30)):
+    surface = pygame.Surface(size)
+    surface.fill((200, 0, 0))
+    pygame.image.save(surface, str(path))
+    return str(path)
+
+
+def wait_for_images(app):
+    for _ in range(200):
+        app.run_pending_calls()
+        app.screen.update()
+        if not images.image_loader.pending:
+            return
+        time.sleep(.01)
+
+
+def test_size_not_changed_while_drawing(app, tmp_path, monkeypatch):
+    path = save_image(tmp_path / 'a.png')
+    first = Image(path)
+    box = VBox([first])
+    app.add_window(box)
+    wait_for_images(app)
+    assert first.rect.size == (40, 30)
+
+    drawing = []
+    draw = Image.draw
+    invalidate_size = Image.invalidate_size
+    monkeypatch.setattr(Image, 'draw', lambda self: (drawing.append(self), draw(self), drawing.pop()))
+    monkeypatch.setattr(Image, 'invalidate_size',
+                        lambda self: (not drawing or pytest.fail('invalidated while drawing'),
+                                      invalidate_size(self)))
+    # Decoded already, so the second one is laid out at the image's size straight away
+    second = Image(path)
+    box.children.append(second)
+    app.screen.update()
+    assert second.rect.size == (40, 30)
+    wait_for_images(app)
+    assert second.shown_key == first.shown_key
+
+
+def test_failed_retried_once_file_rewritten(app, tmp_path):
+    path = tmp_path / 'b.png'
+    path.write_bytes(b'not a png')
+    image = Image(str(path))
+    app.add_window(image)
+    wait_for_images(app)
+    assert image.key is None
+    mtime = os.stat(path).st_mtime_ns
+    save_image(path)
+    os.utime(path, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+    image.set_path(str(path))
+    wait_for_images(app)
+    assert image.image is not None
+
+
+def test_failures_are_bounded(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(images.image_loader, 'max_failed', 3)
+    paths = []
+    for i in range(10):
+        path = tmp_path / ('%d.png' % i)
+        path.write_bytes(b'not a png')
+        paths.append(str(path))
+    app.add_window(HBox([Image(path) for path in paths]))
+    wait_for_images(app)
+    assert len(images.image_loader.failed) == 3
+    assert images.image_loader.failure(images.image_key(paths[-1]))
@@ -0,0 +1,121 @@
+import pygame
+import pytest
+
+from xui import keys
+from xui.widgets import Label
+
+from conftest import press
+
+
+CTRL = pygame.KMOD_LCTRL
+
+
+class KeyLabel(Label):
+    keybindings = {
+        'CTRL-x CTRL-s': ('record', 'save'),
+        'CTRL-x k': ('record', 'kill'),
+        'a': ('record', 'a'),
+    }
+
+    def __init__(self, *args, **kwargs):
+        self.recorded = []
+        super().__init__(*args, **kwargs)
+
+    def record(self, what):
+        self.recorded.append(what)
+
+    def handle_keydown(self, event, keystroke):
+        self.recorded.append('unbound ' + keystroke)
+        return True
+
+
+def make_label(app, cls=KeyLabel):
+    label = cls('Keys')
+    app.add_window(label)
+    app.screen.update()
+    label.focus()
+    return label
+
+
+def event(key, mod=0):
+    return pygame.event.Event(pygame.KEYDOWN, key=key, mod=mod, unicode='')
+
+
+@pytest.mark.parametrize('key, mod', [
+    (pygame.K_x, CTRL),
+    (pygame.K_LEFT, CTRL | pygame.KMOD_LSHIFT),
+    (pygame.K_KP_ENTER, 0),
+    (pygame.K_KP5, pygame.KMOD_LALT),
+    (pygame.K_F5, 0),
+])
+def test_codes_match_keystrokes(key, mod):
+    code = keys.event_code(event(key, mod))
+    keystroke = keys.event_keystroke(event(key, mod))
+    assert keys.code_keystroke(code) == keystroke
+    assert keys.parse_keystroke(keystroke) == code
+
+
+def test_modifier_keydown_has_no_code():
+    assert keys.event_code(event(pygame.K_LCTRL, CTRL)) is None
+
+
+def test_unknown_keystroke():
+    with pytest.raises(ValueError):
+        keys.parse_keystroke('CTRL-nosuchkey')
+
+
+def test_chords(app):
+    label = make_label(app)
+    press(app, pygame.K_x, mod=CTRL)
+    assert label.recorded == []
+    press(app, pygame.K_s, mod=CTRL)
+    press(app, pygame.K_x, mod=CTRL)
+    press(app, pygame.K_k, 'k')
+    assert label.recorded == ['save', 'kill']
+
+
+def test_partial_chord_then_non_matching_key(app):
+    label = make_label(app)
+    press(app, pygame.K_x, mod=CTRL)
+    # Not part of the chord: the chord is abandoned and the key goes nowhere
+    press(app, pygame.K_a, 'a')
+    assert label.recorded == []
+    assert app.screen.chord is None
+    # Keys are handled as normal again afterwards
+    press(app, pygame.K_s, mod=CTRL)
+    press(app, pygame.K_a, 'a')
+    assert label.recorded == ['unbound CTRL-s', 'a']
+
+
+def test_subclass_overrides_one_chord(app):
+    class SubLabel(KeyLabel):
+        keybindings = {'CTRL-x k': ('record', 'sub kill')}
+    label = make_label(app, SubLabel)
+    press(app, pygame.K_x, mod=CTRL)
+    press(app, pygame.K_k, 'k')
+    press(app, pygame.K_x, mod=CTRL)
+    press(app, pygame.K_s, mod=CTRL)
+    assert label.recorded == ['sub kill', 'save']
+
+
+def test_widget_bindings_before_app_bindings(app):
+    label = make_label(app)
+    quit = []
+    app.bind_key('a', lambda: quit.append('a'))
+    app.bind_key('CTRL-q', lambda: quit.append('q'))
+    press(app, pygame.K_a, 'a')
+    press(app, pygame.K_q, mod=CTRL)
+    assert label.recorded == ['a', 'unbound CTRL-q']
+    # The label handled CTRL-q itself, so the app binding never ran
+    assert quit == []
+    label.handle_keydown = lambda event, keystroke: False
+    press(app, pygame.K_q, mod=CTRL)
+    assert quit == ['q']
+
+
+def test_instance_binding(app):
+    label = make_label(app)
+    label.bind_key('CTRL-x CTRL-s', ('record', 'instance save'))
+    press(app, pygame.K_x, mod=CTRL)
+    press(app, pygame.K_s, mod=CTRL)
+    assert label.recorded == ['instance save']
@@ -0,0 +1,152 @@
+import random
+import string
+
+import pygame
+
+from xui.completion import FuzzyCompletions
+from xui.widgets import LineEdit
+
+from conftest import press
+
+
+def make_line_edit(app):
+    rng = random.Random(0)
+    words = [''.join(rng.choice(string.ascii_lowercase) for _ in range(8)) for _ in range(50000)]
+    words += ['apple', 'apricot', 'application']
+    line_edit = LineEdit(completions=words)
+    app.add_window(line_edit)
+    app.screen.update()
+    line_edit.focus()
+    return line_edit
+
+
+def matches(line_edit, prefix):
+    return line_edit.completions.matches(prefix, 0, 10 ** 6)
+
+
+def test_typing_with_more_than_a_page_of_matches(app):
+    line_edit = make_line_edit(app)
+    page = line_edit.completion_page
+    press(app, pygame.K_a, 'a')
+    assert len(matches(line_edit, 'a')) > page
+    assert line_edit.dropdown.active
+    assert line_edit.dropdown.choices == matches(line_edit, 'a')[:page]
+    press(app, pygame.K_p, 'p')
+    assert line_edit.dropdown.active
+    assert line_edit.dropdown.choices == matches(line_edit, 'ap')
+
+
+def test_arrows_page_through_matches_before_wrapping(app):
+    line_edit = make_line_edit(app)
+    press(app, pygame.K_a, 'a')
+    dropdown = line_edit.dropdown
+    everything = matches(line_edit, 'a')
+    # Up from the first choice doesn't wrap to the end of the page loaded so far
+    press(app, pygame.K_DOWN)
+    assert dropdown.choice_i == 0
+    press(app, pygame.K_UP)
+    assert dropdown.choice_i == 0
+    for _ in range(len(everything) - 1):
+        press(app, pygame.K_DOWN)
+    assert dropdown.choice == everything[-1]
+    assert dropdown.choices == everything
+    press(app, pygame.K_DOWN)
+    assert dropdown.choice_i == 0
+    press(app, pygame.K_UP)
+    assert dropdown.choice == everything[-1]
+
+
+def search(completions, query, limit=None):
+    *partial, final = completions.search(query, limit)
+    return final
+
+
+def test_fuzzy_ranking_order():
+    completions = FuzzyCompletions(['xaxbxc', 'abc', 'aXbc', 'abcde', 'zabc', 'cab'])
+    # Tight matches first, then earlier ones, then shorter words; case is ignored
+    assert search(completions, 'abc') == ['abc', 'abcde', 'zabc', 'aXbc', 'xaxbxc']
+    assert completions.ranking('abc') == ['abc', 'abcde', 'zabc', 'aXbc', 'xaxbxc']
+    assert search(completions, 'abc', limit=2) == ['abc', 'abcde']
+
+
+def test_fuzzy_chunks_yield_best_so_far():
+    # The closer matches sort after the others, so come in a later chunk
+    completions = FuzzyCompletions(['a_x%02d' % i for i in range(60)] + ['x%02d' % i for i in range(60)])
+    completions.chunk_size = 50
+    results = list(completions.search('x', limit=3))
+    assert len(results) == 3
+    assert results[0] == ['a_x00', 'a_x01', 'a_x02']
+    assert results[-1] == ['x00', 'x01', 'x02']
+    assert completions.ranking('x')[:3] == results[-1]
+
+
+def test_fuzzy_unfinished_search_has_no_ranking():
+    completions = FuzzyCompletions(['w%d' % i for i in range(100)])
+    completions.chunk_size = 10
+    next(completions.search('1'))
+    assert completions.ranking('1') is None
+    assert completions.matches('1', 0, 5) == []
+
+
+def test_fuzzy_narrowing():
+    rng = random.Random(1)
+    words = [''.join(rng.choice('abcd') for _ in range(6)) for _ in range(5000)]
+    completions = FuzzyCompletions(words)
+    search(completions, 'a')
+    for query in ['ab', 'abd', 'abdc']:
+        assert search(completions, query) == search(FuzzyCompletions(words), query)
+        # Each query only rescans the previous one's matches
+        assert len(completions._pool) < len(words)
+    # A query that doesn't extend the last starts again from every word
+    assert search(completions, 'c') == search(FuzzyCompletions(words), 'c')
+    assert len(completions._pool) == len(words)
+
+
+def test_fuzzy_narrowing_unfinished_search():
+    words = ['w%03d' % i for i in range(100)] + ['x1']
+    completions = FuzzyCompletions(words)
+    completions.chunk_size = 10
+    next(completions.search('1'))
+    # Words the first search hadn't reached yet are still considered
+    assert search(completions, '1x') == []
+    assert search(completions, 'x') == ['x1']
+    assert search(completions, 'x1') == ['x1']
+
+
+def test_fuzzy_paging():
+    completions = FuzzyCompletions(['word%02d' % i for i in range(30)])
+    ranking = search(completions, 'wd')
+    assert len(ranking) == 30
+    pages = [completions.matches('wd', start, 8) for start in range(0, 30, 8)]
+    assert [len(page) for page in pages] == [8, 8, 8, 6]
+    assert sum(pages, []) == ranking
+    assert completions.matches('wd', 30, 8) == []
+    # Paging a query other than the last search's gives nothing
+    assert completions.matches('w', 0, 8) == []
+
+
+def test_fuzzy_common_prefix():
+    completions = FuzzyCompletions(['Apple', 'APPLET', 'applesauce', 'kiwi'])
+    search(completions, 'ap')
+    assert completions.common_prefix('ap') == 'Apple'
+    search(completions, 'pl')
+    # Not every match starts with the query, so there's nothing to extend it with
+    assert completions.common_prefix('pl') == 'pl'
+    completions.ignore_case = False
+    completions._query = None
+    search(completions, 'pp')
+    assert completions.common_prefix('pp') == 'pp'
+    search(completions, 'Ap')
+    assert completions.common_prefix('Ap') == 'Apple'
+
+
+def test_fuzzy_tab_completes_common_prefix(app):
+    line_edit = LineEdit(completions=['Apple', 'APPLET', 'applesauce'], fuzzy=True)
+    app.add_window(line_edit)
+    app.screen.update()
+    line_edit.focus()
+    press(app, pygame.K_a, 'a')
+    press(app, pygame.K_p, 'p')
+    assert line_edit.dropdown.active
+    press(app, pygame.K_TAB)
+    assert line_edit.get_value() == 'Apple'
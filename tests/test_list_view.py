@@ -0,0 +1,99 @@
+from xui.widgets import Label, ListView
+
+
+def make_list_view(app, data):
+    made = []
+    def row_factory():
+        row = Label('')
+        made.append(row)
+        return row
+    def bind_cb(row, i):
+        row.set_text(data[i])
+    view = ListView(len(data), row_factory, bind_cb)
+    app.add_window(view)
+    app.screen.update()
+    return view, made
+
+
+def shown(view):
+    """Returns {row index: text} for the rows bound to widgets."""
+    return {i: row.text for i, row in view.body.bound.items()}
+
+
+def check_shown(view, data):
+    body = view.body
+    wanted = body.row_range()
+    assert sorted(body.bound) == list(wanted)
+    assert shown(view) == {i: data[i] for i in wanted}
+    assert set(body.children) == set(body.bound.values())
+    # Every bound row is placed at its index and laid out to draw
+    for i, row in body.bound.items():
+        assert row.y == body.y + i * body.row_height
+        assert row.surface is not None and row.surface.get_size() == row.size
+
+
+def test_scroll_reuses_rows(app):
+    data = ['row %d' % i for i in range(1000)]
+    view, made = make_list_view(app, data)
+    check_shown(view, data)
+    # Away from the top, overscan binds rows on both sides of the viewport
+    view.scroll_to_row(50)
+    app.screen.update()
+    n_made = len(made)
+    for i in [51, 500, 999, 0, 50]:
+        view.scroll_to_row(i)
+        app.screen.update()
+        check_shown(view, data)
+        assert i in view.body.bound
+    # Rows that scrolled away were rebound rather than new ones made
+    assert len(made) == n_made
+
+
+def test_short_scroll_only_binds_new_rows(app):
+    data = ['row %d' % i for i in range(1000)]
+    view, made = make_list_view(app, data)
+    view.scroll_to_row(100)
+    app.screen.update()
+    before = dict(view.body.bound)
+    view.scroll_to_row(max(before) + 1)
+    app.screen.update()
+    after = view.body.bound
+    # Rows still in range keep their widgets
+    assert all(after[i] is row for i, row in before.items() if i in after)
+    check_shown(view, data)
+
+
+def test_refresh_after_data_changed(app):
+    data = ['row %d' % i for i in range(1000)]
+    view, made = make_list_view(app, data)
+    view.scroll_to_row(300)
+    app.screen.update()
+    rows = dict(view.body.bound)
+    for i in range(1000):
+        data[i] = 'changed %d' % i
+    view.refresh_rows()
+    app.screen.update()
+    assert view.body.bound == rows
+    check_shown(view, data)
+
+
+def test_shrink_below_viewport(app):
+    data = ['row %d' % i for i in range(1000)]
+    view, made = make_list_view(app, data)
+    view.scroll_to_row(900)
+    app.screen.update()
+    n_made = len(made)
+    del data[20:]
+    view.set_row_count(len(data))
+    app.screen.update()
+    body = view.body
+    assert body.viewport.top == 0
+    assert max(body.bound) == len(data) - 1
+    check_shown(view, data)
+    # Growing again reuses the widgets the shrink freed
+    data += ['new %d' % i for i in range(100)]
+    view.set_row_count(len(data))
+    view.scroll_to_row(len(data) - 1)
+    app.screen.update()
+    check_shown(view, data)
+    assert len(made) == n_made
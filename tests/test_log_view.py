@@ -0,0 +1,49 @@
+import pygame
+
+from xui.widgets import LogView
+
+
+def make_log_view(app, **kwargs):
+    log = LogView(**kwargs)
+    app.add_window(log)
+    app.screen.update()
+    return log
+
+
+def test_lines_appended_before_layout_are_shown(app):
+    log = LogView()
+    log.append(['one', 'two', 'three'])
+    app.add_window(log)
+    app.screen.update()
+    assert log.body.n_shown == 3
+    assert log.body.height == 3 * log.body.line_height
+
+
+def test_follows_end(app):
+    log = make_log_view(app)
+    body = log.body
+    for i in range(10):
+        log.append(['line %d' % j for j in range(i * 100, (i + 1) * 100)])
+        app.screen.update()
+        assert body.at_end()
+    assert body.viewport.bottom == body.height
+
+
+def test_flushed_before_drawing(app):
+    log = make_log_view(app)
+    body = log.body
+    heights = []
+    draw = type(body).draw
+    body.draw = lambda: (heights.append(body.height), draw(body))
+    log.append(['line %d' % i for i in range(50)])
+    app.screen.update()
+    assert heights == [50 * body.line_height]
+
+
+def test_border_is_drawn(app):
+    log = make_log_view(app)
+    log.body.border_thickness = 2
+    log.body.border_color = (255, 0, 0)
+    log.append('line')
+    app.screen.update()
+    assert log.body.surface.get_at((0, 0)) == pygame.Color(255, 0, 0)
@@ -0,0 +1,50 @@
+import pygame
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from xui.widgets import Plot
+
+
+def sine(n):
+    return numpy.sin(numpy.arange(n) / 10)
+
+
+def test_range_fits_samples_appended_before_drawing(app):
+    plot = Plot()
+    plot.append(sine(2000))
+    app.add_window(plot)
+    app.screen.update()
+    lo, hi = plot.auto_range
+    assert lo == pytest.approx(-1.2, abs=.01)
+    assert hi == pytest.approx(1.2, abs=.01)
+
+
+def test_range_grows_with_new_samples(app):
+    plot = Plot()
+    app.add_window(plot)
+    app.screen.update()
+    plot.append(sine(500))
+    app.screen.update()
+    plot.append(sine(100) * 3)
+    app.screen.update()
+    lo, hi = plot.auto_range
+    assert lo < -3 and hi > 3
+
+
+def test_incremental_drawing_matches_full_redraw(app):
+    plot = Plot()
+    app.add_window(plot)
+    app.screen.update()
+    for i in range(10):
+        plot.append(sine(37) * (1 + i / 10))
+        app.screen.update()
+    incremental = surface_array(plot)
+    plot.new_cols = None
+    plot.update_plot_surface(plot.plot_surface.get_size())
+    # The first column is only stretched to meet its neighbour when drawn incrementally
+    assert (surface_array(plot)[1:] == incremental[1:]).all()
+
+
+def surface_array(plot):
+    return pygame.surfarray.array2d(plot.plot_surface)
@@ -0,0 +1,80 @@
+import pygame
+
+from xui.widgets import Label
+
+
+def make_window(app):
+    window = Label('Window', bgcolor=(255, 0, 0), halign='fill', valign='fill')
+    app.add_window(window)
+    app.screen.update()
+    return window
+
+
+def open_popup(app, x=50, y=50, **kwargs):
+    popup = Label('Popup', x=x, y=y, **kwargs)
+    app.screen.open_popup(popup)
+    app.screen.update()
+    return popup
+
+
+def inside(rect):
+    # Clear of the label's text
+    return rect.left + 1, rect.top + 1
+
+
+def screen_copy(app):
+    return app.screen.surface.copy()
+
+
+def same_pixels(a, b):
+    return pygame.image.tobytes(a, 'RGBA') == pygame.image.tobytes(b, 'RGBA')
+
+
+def test_backing_restored_on_close(app):
+    make_window(app)
+    before = screen_copy(app)
+    popup = open_popup(app, bgcolor=(0, 0, 255))
+    assert app.screen.surface.get_at(inside(popup.rect)) == pygame.Color(0, 0, 255)
+    app.screen.close_popup(popup)
+    app.screen.update()
+    assert same_pixels(app.screen.surface, before)
+
+
+def test_backing_follows_windows_beneath(app):
+    window = make_window(app)
+    popup = open_popup(app, bgcolor=(0, 0, 255))
+    # Repainting the window beneath updates the popup's copy of it, not the screen
+    window.bgcolor = (0, 255, 0)
+    window.redraw()
+    app.screen.update()
+    assert app.screen.surface.get_at(inside(popup.rect)) == pygame.Color(0, 0, 255)
+    assert app.screen.surface.get_at((795, 595)) == pygame.Color(0, 255, 0)
+    app.screen.close_popup(popup)
+    app.screen.update()
+    assert same_pixels(app.screen.surface, window.surface)
+
+
+def test_backing_restored_on_move(app):
+    make_window(app)
+    before = screen_copy(app)
+    popup = open_popup(app, bgcolor=(0, 0, 255))
+    old_rect = popup.rect.copy()
+    popup.x = 300
+    popup.relayout()
+    app.screen.update()
+    assert not popup.rect.colliderect(old_rect)
+    assert app.screen.surface.get_at(inside(old_rect)) == before.get_at(inside(old_rect))
+    assert app.screen.surface.get_at(inside(popup.rect)) == pygame.Color(0, 0, 255)
+
+
+def test_translucent_popup_redrawn_over_backing(app):
+    make_window(app)
+    popup = open_popup(app, bgcolor=(0, 0, 255, 128))
+    point = (popup.rect.right - 2, popup.rect.centery)
+    color = app.screen.surface.get_at(point)
+    assert color not in [pygame.Color(255, 0, 0), pygame.Color(0, 0, 255)]
+    for _ in range(3):
+        popup.redraw()
+        app.screen.update()
+    # Each redraw blends over the window, not over the popup's last frame
+    assert app.screen.surface.get_at(point) == color
@@ -0,0 +1,93 @@
+import gc
+import weakref
+
+import pygame
+import pytest
+
+from xui.canvas import Canvas
+from xui.render_cache import RenderCache, render_cache
+from xui.widgets import Label, VBox
+
+
+class CachedLabel(Label):
+    cache_render = True
+
+    def __init__(self, *args, **kwargs):
+        self.n_draws = 0
+        super().__init__(*args, **kwargs)
+
+    def draw(self):
+        self.n_draws += 1
+        super().draw()
+
+
+@pytest.fixture
+def labels(app):
+    cached = CachedLabel('Cached')
+    box = VBox([cached, Label('Other')])
+    app.add_window(box)
+    app.screen.update()
+    return box, cached
+
+
+def test_hit_when_parent_redraws(app, labels):
+    box, cached = labels
+    before = cached.surface.copy()
+    box.redraw()
+    app.screen.update()
+    assert cached.n_draws == 1
+    assert pygame.image.tobytes(cached.surface, 'RGBA') == pygame.image.tobytes(before, 'RGBA')
+
+
+def test_miss_after_redraw(app, labels):
+    box, cached = labels
+    cached.redraw()
+    app.screen.update()
+    assert cached.n_draws == 2
+
+
+def test_miss_when_key_changes(app, labels):
+    box, cached = labels
+    cached.enabled = False
+    box.redraw()
+    app.screen.update()
+    assert cached.n_draws == 2
+
+
+def test_dropped_with_widget(app):
+    cached = CachedLabel('Cached')
+    box = VBox([cached, Label('Other')])
+    app.add_window(box)
+    app.screen.update()
+    assert render_cache.get(cached, cached.render_key()) is not None
+    ref = weakref.ref(cached)
+    box.children.remove(cached)
+    app.screen.update()
+    del cached
+    gc.collect()
+    # The cache didn't keep the widget alive, and has no entry for it left
+    assert ref() is None
+    assert all(r() is not None for r in render_cache.entries)
+
+
+def test_evicts_least_recently_used():
+    cache = RenderCache()
+    cache.budget = 3 * 10 * 10 * 4
+    widgets = [Label(str(i)) for i in range(4)]
+    surface = pygame.Surface((10, 10), pygame.SRCALPHA)
+    for widget in widgets[:3]:
+        cache.put(widget, 'key', surface)
+    cache.get(widgets[0], 'key')
+    cache.put(widgets[3], 'key', surface)
+    assert cache.get(widgets[1], 'key') is None
+    assert all(cache.get(w, 'key') is not None for w in (widgets[0], widgets[2], widgets[3]))
+    assert cache.size == cache.budget
+
+
+def test_restore_srcalpha_replaces_rather_than_blends():
+    cached = pygame.Surface((4, 4), pygame.SRCALPHA)
+    cached.fill((255, 0, 0, 128))
+    surface = pygame.Surface((4, 4), pygame.SRCALPHA)
+    surface.fill((0, 0, 255, 255))
+    RenderCache().restore(Canvas(), surface, cached)
+    assert surface.get_at((1, 1)) == pygame.Color(255, 0, 0, 128)
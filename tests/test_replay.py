@@ -0,0 +1,45 @@
+import gzip
+import json
+import time
+
+import pygame
+
+from xui.replay import FORMAT_VERSION, Replayer
+from xui.widgets import Label
+
+
+def write_session(path, events):
+    with gzip.open(path, 'wt') as f:
+        f.write(json.dumps({'version': FORMAT_VERSION, 'size': [800, 600], 'framerate': 60}) + '\n')
+        for event in events:
+            f.write(json.dumps(event) + '\n')
+
+
+def test_timer_set_during_replay_fires_on_time_after(app, tmp_path):
+    app.add_window(Label('Hello'))
+    fired = []
+    app.bind_key('x', lambda: app.call_later(.2, fired.append, time.time()))
+    path = tmp_path / 'session.jsonl.gz'
+    # Ten seconds in, so the replay's clock ends up well ahead of the real one
+    write_session(path, [[10, pygame.KEYDOWN, {'key': pygame.K_x, 'mod': 0, 'unicode': 'x'}]])
+    Replayer(app, path).run()
+    assert app.virtual_time is None
+    ended = time.time()
+    while not fired and time.time() < ended + 1:
+        app.check_timers()
+        time.sleep(.01)
+    assert fired and fired[0] - ended < .3
+
+
+def test_cancel_after_replay(app, tmp_path):
+    app.add_window(Label('Hello'))
+    fired = []
+    tokens = []
+    app.bind_key('x', lambda: tokens.append(app.call_later(.1, fired.append, True)))
+    path = tmp_path / 'session.jsonl.gz'
+    write_session(path, [[5, pygame.KEYDOWN, {'key': pygame.K_x, 'mod': 0, 'unicode': 'x'}]])
+    Replayer(app, path).run()
+    app.cancel_call(tokens[0])
+    time.sleep(.15)
+    app.check_timers()
+    assert not fired
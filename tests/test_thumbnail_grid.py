@@ -0,0 +1,75 @@
+import os
+import time
+
+import pygame
+import pytest
+
+from xui import images
+from xui.widgets import ThumbnailGrid
+
+
+@pytest.fixture
+def paths(tmp_path):
+    files = []
+    for i in range(20):
+        path = str(tmp_path / ('%02d.png' % i))
+        surface = pygame.Surface((60, 40))
+        surface.fill((i, 100, 200))
+        pygame.image.save(surface, path)
+        files.append(path)
+    return files * 10
+
+
+def wait_for_thumbnails(app):
+    for _ in range(200):
+        app.run_pending_calls()
+        app.screen.update()
+        if not images.thumbnail_loader.pending:
+            return
+        time.sleep(.01)
+
+
+def scroll(app, grid, clicks):
+    for _ in range(abs(clicks)):
+        grid.handle_mouse_down('wheeldown' if clicks > 0 else 'wheelup', (10, 10))
+        app.screen.update()
+
+
+def test_mtimes_only_kept_near_viewport(app, paths):
+    grid = ThumbnailGrid(paths)
+    app.add_window(grid)
+    app.screen.update()
+    body = grid.body
+    scroll(app, grid, 100)
+    assert len(body.mtimes) <= len(body.index_range(body.prefetch_rows))
+    assert 0 not in body.mtimes
+
+
+def test_changed_file_noticed_when_scrolled_back(app, paths):
+    grid = ThumbnailGrid(paths)
+    app.add_window(grid)
+    app.screen.update()
+    body = grid.body
+    old = body.mtimes[0]
+    os.utime(paths[0], ns=(old, old + 10 ** 9))
+    scroll(app, grid, 100)
+    scroll(app, grid, -100)
+    assert body.mtimes[0] == old + 10 ** 9
+
+
+def test_stretched_placeholder_scaled_once(app, paths, monkeypatch):
+    grid = ThumbnailGrid(paths[:4])
+    app.add_window(grid)
+    app.screen.update()
+    wait_for_thumbnails(app)
+    body = grid.body
+    scales = []
+    scale = pygame.transform.scale
+    monkeypatch.setattr(pygame.transform, 'scale', lambda *args: scales.append(args) or scale(*args))
+    # The new level loads in the background; until then the one we have is stretched
+    body.set_thumb_size(200)
+    for _ in range(5):
+        body.redraw()
+        app.screen.update()
+    assert body.stretched
+    assert len(scales) == len(body.stretched)
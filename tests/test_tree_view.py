@@ -0,0 +1,189 @@
+import threading
+
+import pygame
+
+from xui.widgets import TreeView
+from xui.widgets.tree_view import TreeViewBody
+
+from conftest import press
+
+
+TREE = {
+    'a': ['a1', 'a2'],
+    'a1': ['a1x', 'a1y'],
+    'b': ['b1'],
+}
+
+
+def get_children(item):
+    return TREE.get(item, [])
+
+
+def make_tree_view(app, roots=('a', 'b', 'c'), **kwargs):
+    tree = TreeView(list(roots), get_children, **kwargs)
+    app.add_window(tree)
+    app.screen.update()
+    tree.focus()
+    return tree
+
+
+def labels(tree):
+    return [node.item for node in tree.body.rows]
+
+
+def selected(tree):
+    return tree.selected_item()
+
+
+def wait_for_loads(app):
+    # The pool has one worker, so once this has run, earlier loads have finished
+    # and queued their results
+    TreeViewBody.executor.submit(lambda: None).result()
+    app.run_pending_calls()
+    app.screen.update()
+
+
+def test_expand_and_collapse(app):
+    tree = make_tree_view(app)
+    body = tree.body
+    body.expand(0)
+    body.expand(1)
+    assert labels(tree) == ['a', 'a1', 'a1x', 'a1y', 'a2', 'b', 'c']
+    body.collapse(0)
+    assert labels(tree) == ['a', 'b', 'c']
+    # Expanding again shows the descendants that were expanded before
+    body.expand(0)
+    assert labels(tree) == ['a', 'a1', 'a1x', 'a1y', 'a2', 'b', 'c']
+
+
+def test_collapse_remaps_selection(app):
+    tree = make_tree_view(app)
+    body = tree.body
+    body.expand(0)
+    body.expand(1)
+    # Selected row inside the collapsed subtree moves to the collapsed node
+    body.select(3)
+    body.collapse(1)
+    assert selected(tree) == 'a1'
+    # Selected row below the collapsed subtree moves up by the rows removed
+    body.expand(1)
+    body.select(5)
+    assert selected(tree) == 'b'
+    body.collapse(0)
+    assert selected(tree) == 'b'
+    # Selected row above is untouched
+    body.expand(0)
+    body.select(0)
+    body.collapse(1)
+    assert selected(tree) == 'a'
+
+
+def test_expand_shifts_selection(app):
+    tree = make_tree_view(app)
+    body = tree.body
+    body.select(2)
+    body.expand(0)
+    assert selected(tree) == 'c'
+    body.expand(3)
+    assert labels(tree) == ['a', 'a1', 'a2', 'b', 'b1', 'c']
+    assert selected(tree) == 'c'
+
+
+def test_keys(app):
+    tree = make_tree_view(app)
+    press(app, pygame.K_DOWN)
+    assert selected(tree) == 'a'
+    press(app, pygame.K_RIGHT)
+    assert labels(tree) == ['a', 'a1', 'a2', 'b', 'c']
+    press(app, pygame.K_RIGHT)
+    assert selected(tree) == 'a1'
+    press(app, pygame.K_RIGHT)
+    press(app, pygame.K_DOWN)
+    press(app, pygame.K_DOWN)
+    assert selected(tree) == 'a1y'
+    # Left from a leaf selects its parent, then collapses it
+    press(app, pygame.K_LEFT)
+    assert selected(tree) == 'a1'
+    press(app, pygame.K_LEFT)
+    assert labels(tree) == ['a', 'a1', 'a2', 'b', 'c']
+    press(app, pygame.K_DOWN)
+    press(app, pygame.K_LEFT)
+    assert selected(tree) == 'a'
+
+
+def test_left_finds_distant_parent(app):
+    tree = make_tree_view(app)
+    body = tree.body
+    body.expand(0)
+    body.expand(1)
+    # a2 is below a1's expanded children, so its parent isn't the row above
+    body.select(4)
+    assert selected(tree) == 'a2'
+    press(app, pygame.K_LEFT)
+    assert selected(tree) == 'a'
+
+
+def test_background_load(app):
+    tree = make_tree_view(app, background=True)
+    body = tree.body
+    body.expand(0)
+    assert body.rows[0].loading
+    wait_for_loads(app)
+    assert labels(tree) == ['a', 'a1', 'a2', 'b', 'c']
+    assert not body.rows[0].loading
+
+
+def blocked_loads(app, **kwargs):
+    gate = threading.Event()
+    def get_children_later(item):
+        gate.wait(5)
+        return get_children(item)
+    tree = TreeView(['a', 'b', 'c'], get_children_later, background=True, **kwargs)
+    app.add_window(tree)
+    app.screen.update()
+    return tree, gate
+
+
+def test_loaded_after_collapse(app):
+    tree, gate = blocked_loads(app)
+    body = tree.body
+    body.select(2)
+    body.expand(0)
+    body.collapse(0)
+    gate.set()
+    wait_for_loads(app)
+    # The children are kept for next time, but not shown
+    assert labels(tree) == ['a', 'b', 'c']
+    assert [node.item for node in body.rows[0].children] == ['a1', 'a2']
+    assert selected(tree) == 'c'
+    body.expand(0)
+    assert labels(tree) == ['a', 'a1', 'a2', 'b', 'c']
+
+
+def test_loaded_after_ancestor_collapsed(app):
+    tree = make_tree_view(app)
+    body = tree.body
+    body.expand(0)
+    gate = threading.Event()
+    body.get_children = lambda item: (gate.wait(5), get_children(item))[1]
+    body.background = True
+    body.expand(1)
+    body.collapse(0)
+    gate.set()
+    wait_for_loads(app)
+    assert labels(tree) == ['a', 'b', 'c']
+    # a1 is still expanded, so its children show with a
+    body.expand(0)
+    assert labels(tree) == ['a', 'a1', 'a1x', 'a1y', 'a2', 'b', 'c']
+
+
+def test_set_roots_while_loading(app):
+    tree, gate = blocked_loads(app)
+    body = tree.body
+    body.expand(0)
+    tree.set_roots(['x', 'y'])
+    body.select(1)
+    gate.set()
+    wait_for_loads(app)
+    assert labels(tree) == ['x', 'y']
+    assert selected(tree) == 'y'